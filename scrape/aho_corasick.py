@@ -0,0 +1,37 @@
+try:
+    # pyahocorasick, optional, much faster on long texts
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+has_native = ahocorasick is not None
+
+
+class NativeAhoCorasick:
+    """
+    Finds which of a set of keywords occur in a text in one pass, with pyahocorasick.
+    """
+
+    def __init__(self, keywords):
+        self.keywords = sorted(set([k for k in keywords if k]))
+        self.automaton = ahocorasick.Automaton()
+        for keyword in self.keywords:
+            self.automaton.add_word(keyword, keyword)
+        self.automaton.make_automaton()
+
+    def iter(self, text):
+        if not self.keywords:
+            return
+        yield from self.automaton.iter(text)
+
+    def find_all(self, text) -> set:
+        found = set()
+        for _, keyword in self.iter(text):
+            found.add(keyword)
+        return found
+
+    def search(self, text) -> bool:
+        for _ in self.iter(text):
+            return True
+        return False
+
@@ -0,0 +1,127 @@
+import re
+
+from aho_corasick import NativeAhoCorasick, has_native
+
+# the filter of a config item compiled once, the cards of every re-parsed page are matched
+# against it in one pass over their titles
+#   "filter": "资治通鉴"
+#   "filter": ["资治通鉴", "史记"]
+#   "filter": {"keywords": ["资治通鉴"], "regex": ["第.+卷"], "exclude": ["广告"], "body": true, "name": "通鉴"}
+
+
+class KeywordRegex:
+    """
+    The keywords as one alternation, the matcher without pyahocorasick.
+    """
+
+    def __init__(self, keywords):
+        self.keywords = sorted(set([k for k in keywords if k]))
+        # the longest first, like the automaton any of them is a hit
+        pattern = "|".join(re.escape(k) for k in sorted(self.keywords, key=len, reverse=True))
+        self.pattern = re.compile(pattern) if self.keywords else None
+
+    def search(self, text) -> bool:
+        return self.pattern is not None and self.pattern.search(text) is not None
+
+
+def build_keyword_matcher(keywords):
+    if has_native:
+        return NativeAhoCorasick(keywords)
+
+    return KeywordRegex(keywords)
+
+
+def as_list(v):
+    # an empty keyword is in every title, it is no constraint like an empty list
+    if not v:
+        return []
+    if isinstance(v, str):
+        return [v]
+    return [x for x in v if x]
+
+
+class ArticleFilter:
+    """
+    An article is kept when none of the exclude terms is in it, and any of the keywords or the
+    regexes is, or there are none. Only the title is matched unless `body` is set.
+
+    With `body` the cards are only dropped by their title exclusions, their texts are matched
+    by match() once they are downloaded.
+    """
+
+    def __init__(self, keywords=None, regex=None, exclude=None, body: bool = False, name=None):
+        self.keywords = as_list(keywords)
+        self.regex = as_list(regex)
+        self.exclude = as_list(exclude)
+        self.body = body
+        self.name = name
+
+        self.keyword_matcher = build_keyword_matcher(self.keywords) if self.keywords else None
+        self.regex_matcher = re.compile("|".join(f"(?:{r})" for r in self.regex)) if self.regex else None
+        self.exclude_matcher = build_keyword_matcher(self.exclude) if self.exclude else None
+
+    def __bool__(self):
+        return bool(self.keywords or self.regex or self.exclude)
+
+    def __repr__(self):
+        return f"ArticleFilter({self.get_name()})"
+
+    def get_name(self):
+        if self.name:
+            return self.name
+        return "_".join(self.keywords + self.regex)
+
+    def is_excluded(self, text):
+        return self.exclude_matcher is not None and self.exclude_matcher.search(text)
+
+    def is_included(self, text):
+        if self.keyword_matcher is None and self.regex_matcher is None:
+            return True
+        if self.keyword_matcher is not None and self.keyword_matcher.search(text):
+            return True
+        return self.regex_matcher is not None and self.regex_matcher.search(text) is not None
+
+    def match_title(self, title) -> bool:
+        """
+        Whether the card of a title is downloaded, a title that is not a string never is.
+        """
+        if not title or not isinstance(title, str):
+            return False
+        if self.is_excluded(title):
+            return False
+        return self.body or self.is_included(title)
+
+    def match(self, title, txt) -> bool:
+        """
+        Whether a downloaded article is kept, its title and, with `body`, its text.
+        """
+        text = f"{title or ''}\n{txt or ''}" if self.body else title or ""
+        return not self.is_excluded(text) and self.is_included(text)
+
+
+def compile_filter(flter) -> ArticleFilter:
+    """
+    The filter of a config item, a keyword, a list of keywords or a dict, compiled.
+    """
+    if isinstance(flter, ArticleFilter):
+        return flter
+    if isinstance(flter, dict):
+        return ArticleFilter(
+            keywords=flter.get("keywords", None),
+            regex=flter.get("regex", None),
+            exclude=flter.get("exclude", None),
+            body=flter.get("body", False),
+            name=flter.get("name", None),
+        )
+    return ArticleFilter(keywords=flter)
+
+
+def get_filter_suffix(flter):
+    """
+    The suffix of the article dir and the volumes of a config item, `_{keyword}` per keyword.
+    """
+    if isinstance(flter, list):
+        return "".join(f"_{f}" for f in flter)
+    if isinstance(flter, dict):
+        return f"_{compile_filter(flter).get_name()}"
+    return f"_{flter}"
@@ -0,0 +1,240 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+import orjson
+
+manifest_name = ".manifest.sqlite"
+
+login_wall = "手机登录\n扫码登录"
+
+valid_size = 250
+
+
+class ArticleManifest:
+    """
+    Persistent index of the downloaded articles in one article directory.
+
+    Freshness checks are answered from the index instead of stat-ing and reading
+    `{article_path}/{link_id}.txt` for every card on every scroll.
+    """
+
+    def __init__(self, article_path):
+        self.article_path = article_path
+        self.db_path = os.path.join(article_path, manifest_name)
+        self.lock = threading.Lock()
+
+        # the index is kept in the dir, it is only created with the first article
+        self.conn = None
+        if os.path.isdir(article_path):
+            self.connect()
+
+        self.sync()
+
+    def connect(self):
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS articles (
+                link_id TEXT PRIMARY KEY,
+                item TEXT,
+                size INTEGER,
+                length INTEGER,
+                hash TEXT,
+                fetched_at REAL,
+                status TEXT
+            )
+            """
+        )
+        self.conn.commit()
+
+    def sync(self):
+        """
+        Reconcile the index with the files on disk, the files added, removed or resized since
+        are indexed again. Called on open and at the start of each crawl, the files may have
+        changed in between in a long running process.
+        """
+        with self.lock:
+            if self.conn is None:
+                if not os.path.isdir(self.article_path):
+                    return
+                self.connect()
+
+            known = dict(self.conn.execute("SELECT link_id, size FROM articles").fetchall())
+
+            on_disk = set()
+            added = []
+            changed = []
+            with os.scandir(self.article_path) as it:
+                for entry in it:
+                    if entry.name.startswith(".") or not entry.name.endswith(".txt"):
+                        continue
+                    if not entry.is_file():
+                        continue
+
+                    link_id = entry.name[: -len(".txt")]
+                    on_disk.add(link_id)
+
+                    st = entry.stat()
+                    status = "ok" if st.st_size > valid_size else "short"
+                    if link_id not in known:
+                        added.append((link_id, None, st.st_size, None, None, st.st_mtime, status))
+                    elif known[link_id] != st.st_size:
+                        # rewritten outside of record(), its length and hash are read again on demand
+                        changed.append((st.st_size, st.st_mtime, status, link_id))
+
+            removed = [(link_id,) for link_id in known.keys() - on_disk]
+
+            if added:
+                self.conn.executemany("INSERT OR REPLACE INTO articles VALUES (?, ?, ?, ?, ?, ?, ?)", added)
+            if changed:
+                self.conn.executemany(
+                    "UPDATE articles SET size = ?, length = NULL, hash = NULL, fetched_at = ?, status = ? "
+                    "WHERE link_id = ?",
+                    changed,
+                )
+            if removed:
+                self.conn.executemany("DELETE FROM articles WHERE link_id = ?", removed)
+            if added or changed or removed:
+                self.conn.commit()
+
+    def get(self, link_id):
+        with self.lock:
+            if self.conn is None:
+                return None
+            cur = self.conn.execute(
+                "SELECT link_id, item, size, length, hash, fetched_at, status FROM articles WHERE link_id = ?",
+                (str(link_id),),
+            )
+            row = cur.fetchone()
+
+        if row is None:
+            return None
+
+        return {
+            "link_id": row[0],
+            "item": orjson.loads(row[1]) if row[1] else None,
+            "size": row[2],
+            "length": row[3],
+            "hash": row[4],
+            "fetched_at": row[5],
+            "status": row[6],
+        }
+
+    def items(self):
+        """
+        (link_id, item) of the articles downloaded with their feed item.
+        """
+        with self.lock:
+            if self.conn is None:
+                return []
+            rows = self.conn.execute("SELECT link_id, item FROM articles WHERE item IS NOT NULL").fetchall()
+
+        return [(link_id, orjson.loads(item)) for link_id, item in rows]
+
+    def size(self, link_id):
+        """
+        Size in bytes of the stored article, None if it was never downloaded.
+        """
+        with self.lock:
+            if self.conn is None:
+                return None
+            row = self.conn.execute("SELECT size FROM articles WHERE link_id = ?", (str(link_id),)).fetchone()
+
+        return row[0] if row else None
+
+    def length(self, link_id):
+        """
+        Length in characters of the stored article, None if it was never downloaded.
+        """
+        with self.lock:
+            if self.conn is None:
+                return None
+            row = self.conn.execute("SELECT length FROM articles WHERE link_id = ?", (str(link_id),)).fetchone()
+
+        if row is None:
+            return None
+
+        if row[0] is None:
+            # indexed from disk by sync(), read the file once to backfill it
+            article_fp = os.path.join(self.article_path, f"{link_id}.txt")
+            if not os.path.exists(article_fp):
+                return None
+
+            with open(article_fp, "r", encoding="utf-8") as fp:
+                txt = fp.read()
+
+            with self.lock:
+                self.conn.execute(
+                    "UPDATE articles SET length = ?, hash = ? WHERE link_id = ?",
+                    (len(txt), content_hash(txt), str(link_id)),
+                )
+                self.conn.commit()
+
+            return len(txt)
+
+        return row[0]
+
+    def record(self, link_id, txt, item=None, status=None):
+        """
+        Record a freshly written article, returns its size in bytes.
+        """
+        size = len(txt.encode("utf-8"))
+        if status is None:
+            if txt.find(login_wall) >= 0:
+                status = "login"
+            elif size > valid_size:
+                status = "ok"
+            else:
+                status = "short"
+
+        item_json = orjson.dumps(item).decode("utf-8") if item is not None else None
+
+        with self.lock:
+            if self.conn is None:
+                os.makedirs(self.article_path, exist_ok=True)
+                self.connect()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO articles VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (str(link_id), item_json, size, len(txt), content_hash(txt), time.time(), status),
+            )
+            self.conn.commit()
+
+        return size
+
+    def close(self):
+        with self.lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
+
+
+def content_hash(txt):
+    return hashlib.sha1(txt.encode("utf-8")).hexdigest()
+
+
+manifests = {}
+manifests_lock = threading.Lock()
+
+
+def get_manifest(article_path, sync: bool = False) -> ArticleManifest:
+    """
+    Get the shared manifest of an article directory, it is opened once per process and synced
+    with the disk on open, and again with `sync`.
+    """
+    key = os.path.normpath(article_path)
+    with manifests_lock:
+        manifest = manifests.get(key, None)
+        if manifest is None:
+            manifest = ArticleManifest(article_path)
+            manifests[key] = manifest
+            return manifest
+
+    if sync:
+        manifest.sync()
+
+    return manifest
@@ -0,0 +1,289 @@
+import datetime as dttm
+import glob
+import os
+import random
+from html import escape
+
+# synthetic pages shaped like the ones the scrapers parse, and article corpora like the
+# downloaded ones. recorded pages, saved with driver.page_source, go to .torextrader/fixtures
+# named after their kind, e.g. tt_article_profile.html, and are used next to the synthetic ones
+
+fixtures_path = ".torextrader/fixtures"
+
+# the sites the links point at, the mock site of mock_site.py serves them locally
+tt_base = "https://www.toutiao.com"
+wp_base = "http://mp.weixin.qq.com"
+
+page_kinds = ["tt_article", "tt_wtt", "wp", "shuqi"]
+article_kinds = ["tt_article_page", "wp_article_page", "zy_chapter"]
+
+# common characters, the texts only need the length and the mix of the real ones
+hanzi = (
+    "的一是不了人我在有他这为之大来以个中上们到说国和地也子时道出而要于就下得"
+    "可你年生自会那后能对着事其里所去行过家十用发天如然作方成者多日都三小军二"
+    "无同么经法当起与好看学进种将还分此心前面又定见只主没公从知正部太守王帝臣"
+    "曰兵马城州郡县侯将相朝宫民田政令史书读通鉴资治宋齐梁陈隋唐汉魏晋秦楚燕赵韩"
+)
+punctuation = "，，，。。、；：？！"
+
+# boilerplate the cleanup rules remove, so the cleaners have something to match
+boilerplate = [
+    "【原文】\n{original}\n【译文】\n",
+    "关注微信公众号：通鉴风云\n阅读：{n}\n",
+    "点击阅读原文，查看更多\n",
+    "编者按：{sentence}\n",
+    "#资治通鉴#",
+    "作者简介：{sentence}\n",
+]
+
+
+def make_sentence(rng: random.Random, n=None):
+    n = n if n is not None else rng.randint(8, 30)
+    return "".join(rng.choice(hanzi) for _ in range(n)) + rng.choice(punctuation)
+
+
+def make_paragraph(rng: random.Random):
+    return "".join(make_sentence(rng) for _ in range(rng.randint(2, 8)))
+
+
+def make_title(rng: random.Random, i: int):
+    return f"资治通鉴{i}：{make_sentence(rng, rng.randint(6, 16))[:-1]}"
+
+
+def make_article_txt(rng: random.Random, i: int, date: dttm.datetime, size: int = 3000):
+    """
+    The text of a downloaded article, title, publish time and paragraphs with some boilerplate.
+    """
+    lines = [make_title(rng, i), "", date.strftime("%Y-%m-%d %H:%M"), ""]
+    length = 0
+    while length < size:
+        if rng.random() < 0.1:
+            p = rng.choice(boilerplate).format(
+                original=make_paragraph(rng),
+                n=rng.randint(1, 9999),
+                sentence=make_sentence(rng),
+            )
+        else:
+            p = make_paragraph(rng)
+        lines.append(p)
+        length += len(p)
+
+    return "\n".join(lines) + "\n\n\n"
+
+
+def get_date(i: int, start=dttm.datetime(2023, 1, 1, 8, 0)):
+    return start + dttm.timedelta(hours=7 * i, minutes=i % 60)
+
+
+def get_dates(n: int):
+    return [get_date(i) for i in range(n)]
+
+
+def get_rng(seed: int, i: int):
+    # one per article, a card and its article page share the title whatever the page of the card
+    return random.Random(seed * 1_000_003 + i)
+
+
+def get_article_id(i: int):
+    return str(7300000000000000000 + i * 7919)
+
+
+def write_corpus(path, n: int, seed: int = 1, size: int = 3000):
+    """
+    n article files like the downloaded ones, written once per path, returns the path.
+    """
+    if os.path.exists(path) and len(glob.glob(os.path.join(path, "*.txt"))) == n:
+        return path
+
+    if not os.path.exists(path):
+        os.makedirs(path)
+
+    rng = random.Random(seed)
+    for i, date in enumerate(get_dates(n)):
+        with open(os.path.join(path, f"{get_article_id(i)}.txt"), "w", encoding="utf-8") as f:
+            f.write(make_article_txt(rng, i, date, size=size))
+
+    return path
+
+
+def tt_article_card(rng, i, date, base=tt_base):
+    title = escape(make_title(rng, i))
+    link = f"{base}/article/{get_article_id(i)}/"
+    return (
+        '<div class="profile-article-card-wrapper"><div class="feed-card-article feed-card-article-l">'
+        '<div class="feed-card-article-l">'
+        f'<a class="title" href="{link}" target="_blank" rel="noopener" aria-label="{title}">{title}</a>'
+        '<div class="feed-card-article-content">'
+        f'<p class="feed-card-article-abstract">{escape(make_sentence(rng))}</p></div>'
+        '<div class="feed-card-footer-cmp">'
+        f'<div class="feed-card-footer-time-cmp">{date.strftime("%m-%d %H:%M")}</div>'
+        f'<div class="profile-feed-card-tools-text">{rng.randint(1, 99999)}阅读</div>'
+        f'<div class="profile-feed-card-tools-text">{rng.randint(0, 999)}评论</div></div></div>'
+        f'<div class="feed-card-cover"><a href="{link}" target="_blank" rel="noopener">'
+        f'<img src="https://p3-sign.toutiaoimg.com/tos-cn-i/{get_article_id(i)}~tplv-tt-cs0:640:360.jpg" alt="">'
+        "</a></div>"
+        "</div></div>"
+    )
+
+
+def tt_wtt_card(rng, i, date, base=tt_base):
+    link = f"/w/{get_article_id(i)}/"
+    return (
+        '<div class="profile-wtt-card-wrapper"><div class="wtt-card">'
+        f'<a class="avatar" href="{base}/c/user/token/x/" target="_blank" rel="noopener">'
+        '<img src="https://p3.toutiaoimg.com/img/avatar.jpg" alt=""></a>'
+        f'<a class="name" href="{base}/c/user/token/x/" target="_blank" rel="noopener" title="作者">作者</a>'
+        f'<div class="time">{date.strftime("%m-%d %H:%M")}</div>'
+        f'<div class="weitoutiao-content"><a href="{link}" target="_blank" rel="noopener">'
+        f'{escape(make_paragraph(rng))}<span class="expand">展开</span></a></div>'
+        f'<div class="wtt-footer"><span>{rng.randint(0, 9999)}</span><span>{rng.randint(0, 999)}</span></div>'
+        "</div></div>"
+    )
+
+
+def wp_album_item(rng, i, date, base=wp_base):
+    title = escape(make_title(rng, i))
+    link = (
+        f"{base}/s?__biz=MzA5{i:06}==&amp;mid={2247480000 + i}&amp;idx=1"
+        f"&amp;sn={rng.getrandbits(64):016x}&amp;chksm={rng.getrandbits(64):016x}#rd"
+    )
+    return (
+        '<li class="album__list-item js_album_item js_wx_tap_highlight wx_tap_cell" '
+        f'data-msgid="{2247480000 + i}" data-itemidx="1" data-link="{link}" data-title="{title}">'
+        '<div class="album__item-content">'
+        f'<div class="album__item-title"><span class="album__item-title-wrp">{title}</span></div>'
+        '<div class="album__item-info">'
+        f'<span class="js_article_create_time">{int(date.timestamp())}</span></div></div>'
+        f'<div class="album__item-img" style="background-image:url(https://mmbiz.qpic.cn/{i}/640)"></div></li>'
+    )
+
+
+def shuqi_catalog_item(rng, i, date, base=None):
+    return (
+        f'<li class="ellipsis line level-0" data-index="{i}" data-cid="{1167088 + i}">'
+        f"第{i + 1}章 {escape(make_sentence(rng, 8)[:-1])}</li>"
+    )
+
+
+def wrap_page(title, body, head=""):
+    return (
+        '<!DOCTYPE html><html lang="zh-CN"><head><meta charset="utf-8">'
+        f"<title>{escape(title)}</title>"
+        '<link rel="stylesheet" href="https://lf3-static.bytednsdoc.com/obj/eden-cn/static/main.css">'
+        '<script src="https://lf3-static.bytednsdoc.com/obj/eden-cn/static/main.js"></script>'
+        f"{head}</head><body>{body}</body></html>"
+    )
+
+
+card_makers = {
+    "tt_article": tt_article_card,
+    "tt_wtt": tt_wtt_card,
+    "wp": wp_album_item,
+    "shuqi": shuqi_catalog_item,
+}
+
+
+def profile_cards(kind, indices, seed: int = 1, base=None):
+    """
+    The cards of the articles `indices`, as they are listed in the page of the given kind.
+    """
+    make_card = card_makers[kind]
+    if base is None:
+        return "".join(make_card(get_rng(seed, i), i, get_date(i)) for i in indices)
+    return "".join(make_card(get_rng(seed, i), i, get_date(i), base=base) for i in indices)
+
+
+def profile_page(kind, n: int, seed: int = 1, base=None, cards=None, head=""):
+    """
+    A profile page, album or catalog of the given kind with n cards, newest first like the sites,
+    or with the given cards.
+    """
+    if kind == "shuqi":
+        # the catalog is in reading order
+        items = cards if cards is not None else profile_cards(kind, range(n), seed)
+        return wrap_page("目录 - 书旗小说", f'<div class="catalog"><ul class="chapter-list">{items}</ul></div>', head)
+
+    items = cards if cards is not None else profile_cards(kind, reversed(range(n)), seed, base=base)
+
+    if kind in ["tt_article", "tt_wtt"]:
+        return wrap_page(
+            "头条主页 - 今日头条",
+            f'<div class="profile-container"><div class="profile-tab-feed">{items}</div></div>',
+            head,
+        )
+
+    if kind == "wp":
+        return wrap_page(
+            "资治通鉴 专辑",
+            f'<div class="album"><ul class="album__list js_album_list">{items}</ul></div>',
+            head,
+        )
+
+    raise ValueError(f"unknown page kind {kind}")
+
+
+def article_page(kind, i: int, seed: int = 1, size: int = 3000):
+    """
+    An article page of the given kind, a toutiao article or weitoutiao, a wechat article or a zhangyue chapter.
+    """
+    rng = get_rng(seed, i)
+    date = get_date(i)
+    title = make_title(rng, i)
+    paragraphs = []
+    length = 0
+    while length < size:
+        p = make_paragraph(rng)
+        paragraphs.append(f"<p>{escape(p)}</p>")
+        length += len(p)
+    body = "".join(paragraphs)
+
+    if kind == "tt_article_page":
+        return wrap_page(
+            title,
+            '<div class="article-content">'
+            f'<h1>{escape(title)}</h1><div class="article-meta"><span>{date.strftime("%Y-%m-%d %H:%M")}</span>'
+            '<span class="name">作者</span></div>'
+            f'<article class="syl-article-base tt-article-content">{body}</article></div>',
+        )
+
+    if kind == "tt_wtt_page":
+        return wrap_page(
+            title,
+            f'<div class="weitoutiao-html"><div class="wtt-time">{date.strftime("%Y-%m-%d %H:%M")}</div>{body}</div>',
+        )
+
+    if kind == "wp_article_page":
+        return wrap_page(
+            title,
+            f'<div id="img-content"><h1 class="rich_media_title" id="activity-name">{escape(title)}</h1>'
+            '<div id="meta_content"><em id="publish_time"></em></div>'
+            f'<div class="rich_media_content" id="js_content">{body}</div></div>'
+            f'<script>var ct = "{int(date.timestamp())}";</script>',
+        )
+
+    if kind == "zy_chapter":
+        return wrap_page(
+            title,
+            f'<div class="reader"><div class="article-content"><h2>{escape(title)}</h2>{body}</div></div>',
+        )
+
+    raise ValueError(f"unknown article kind {kind}")
+
+
+def get_recorded_pages(path=fixtures_path):
+    """
+    kind -> html of the recorded pages, named {kind}*.html
+    """
+    pages = {}
+    for fp in sorted(glob.glob(os.path.join(path, "*.html"))):
+        name = os.path.basename(fp)
+        # the longest kind first, tt_article_page is not a tt_article profile
+        kinds = sorted([*page_kinds, *article_kinds], key=len, reverse=True)
+        kind = next((k for k in kinds if name.startswith(k)), None)
+        if kind is None:
+            continue
+
+        with open(fp, "r", encoding="utf-8") as f:
+            pages.setdefault(kind, []).append((name, f.read()))
+
+    return pages
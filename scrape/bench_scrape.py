@@ -0,0 +1,235 @@
+import argparse
+import glob
+import os
+import platform
+import shutil
+import sys
+import time
+from functools import partial
+
+import orjson
+from termcolor import colored
+
+import bench_fixtures
+import html_parser
+import web_toutiao
+from article_filter import compile_filter
+from download_shuqi import generate_txts as generate_txts_shuqi
+from download_shuqi import get_articles_data_shuqi, write_txts
+from http_fetch import extract_body
+from text_cache import get_text_cache
+from volume_writer import VolumeWriter
+
+# time the offline parts of the scrapers on synthetic pages and corpora, and on the pages
+# recorded in .torextrader/fixtures, no site is visited
+# uv run python .\scrape\bench_scrape.py -n 1000 10000
+# results go to .torextrader/bench/bench_{time}.json and are compared with the previous run
+
+bench_path = ".torextrader/bench"
+
+article_links = {
+    "tt_article_page": "https://www.toutiao.com/article/7300000000000000000/",
+    "wp_article_page": "https://mp.weixin.qq.com/s?__biz=MzA5",
+    "zy_chapter": "https://www.ireader.com/index.php?ca=Chapter.Index",
+}
+
+no_filter = compile_filter(None)
+
+page_extractors = {
+    "tt_article": lambda html: web_toutiao.get_articles_data_tt(html, no_filter, True),
+    "tt_wtt": lambda html: web_toutiao.get_articles_data_tt(html, no_filter, False),
+    "wp": lambda html: web_toutiao.get_articles_data_wp(html, no_filter),
+    "shuqi": lambda html: get_articles_data_shuqi(html, no_filter, True),
+}
+
+
+def timeit(fn, times: int, setup=None):
+    """
+    Best and mean seconds of `times` runs, and the result of the last one.
+    """
+    elapsed = []
+    result = None
+    for _ in range(times):
+        if setup is not None:
+            setup()
+        start_time = time.perf_counter()
+        result = fn()
+        elapsed.append(time.perf_counter() - start_time)
+
+    return min(elapsed), sum(elapsed) / len(elapsed), result
+
+
+class Bench:
+    def __init__(self, times: int):
+        self.times = times
+        self.results = {}
+
+    def run(self, name, fn, items: int, setup=None, times=None):
+        best, mean, result = timeit(fn, times if times is not None else self.times, setup=setup)
+        self.results[name] = {
+            "best": round(best, 6),
+            "mean": round(mean, 6),
+            "items": items,
+            "per_item_us": round(best / items * 1_000_000, 2) if items else None,
+        }
+        print(f"  {name:<44} {best * 1000:>10.2f}ms {mean * 1000:>10.2f}ms {items:>7} items")
+        return result
+
+
+def bench_pages(bench: Bench, cards: int, article_path):
+    print(colored(f"pages of {cards} cards, parser {html_parser.get_backend()}", "green"))
+
+    pages = {kind: [("synthetic", bench_fixtures.profile_page(kind, cards))] for kind in bench_fixtures.page_kinds}
+    for kind, recorded in bench_fixtures.get_recorded_pages().items():
+        if kind in pages:
+            pages[kind].extend(recorded)
+
+    for kind, kind_pages in pages.items():
+        extract = page_extractors[kind]
+        for name, html in kind_pages:
+            data = extract(html)
+            bench.run(f"get_articles_data[{kind}:{name}]", partial(extract, html), len(data))
+
+    # cards parsed and checked against the manifest of an article dir
+    for kind in ["tt_article", "tt_wtt"]:
+        html = pages[kind][0][1]
+        fn = partial(
+            web_toutiao.get_update_items,
+            article_path,
+            None,
+            html,
+            "tt",
+            is_article=kind == "tt_article",
+            cache=True,
+        )
+        bench.run(f"get_update_items[{kind}]", fn, cards)
+
+    pages = {kind: [("synthetic", bench_fixtures.article_page(kind, 1))] for kind in bench_fixtures.article_kinds}
+    for kind, recorded in bench_fixtures.get_recorded_pages().items():
+        if kind in pages:
+            pages[kind].extend(recorded)
+
+    for kind, kind_pages in pages.items():
+        for name, html in kind_pages:
+            bench.run(f"extract_body[{kind}:{name}]", partial(extract_body, html, article_links[kind]), 1)
+
+
+def bench_corpus(bench: Bench, n: int, jobs: int):
+    corpus_path = bench_fixtures.write_corpus(os.path.join(bench_path, f"corpus_{n}"), n)
+    out_path = os.path.join(bench_path, f"out_{n}")
+    print(colored(f"corpus of {n} articles in {corpus_path}", "green"))
+
+    cache = get_text_cache(corpus_path)
+    # once after a cleared cache, every file parsed, then from the cache
+    items = bench.run(
+        f"get_articles_items[{n}:cold]",
+        partial(web_toutiao.get_articles_items, corpus_path),
+        n,
+        setup=cache.clear,
+        times=1,
+    )
+    items = bench.run(f"get_articles_items[{n}:warm]", partial(web_toutiao.get_articles_items, corpus_path), n)
+    items = sorted(items, key=lambda x: x["date"])
+
+    def generate(cache=None):
+        with VolumeWriter(out_path, web_toutiao.group_num) as writer:
+            web_toutiao.generate_txts(items, writer, rules="toutiao", cache=cache, jobs=jobs)
+            writer.commit(f"bench_{n}")
+
+    bench.run(f"generate_txts[{n}:cold]", generate, n, times=1)
+    # the cleaned texts are reused from the text cache
+    generate(cache=cache)
+    bench.run(f"generate_txts[{n}:warm]", partial(generate, cache=cache), n)
+
+    bench.run(
+        f"generate_txts[{n}:shuqi]",
+        partial(generate_txts_shuqi, items, filter_original_text=True, start_idx=0),
+        n,
+    )
+    group_idx, group_txts = generate_txts_shuqi(items, filter_original_text=True, start_idx=0)
+    bench.run(f"write_txts[{n}]", partial(write_txts, out_path, f"bench_shuqi_{n}", group_idx, group_txts), n)
+
+    shutil.rmtree(out_path, ignore_errors=True)
+
+
+def load_last_results(path):
+    fps = sorted(glob.glob(os.path.join(bench_path, "bench_*.json")))
+    fps = [fp for fp in fps if os.path.abspath(fp) != os.path.abspath(path)]
+    if not fps:
+        return None, None
+
+    with open(fps[-1], "rb") as f:
+        return fps[-1], orjson.loads(f.read())
+
+
+def compare(report, last_fp, last_report):
+    print(colored(f"against {last_fp}", "green"))
+    last_results = last_report["results"]
+    for name, r in report["results"].items():
+        last = last_results.get(name, None)
+        if last is None or last["best"] <= 0:
+            continue
+
+        ratio = r["best"] / last["best"]
+        color = "red" if ratio > 1.2 else "green" if ratio < 0.8 else "white"
+        print(colored(f"  {name:<44} {last['best'] * 1000:>10.2f}ms -> {r['best'] * 1000:>10.2f}ms {ratio:.2f}x", color))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("-n", "--sizes", nargs="*", type=int, default=[1000, 10000], help="corpus sizes")
+    parser.add_argument("--cards", type=int, default=300, help="cards per synthetic profile page")
+    parser.add_argument("-t", "--times", type=int, default=5, help="runs per benchmark, the best is kept")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="processes to clean with")
+    parser.add_argument(
+        "--parser",
+        default=None,
+        type=str,
+        help="html parser, selectolax, lxml or bs4, defaults to the fastest installed",
+    )
+    parser.add_argument("--compare", default=None, type=str, help="results to compare with, defaults to the last")
+
+    args = parser.parse_args()
+
+    if not html_parser.set_backend(args.parser):
+        sys.exit(1)
+
+    bench = Bench(args.times)
+    sizes = sorted(args.sizes)
+
+    bench_pages(bench, args.cards, bench_fixtures.write_corpus(os.path.join(bench_path, f"corpus_{sizes[0]}"), sizes[0]))
+    for n in sizes:
+        bench_corpus(bench, n, args.jobs)
+
+    report = {
+        "meta": {
+            "at": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "parser": html_parser.get_backend(),
+            "times": args.times,
+            "cards": args.cards,
+            "jobs": args.jobs,
+        },
+        "results": bench.results,
+    }
+
+    fp = os.path.join(bench_path, f"bench_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    if args.compare:
+        with open(args.compare, "rb") as f:
+            last_fp, last_report = args.compare, orjson.loads(f.read())
+    else:
+        last_fp, last_report = load_last_results(fp)
+
+    with open(fp, "wb") as f:
+        f.write(orjson.dumps(report, option=orjson.OPT_INDENT_2))
+    print(f"results: {fp}")
+
+    if last_report is not None:
+        compare(report, last_fp, last_report)
+
+
+if __name__ == "__main__":
+    main()
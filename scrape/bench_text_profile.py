@@ -0,0 +1,117 @@
+import argparse
+import time
+
+from termcolor import colored
+
+from page_ready import PageReadiness
+from text_profile import get_network_stats
+from web_toutiao import create_drive, load_json
+
+# bench page load time and bytes on the wire of the full and the text-only browser profiles
+# uv run python .\scrape\bench_text_profile.py -u https://www.toutiao.com/article/... -t 3
+
+
+def bench_page(drv, url, readiness: PageReadiness):
+    get_network_stats(drv)
+
+    start_time = time.time()
+    drv.get(url)
+    readiness.wait_loaded(drv)
+    elapsed = time.time() - start_time
+
+    stats = get_network_stats(drv)
+    stats["seconds"] = elapsed
+    return stats
+
+
+def bench_profile(urls, use_edge_web_driver, text_only, times):
+    drv = create_drive(use_edge_web_driver, text_only=text_only, perf_log=True)
+    # not saved, both profiles start from the default timeouts
+    readiness = PageReadiness(stats_fp="")
+
+    results = []
+    try:
+        for url in urls:
+            for i in range(times):
+                stats = bench_page(drv, url, readiness)
+                stats["url"] = url
+                results.append(stats)
+                print(
+                    f"{'text-only' if text_only else 'full'} {i} {url}: {stats['seconds']:.2f}s "
+                    f"{stats['bytes'] / 1024:.0f}KB {stats['requests']} requests {stats['blocked']} blocked"
+                )
+    finally:
+        drv.quit()
+
+    return results
+
+
+def summarize(name, results):
+    n = len(results)
+    if n == 0:
+        return None
+
+    summary = {
+        "seconds": sum([r["seconds"] for r in results]) / n,
+        "bytes": sum([r["bytes"] for r in results]) / n,
+        "requests": sum([r["requests"] for r in results]) / n,
+        "blocked": sum([r["blocked"] for r in results]) / n,
+    }
+
+    print(
+        colored(
+            f"{name:>10}: {summary['seconds']:.2f}s {summary['bytes'] / 1024:.0f}KB "
+            f"{summary['requests']:.0f} requests {summary['blocked']:.0f} blocked per page",
+            "green",
+        )
+    )
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("-u", "--url", help="page to load, repeatable", action="append", default=[])
+    parser.add_argument("-t", "--times", help="loads per page", type=int, default=3)
+    parser.add_argument("-k", "--pages", help="pages taken from the config", type=int, default=3)
+    parser.add_argument("-r", "--chrome", help="use chrome", action="store_true")
+    parser.add_argument(
+        "-c",
+        "--config",
+        default=".torextrader/scrape_toutiao_config.json",
+        type=str,
+        help="config file, the item links are loaded when no url is given",
+    )
+
+    args = parser.parse_args()
+
+    urls = args.url
+    if not urls:
+        config: dict = load_json(args.config)
+        urls = [item["link"] for item in config.get("items", []) if "link" in item][: args.pages]
+
+    if not urls:
+        print("no pages to load")
+        return
+
+    use_edge_web_driver = not args.chrome
+
+    full = bench_profile(urls, use_edge_web_driver, False, args.times)
+    text_only = bench_profile(urls, use_edge_web_driver, True, args.times)
+
+    full_summary = summarize("full", full)
+    text_only_summary = summarize("text-only", text_only)
+
+    if full_summary and text_only_summary and full_summary["seconds"] > 0 and full_summary["bytes"] > 0:
+        print(
+            colored(
+                f"text-only: {text_only_summary['seconds'] / full_summary['seconds']:.0%} of the load time, "
+                f"{text_only_summary['bytes'] / full_summary['bytes']:.0%} of the bytes",
+                "cyan",
+            )
+        )
+    pass
+
+
+if __name__ == "__main__":
+    main()
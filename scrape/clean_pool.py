@@ -0,0 +1,37 @@
+import os
+from multiprocessing import Pool
+
+
+def get_jobs(jobs):
+    """
+    Number of cleaning processes, 0 for one per core.
+    """
+    if jobs is None:
+        return 1
+
+    if jobs <= 0:
+        return os.cpu_count() or 1
+
+    return jobs
+
+
+def clean_texts(clean_fn, txts, jobs: int = 1, chunksize: int = None):
+    """
+    Yields clean_fn(txt) for each text, in order.
+
+    With jobs > 1 the texts are cleaned by a process pool in chunks, the results still come
+    back in the order of the texts so chapter numbering does not depend on the pool.
+    clean_fn has to be picklable, i.e. a module level function or a partial of one.
+    """
+    jobs = min(get_jobs(jobs), len(txts))
+    if jobs <= 1:
+        for txt in txts:
+            yield clean_fn(txt)
+        return
+
+    if chunksize is None:
+        # a few chunks per process, so a slow chunk does not hold up the others
+        chunksize = max(1, len(txts) // (jobs * 4))
+
+    with Pool(jobs) as pool:
+        yield from pool.imap(clean_fn, txts, chunksize)
@@ -0,0 +1,200 @@
+import hashlib
+import os
+import re
+
+try:
+    import re._constants as sre_constants
+    import re._parser as sre_parse
+except ImportError:
+    # python < 3.11
+    import sre_constants
+    import sre_parse
+
+import orjson
+
+from aho_corasick import NativeAhoCorasick, has_native
+
+default_rules_fp = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cleanup_rules.json")
+
+# possessive repeats are new in python 3.11
+repeat_ops = tuple(
+    getattr(sre_constants, op) for op in ["MAX_REPEAT", "MIN_REPEAT", "POSSESSIVE_REPEAT"] if hasattr(sre_constants, op)
+)
+
+
+def literal_runs(items):
+    """
+    Candidate requirements of a parsed pattern, each is a set of strings one of which must appear in any match.
+    """
+    candidates = []
+    run = ""
+
+    for op, av in items:
+        if op == sre_constants.LITERAL:
+            run += chr(av)
+            continue
+
+        if run:
+            candidates.append(set([run]))
+            run = ""
+
+        if op == sre_constants.SUBPATTERN:
+            # (group, add_flags, del_flags, pattern)
+            if av[1] or av[2]:
+                continue
+            required = required_literals_of(av[3])
+            if required is not None:
+                candidates.append(required)
+        elif op == sre_constants.BRANCH:
+            required = set()
+            for branch in av[1]:
+                r = required_literals_of(branch)
+                if r is None:
+                    required = None
+                    break
+                required |= r
+            if required:
+                candidates.append(required)
+        elif op in repeat_ops:
+            min_repeat, _, item = av
+            if min_repeat >= 1:
+                required = required_literals_of(item)
+                if required is not None:
+                    candidates.append(required)
+        elif op == sre_constants.IN:
+            chars = set()
+            for in_op, in_av in av:
+                if in_op != sre_constants.LITERAL:
+                    chars = None
+                    break
+                chars.add(chr(in_av))
+            if chars:
+                candidates.append(chars)
+
+    if run:
+        candidates.append(set([run]))
+
+    return candidates
+
+
+def required_literals_of(items):
+    candidates = literal_runs(items)
+    if not candidates:
+        return None
+
+    # the most selective requirement, i.e. the one whose shortest alternative is the longest
+    return max(candidates, key=lambda c: (min(len(s) for s in c), -len(c)))
+
+
+def required_literals(pattern):
+    """
+    Strings one of which must appear in the text for the pattern to match, None if unknown.
+    """
+    try:
+        parsed = sre_parse.parse(pattern)
+    except Exception:
+        return None
+
+    if parsed.state.flags & (re.IGNORECASE | re.VERBOSE):
+        return None
+
+    return required_literals_of(list(parsed))
+
+
+class Rule:
+    def __init__(self, pattern, repl, when=None, anchors=None):
+        self.pattern = pattern
+        self.repl = repl
+        self.when = when
+        self.regex = re.compile(pattern)
+
+        # a rule whose anchors are all absent from the text can not match and is skipped
+        if anchors is None:
+            anchors = required_literals(pattern)
+        self.anchors = set(anchors) if anchors else None
+
+
+class RuleSet:
+    """
+    Precompiled cleanup rules, applied in order with an Aho-Corasick prefilter over their anchors.
+
+    The result is the same as applying every rule with re.sub in sequence.
+    """
+
+    def __init__(self, name, rules):
+        self.name = name
+        self.rules = [
+            Rule(
+                r["pattern"],
+                r["repl"],
+                when=r.get("when", None),
+                anchors=r.get("anchors", None),
+            )
+            for r in rules
+        ]
+
+        # with pyahocorasick the anchors are found in one pass over the text, otherwise each
+        # rule checks its own anchors with str.find, still far cheaper than running the regex
+        self.matcher = None
+        if has_native:
+            anchors = set()
+            for rule in self.rules:
+                if rule.anchors:
+                    anchors |= rule.anchors
+            self.matcher = NativeAhoCorasick(anchors)
+
+        self.version = hashlib.sha1(orjson.dumps(rules)).hexdigest()[:12]
+
+    def apply(self, txt, **flags):
+        present = self.matcher.find_all(txt) if self.matcher is not None else None
+
+        for rule in self.rules:
+            if rule.when is not None and not flags.get(rule.when, False):
+                continue
+
+            if rule.anchors is not None:
+                if present is not None:
+                    if rule.anchors.isdisjoint(present):
+                        continue
+                elif not any(a in txt for a in rule.anchors):
+                    continue
+
+            txt, n = rule.regex.subn(rule.repl, txt)
+            if n > 0 and present is not None:
+                # the replacement may add or join anchors
+                present = self.matcher.find_all(txt)
+
+        return txt
+
+
+rule_sets = {}
+
+
+def load_rule_set(name, rules_fp=None) -> RuleSet:
+    """
+    Load a rule set by name, several sets can be chained with a list of names, they are cached per process.
+    """
+    rules_fp = rules_fp if rules_fp else default_rules_fp
+    names = name if isinstance(name, list) else [name]
+
+    key = (rules_fp, tuple(names))
+    rule_set = rule_sets.get(key, None)
+    if rule_set is None:
+        with open(rules_fp, "rb") as fp:
+            config = orjson.loads(fp.read())
+
+        rules = []
+        for n in names:
+            rules.extend(config["rule_sets"][n])
+
+        rule_set = RuleSet("+".join(names), rules)
+        rule_sets[key] = rule_set
+
+    return rule_set
+
+
+def apply_rules(name, rules_fp, txt, **flags):
+    """
+    Apply a rule set by name, picklable with functools.partial so it can run in a process pool.
+    """
+    return load_rule_set(name, rules_fp).apply(txt, **flags)
@@ -0,0 +1,143 @@
+import os
+import threading
+import time
+
+import orjson
+
+checkpoint_name = ".checkpoint.json"
+# the downloaded links, one per line, appended as they are downloaded
+downloaded_name = ".checkpoint.downloaded"
+
+
+class CrawlCheckpoint:
+    """
+    Progress of the crawl of one item, kept in the article dir until the crawl completes.
+
+    It records the update queue found so far, how deep the profile was scrolled and which
+    links were downloaded, so an interrupted crawl can be resumed with --resume.
+
+    The scan is saved as json on each scroll, a downloaded link is appended to a log, so a long
+    backfill does not write the whole queue again per article.
+    """
+
+    def __init__(self, article_path, link=None):
+        self.fp = os.path.join(article_path, checkpoint_name)
+        self.downloaded_fp = os.path.join(article_path, downloaded_name)
+        self.link = link
+        self.lock = threading.Lock()
+
+        self.state = self.empty_state()
+        self.downloaded = set()
+        if os.path.exists(self.fp):
+            with open(self.fp, "rb") as f:
+                c = f.read()
+                if len(c) > 0:
+                    state = orjson.loads(c)
+                    # a checkpoint of another profile in the same dir is ignored
+                    if state.get("link", None) == link:
+                        self.state = state
+                        self.downloaded = set(self.load_downloaded())
+                        # older checkpoints kept the links in the json, they are moved to the log
+                        old_downloaded = [x for x in state.pop("downloaded", []) if x not in self.downloaded]
+                        if old_downloaded:
+                            with open(self.downloaded_fp, "a", encoding="utf-8") as f:
+                                f.writelines(f"{x}\n" for x in old_downloaded)
+                            self.downloaded.update(old_downloaded)
+                            self.write_state()
+
+    def empty_state(self):
+        return {
+            "link": self.link,
+            "started_at": time.time(),
+            "scanned": False,
+            "scroll_height": 0,
+            "scrolls": 0,
+            "update_items": [],
+        }
+
+    def load_downloaded(self):
+        if not os.path.exists(self.downloaded_fp):
+            return []
+
+        with open(self.downloaded_fp, "r", encoding="utf-8") as f:
+            return [line.strip() for line in f if line.strip()]
+
+    @property
+    def exists(self):
+        return self.state["scrolls"] > 0 or self.state["scanned"] or len(self.downloaded) > 0
+
+    @property
+    def scanned(self):
+        return self.state["scanned"]
+
+    @property
+    def scroll_height(self):
+        return self.state["scroll_height"]
+
+    @property
+    def update_items(self):
+        return self.state["update_items"]
+
+    def reset(self):
+        with self.lock:
+            self.state = self.empty_state()
+            self.downloaded = set()
+            self.remove_files()
+
+    def save_scan(self, update_items, scroll_height: int, done: bool = False):
+        with self.lock:
+            self.state["update_items"] = merge_update_items(self.state["update_items"], update_items)
+            self.state["scroll_height"] = max(self.state["scroll_height"], scroll_height)
+            self.state["scrolls"] += 1
+            self.state["scanned"] = done
+        self.save()
+
+    def is_downloaded(self, link):
+        with self.lock:
+            return link in self.downloaded
+
+    def mark_downloaded(self, link):
+        with self.lock:
+            if link in self.downloaded:
+                return
+            self.downloaded.add(link)
+            if not os.path.exists(self.fp):
+                # the log alone is not a checkpoint, the scan is written first
+                self.write_state()
+            with open(self.downloaded_fp, "a", encoding="utf-8") as f:
+                f.write(f"{link}\n")
+
+    def write_state(self):
+        # with the lock held, written aside and moved into place, a crash never leaves half a checkpoint
+        tmp_fp = f"{self.fp}.{os.getpid()}_{threading.get_ident()}.tmp"
+        with open(tmp_fp, "wb") as f:
+            f.write(orjson.dumps(self.state))
+        os.replace(tmp_fp, self.fp)
+
+    def save(self):
+        with self.lock:
+            self.write_state()
+
+    def remove_files(self):
+        for fp in [self.fp, self.downloaded_fp]:
+            if os.path.exists(fp):
+                os.remove(fp)
+
+    def clear(self):
+        """
+        The crawl completed, the next one starts over.
+        """
+        with self.lock:
+            self.remove_files()
+
+
+def merge_update_items(items, new_items):
+    seen = set([item["link"] for item in items])
+    merged = list(items)
+    for item in new_items:
+        if item["link"] in seen:
+            continue
+        seen.add(item["link"])
+        merged.append(item)
+
+    return merged
@@ -0,0 +1,114 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import orjson
+from termcolor import colored
+
+
+class CrawlHistory:
+    """
+    Updates found and seconds taken by the last crawl of each item, they order the next crawl.
+    """
+
+    def __init__(self, fp):
+        self.fp = fp
+        self.lock = threading.Lock()
+
+        self.items = {}
+        if os.path.exists(fp):
+            with open(fp, "rb") as f:
+                c = f.read()
+                if len(c) > 0:
+                    self.items = orjson.loads(c)
+
+    def get(self, key):
+        with self.lock:
+            return self.items.get(key, None)
+
+    def record(self, key, updates: int, seconds: float):
+        with self.lock:
+            self.items[key] = {
+                "updates": updates,
+                "seconds": round(seconds, 1),
+                "at": int(time.time()),
+            }
+
+    def save(self):
+        path = Path(self.fp).parent
+        if not path.exists():
+            os.makedirs(path)
+
+        with self.lock:
+            c = orjson.dumps(self.items, option=orjson.OPT_INDENT_2)
+
+        with open(self.fp, "wb") as f:
+            f.write(c)
+
+
+class CrawlTask:
+    def __init__(self, key, run, cache: bool = True):
+        # run(drv) -> result
+        self.key = key
+        self.run = run
+        self.cache = cache
+
+
+class CrawlScheduler:
+    """
+    Crawls config items concurrently on a bounded pool of browser sessions.
+
+    Cached items with few updates last time go first so most authors are done early. Items are
+    merged in config order, a group, i.e. the subitems of an item, once all its tasks are done.
+    """
+
+    def __init__(self, pool, history: CrawlHistory, count_updates=len):
+        self.pool = pool
+        self.history = history
+        self.count_updates = count_updates
+
+    def priority(self, task: CrawlTask):
+        h = self.history.get(task.key)
+        # items never crawled before go after the known ones
+        updates = h["updates"] if h else float("inf")
+        seconds = h["seconds"] if h else 0.0
+        return (0 if task.cache else 1, updates, seconds)
+
+    def run_task(self, task: CrawlTask):
+        start_time = time.time()
+        try:
+            with self.pool.session() as drv:
+                result = task.run(drv)
+        except Exception as ex:
+            print(colored(f"crawl {task.key} failed: {ex}", "red"))
+            return None
+
+        self.history.record(task.key, self.count_updates(result), time.time() - start_time)
+        return result
+
+    def run(self, groups):
+        """
+        groups: [(tasks, merge)], merge(results) is called on this thread, in the order of the groups,
+        with the results of the tasks in their order, None for a failed task.
+
+        Tasks of the same key, e.g. a profile listed on its own and as a subitem, write the same
+        article dir, only the first one is crawled and the others get its result.
+        """
+        unique = {}
+        for tasks, _ in groups:
+            for task in tasks:
+                unique.setdefault(task.key, task)
+
+        futures = {}
+        with ThreadPoolExecutor(max_workers=self.pool.size) as executor:
+            for task in sorted(unique.values(), key=self.priority):
+                futures[task.key] = executor.submit(self.run_task, task)
+
+            # the next groups keep crawling while one is merged
+            for tasks, merge in groups:
+                results = [futures[task.key].result() for task in tasks]
+                merge(results)
+
+        self.history.save()
@@ -1,10 +1,8 @@
 import argparse
 import os
 import re
-import time
 import glob
 import datetime as dttm
-from bs4 import BeautifulSoup
 
 # import pandas as pd
 # import requests
@@ -29,6 +27,13 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.common.by import By
 
+from article_filter import ArticleFilter, compile_filter
+from article_manifest import get_manifest
+from page_ready import PageReadiness, get_timeout, wait_loaded, wait_scrolled
+from html_parser import parse_html, set_backend
+from metrics import incr, metrics, span
+from throttle import Throttle, throttle_acquire, throttle_observe
+
 group_num: int = 2000
 
 
@@ -100,6 +105,12 @@ def create_drive(use_edge_web_driver: bool):
 
 driver = None
 
+# adaptive waits instead of fixed sleeps, see --adaptive
+page_ready = None
+
+# request pacing per domain, see --throttle
+throttle = None
+
 valid_size = 250
 # # "text/html; charset=utf-8"
 
@@ -147,7 +158,7 @@ def scroll_till_end():
         driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
 
         # Wait to load page
-        time.sleep(SCROLL_PAUSE_TIME)
+        wait_scrolled(page_ready, driver, last_height, SCROLL_PAUSE_TIME)
 
         # Calculate new scroll height and compare with last scroll height
         new_height = driver.execute_script("return document.body.scrollHeight")
@@ -166,16 +177,16 @@ def get_html_from_file(fp):
 def get_articles_data_wp(html, flter):
     data = []
 
-    soup = BeautifulSoup(html, "html.parser")
-    # print(soup.title.text)
+    doc = parse_html(html)
+    # print(doc.select_one("title").text)
 
-    uls = soup.find_all("ul", class_="album__list js_album_list")
+    uls = doc.select("ul.album__list.js_album_list")
     if not uls:
         return data
 
     ul = uls[0]
-    articles = ul.find_all(
-        "li", class_="album__list-item js_album_item js_wx_tap_highlight wx_tap_cell"
+    articles = ul.select(
+        "li.album__list-item.js_album_item.js_wx_tap_highlight.wx_tap_cell"
     )
     for article in articles:
         item = {}
@@ -208,23 +219,23 @@ def get_articles_data_tt(html, flter, is_article: bool):
     data = []
 
     try:
-        soup = BeautifulSoup(html, "html.parser")
-        # print(soup.title.text)
+        doc = parse_html(html)
+        # print(doc.select_one("title").text)
 
         cls = (
             "profile-article-card-wrapper" if is_article else "profile-wtt-card-wrapper"
         )
 
-        articles = soup.find_all("div", class_=cls)
+        articles = doc.select(f"div.{cls}")
         for article in articles:
             item = {}
 
             if is_article:
-                link_el = article.find("a", class_="title")
+                link_el = article.select_one("a.title")
                 link = link_el.attrs["href"]
                 title = link_el.text
             else:
-                links = article.findAll("a", {"target": "_blank"})
+                links = article.select('a[target="_blank"]')
                 link_el = None
                 for i in range(1, len(links)):
                     link = links[i]
@@ -235,7 +246,8 @@ def get_articles_data_tt(html, flter, is_article: bool):
                 link = link_el.attrs["href"]
                 # title = link_el.text
                 # title = ""
-                title = link_el.contents[0]
+                # the leading text, None when it starts with an element
+                title = link_el.first_text()
 
             if isinstance(title, str):
                 valid = check_if_filtered(flter, title)
@@ -260,17 +272,19 @@ def get_articles_data_shuqi(html, flter, is_article: bool):
     data = []
 
     try:
-        soup = BeautifulSoup(html, "html.parser")
-        # print(soup.title.text)
+        doc = parse_html(html)
+        # print(doc.select_one("title").text)
 
         cls = "ellipsis line level-0"
 
-        articles = soup.find_all("li", class_=cls)
+        articles = doc.select("li." + ".".join(cls.split()))
         for article in articles:
             item = {}
 
             title = article.text
             idx = article.attrs["data-index"]
+            if flter and not check_if_filtered(flter, title):
+                continue
 
             item = {
                 "title": title,
@@ -285,25 +299,9 @@ def get_articles_data_shuqi(html, flter, is_article: bool):
     return data
 
 
-def check_if_filtered(flter, title):
-    valid = False
-    if title and isinstance(title, str):
-        if not flter:
-            valid = True
-        else:
-            if isinstance(flter, list):
-                for f in flter:
-                    v = title.find(f) >= 0
-                    if v:
-                        valid = True
-                        break
-                    pass
-                pass
-            else:
-                valid = title.find(flter) >= 0
-    else:
-        pass
-    return valid
+def check_if_filtered(flter: ArticleFilter, title):
+    # flter is compiled once per config item by get_all_update_items
+    return flter.match_title(title)
 
 
 toutiao_www_link = "https://www.toutiao.com"
@@ -322,32 +320,37 @@ def get_update_items(
     is_article: bool,
     cache: bool = True,
 ):
-    if origin == "tt":
-        articles_data = get_articles_data_tt(html, flter=flter, is_article=is_article)
-    elif origin == "wp":
-        articles_data = get_articles_data_wp(html, flter=flter)
-    elif origin == "shuqi":
-        articles_data = get_articles_data_shuqi(
-            html, flter=flter, is_article=is_article
-        )
-    else:
-        assert False, ""
+    incr("page_source_bytes", len(html))
+    with span("parse"):
+        if origin == "tt":
+            articles_data = get_articles_data_tt(
+                html, flter=flter, is_article=is_article
+            )
+        elif origin == "wp":
+            articles_data = get_articles_data_wp(html, flter=flter)
+        elif origin == "shuqi":
+            articles_data = get_articles_data_shuqi(
+                html, flter=flter, is_article=is_article
+            )
+        else:
+            assert False, ""
 
     # reversed_articles_data = list(reversed(articles_data))
     reversed_articles_data = articles_data
 
+    manifest = get_manifest(article_path)
+
     update_items = []
     for item in reversed_articles_data:
         # title = item["title"]
         idx = item["idx"]
 
         updated = False
-        article_fp = f"{article_path}/{idx}.txt"
-        if os.path.exists(article_fp):
+        fs = manifest.size(idx)
+        if fs is not None:
             if cache:
                 pass
             else:
-                fs = os.path.getsize(article_fp)
                 if fs < valid_size:
                     updated = True
             pass
@@ -375,12 +378,16 @@ def get_all_update_items(
     sort_reversed=False,
     max_checks: int = 0,
 ):
+    flter = compile_filter(flter)
+
     # r = requests.get(link, proxies=proxy)
     # # r.encoding = "utf-8"
     # html = r.text
-    driver.get(link)
-    driver.implicitly_wait(2.0)
-    time.sleep(2.0)
+    with span("page_load"):
+        driver.get(link)
+        driver.implicitly_wait(2.0)
+        wait_loaded(page_ready, driver, 2.0)
+    incr("pages")
 
     SCROLL_PAUSE_TIME = 1.0
 
@@ -392,12 +399,15 @@ def get_all_update_items(
     last_checks = 0
     while True:
         # Scroll down to bottom
-        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+        with span("scroll"):
+            driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
 
-        # Wait to load page
-        time.sleep(SCROLL_PAUSE_TIME)
+            # Wait to load page
+            wait_scrolled(page_ready, driver, last_height, SCROLL_PAUSE_TIME)
+        incr("scrolls")
 
-        html = driver.page_source
+        with span("page_source"):
+            html = driver.page_source
         all_items, update_items = get_update_items(
             article_path,
             flter,
@@ -445,7 +455,8 @@ def get_all_update_items(
         pass
 
     # input("press enter to continue\n")
-    html = driver.page_source
+    with span("page_source"):
+        html = driver.page_source
     all_items, update_items = get_update_items(
         article_path,
         flter,
@@ -470,9 +481,12 @@ def download_link(
     is_article: bool,
     cache: bool = True,
 ):
+    manifest = get_manifest(os.path.dirname(article_fp))
+    article_id = Path(article_fp).stem
+
     if not cache:
-        if os.path.exists(article_fp):
-            fs = os.path.getsize(article_fp)
+        fs = manifest.size(article_id)
+        if fs is not None:
             if fs > valid_size:
                 print(
                     colored(
@@ -480,6 +494,7 @@ def download_link(
                         "green",
                     )
                 )
+                incr("link_cache_hits")
                 return
 
             print(
@@ -491,55 +506,61 @@ def download_link(
             pass
         pass
 
-    driver.get(link)
+    incr("link_cache_misses")
+    throttle_acquire(throttle, link)
+    with span("fetch"):
+        driver.get(link)
 
-    time.sleep(1.0)
-    # driver.implicitly_wait(0.1)
+        wait_loaded(page_ready, driver, 1.0)
+        # driver.implicitly_wait(0.1)
 
-    txt = ""
-    meta = ""
-    try:
-
-        WebDriverWait(driver, 2).until(
-            EC.presence_of_element_located((By.TAG_NAME, "body"))
-        )
-        f = driver.find_element(
-            By.XPATH, value='//*[@id="app"]/div[1]/div[3]/div[1]/iframe'
-        )
-        m = f.find_element(By.XPATH, value="/html/body")
-        # meta = m.text
+        txt = ""
         meta = ""
-    except Exception as ex:
-        print(link, title, ex)
+        try:
 
-    content = None
+            WebDriverWait(driver, get_timeout(page_ready, driver, "load", 2)).until(
+                EC.presence_of_element_located((By.TAG_NAME, "body"))
+            )
+            f = driver.find_element(
+                By.XPATH, value='//*[@id="app"]/div[1]/div[3]/div[1]/iframe'
+            )
+            m = f.find_element(By.XPATH, value="/html/body")
+            # meta = m.text
+            meta = ""
+        except Exception as ex:
+            print(link, title, ex)
 
-    try:
-        content = m.text
-    except Exception as ex:
-        print(link, title, ex)
-        pass
+        content = None
 
-    if content is None:
         try:
-            m = driver.find_element(By.CLASS_NAME, value="weitoutiao-html")
-            if m is not None:
-                content = m.text
-        except Exception:
+            content = m.text
+        except Exception as ex:
+            print(link, title, ex)
             pass
 
-    if content is None:
-        try:
-            m = driver.find_element(By.CLASS_NAME, value="article-content")
-            if m is not None:
-                content = m.text
-        except Exception:
-            pass
+        if content is None:
+            try:
+                m = driver.find_element(By.CLASS_NAME, value="weitoutiao-html")
+                if m is not None:
+                    content = m.text
+            except Exception:
+                pass
 
+        if content is None:
+            try:
+                m = driver.find_element(By.CLASS_NAME, value="article-content")
+                if m is not None:
+                    content = m.text
+            except Exception:
+                pass
+    throttle_observe(throttle, link, text=content)
     if content is None:
         print("invalid text:", link, title)
         return ""
 
+    incr("fetched_selenium")
+    incr("article_bytes", len(content.encode("utf-8")))
+
     try:
         # path = "E:\\downloads\\w.png"
         # with open(path, "wb") as fp:
@@ -553,20 +574,21 @@ def download_link(
             txt = f"{meta}\n{content}\n\n\n"
 
         updated = True
-        if os.path.exists(article_fp):
-            txt_exist = get_html_from_file(article_fp)
-            if len(txt) > len(txt_exist):
+        length_exist = manifest.length(article_id)
+        if length_exist is not None:
+            if len(txt) > length_exist:
                 updated = True
             else:
                 updated = False
 
         if updated:
-            with open(article_fp, "w", encoding="utf-8") as fp:
-                # fp.write(r.text)
-                fp.write(txt)
-                pass
+            with span("save"):
+                with open(article_fp, "w", encoding="utf-8") as fp:
+                    # fp.write(r.text)
+                    fp.write(txt)
+                    pass
 
-            fs = os.path.getsize(article_fp)
+            fs = manifest.record(article_id, txt, item={"link": link, "title": title})
             color = "green" if fs > valid_size else "red"
             print(
                 colored(
@@ -643,18 +665,19 @@ def generate_txts(
             local_idx_t = idx + 1
             idx_t = local_idx_t + start_idx
 
-            if filter_original_text:
+            with span("clean"):
+                if filter_original_text:
+                    txt = re.sub(
+                        r"【原文】(.*?\n)*?(【\s*译文\s*】|【\s*原文华译\s*】|【\s*闲扯\s*】|【\s*解析\s*】|【\s*读解\s*】|【\s*华译\s*】)",
+                        r"【原文】\n 略\n\2",
+                        txt,
+                    )
+
                 txt = re.sub(
-                    r"【原文】(.*?\n)*?(【\s*译文\s*】|【\s*原文华译\s*】|【\s*闲扯\s*】|【\s*解析\s*】|【\s*读解\s*】|【\s*华译\s*】)",
-                    r"【原文】\n 略\n\2",
+                    r"立志花15年讲完《资治通鉴》(.*\n)*谋略那些事.*\n",
+                    r"",
                     txt,
                 )
-
-            txt = re.sub(
-                r"立志花15年讲完《资治通鉴》(.*\n)*谋略那些事.*\n",
-                r"",
-                txt,
-            )
             if len(txt) > 0:
                 valid_texts = re.search(r"\S", txt)
                 if valid_texts:
@@ -694,7 +717,8 @@ def write_txts(articles_path, name, group_idx, group_txts):
             "w",
             encoding="utf-8",
         ) as fp:
-            fp.write(txts)
+            with span("write"):
+                fp.write(txts)
             c = idx - last_idx + (1 if last_idx == 1 else 0)
             last_idx = idx
             print(colored(f"{fn} generated from {c} txts", "green"))
@@ -710,7 +734,8 @@ def get_articles_items(article_path):
         if os.path.isfile(file_name):
             file_base_name, ext = os.path.splitext(os.path.basename(file_name))
             with open(file_name, "r", encoding="utf-8") as fp:
-                txt = fp.read()
+                with span("read"):
+                    txt = fp.read()
 
                 txt = re.sub(r"\n{5,}", r"", txt)
 
@@ -763,6 +788,28 @@ def main():
     # parser.add_argument("-s", "--scrape", help="scrape", action="store_true")
     # # parser.add_argument("-e", "--edge", help="use edge", action="store_true")
     parser.add_argument("-r", "--chrome", help="use chrome", action="store_true")
+    parser.add_argument(
+        "--throttle",
+        help="pace the article requests per domain, slower on login walls and rate limits, "
+        "the rates are kept in .torextrader/throttle.json",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--adaptive",
+        help="wait on page readiness signals instead of fixed sleeps",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--parser",
+        default=None,
+        type=str,
+        help="html parser, selectolax, lxml or bs4, defaults to the fastest installed",
+    )
+    parser.add_argument(
+        "--metrics",
+        help="write a json run report with the time per phase and a prometheus dump to .torextrader/metrics",
+        action="store_true",
+    )
 
     # parser.add_argument(
     #     "-c",
@@ -777,9 +824,17 @@ def main():
     # use_edge_web_driver = args.edge
     use_edge_web_driver = not args.chrome
 
-    global driver
+    global driver, page_ready, throttle
     driver = create_drive(use_edge_web_driver)
 
+    set_backend(args.parser)
+
+    if args.adaptive:
+        page_ready = PageReadiness()
+
+    if args.throttle:
+        throttle = Throttle()
+
     nocache = False
     is_article = True
     include_title = True
@@ -830,9 +885,20 @@ def main():
 
     write_txts(articles_path, name, grp_idxs, grp_txts)
 
+    if page_ready is not None:
+        page_ready.save()
+
+    if throttle is not None:
+        throttle.save()
+        throttle.report()
+
     driver.quit()
 
+    if args.metrics:
+        metrics.save("download_shuqi")
+
     pass
 
 
-main()
+if __name__ == "__main__":
+    main()
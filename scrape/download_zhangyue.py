@@ -1,10 +1,9 @@
 import argparse
 import os
 import re
-import time
+from functools import partial
 import glob
 import datetime as dttm
-from bs4 import BeautifulSoup
 
 # import pandas as pd
 # import requests
@@ -29,6 +28,18 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.common.by import By
 
+from article_filter import ArticleFilter, compile_filter, get_filter_suffix
+from article_manifest import get_manifest
+from cleanup_rules import apply_rules, load_rule_set
+from clean_pool import clean_texts
+from volume_writer import VolumeWriter
+from text_cache import TextCache, clean_version, get_text_cache
+from page_ready import PageReadiness, get_timeout, wait_loaded, wait_scrolled
+from html_parser import parse_html, set_backend
+from metrics import incr, metrics, span
+from tab_prefetch import TabPrefetcher
+from throttle import Throttle, throttle_acquire, throttle_observe
+
 group_num: int = 2000
 
 
@@ -100,7 +111,16 @@ def create_drive(use_edge_web_driver: bool):
 
 driver = None
 
+# adaptive waits instead of fixed sleeps, see --adaptive
+page_ready = None
+
+# request pacing per domain, see --throttle
+throttle = None
+
 valid_size = 250
+
+# cleanup rules config, see --rules
+rules_fp = None
 # # "text/html; charset=utf-8"
 
 # h = html2text.HTML2Text()
@@ -147,7 +167,7 @@ def scroll_till_end():
         driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
 
         # Wait to load page
-        time.sleep(SCROLL_PAUSE_TIME)
+        wait_scrolled(page_ready, driver, last_height, SCROLL_PAUSE_TIME)
 
         # Calculate new scroll height and compare with last scroll height
         new_height = driver.execute_script("return document.body.scrollHeight")
@@ -166,16 +186,16 @@ def get_html_from_file(fp):
 def get_articles_data_wp(html, flter):
     data = []
 
-    soup = BeautifulSoup(html, "html.parser")
-    # print(soup.title.text)
+    doc = parse_html(html)
+    # print(doc.select_one("title").text)
 
-    uls = soup.find_all("ul", class_="album__list js_album_list")
+    uls = doc.select("ul.album__list.js_album_list")
     if not uls:
         return data
 
     ul = uls[0]
-    articles = ul.find_all(
-        "li", class_="album__list-item js_album_item js_wx_tap_highlight wx_tap_cell"
+    articles = ul.select(
+        "li.album__list-item.js_album_item.js_wx_tap_highlight.wx_tap_cell"
     )
     for article in articles:
         item = {}
@@ -208,23 +228,23 @@ def get_articles_data_tt(html, flter, is_article: bool):
     data = []
 
     try:
-        soup = BeautifulSoup(html, "html.parser")
-        # print(soup.title.text)
+        doc = parse_html(html)
+        # print(doc.select_one("title").text)
 
         cls = (
             "profile-article-card-wrapper" if is_article else "profile-wtt-card-wrapper"
         )
 
-        articles = soup.find_all("div", class_=cls)
+        articles = doc.select(f"div.{cls}")
         for article in articles:
             item = {}
 
             if is_article:
-                link_el = article.find("a", class_="title")
+                link_el = article.select_one("a.title")
                 link = link_el.attrs["href"]
                 title = link_el.text
             else:
-                links = article.findAll("a", {"target": "_blank"})
+                links = article.select('a[target="_blank"]')
                 link_el = None
                 for i in range(1, len(links)):
                     link = links[i]
@@ -235,7 +255,8 @@ def get_articles_data_tt(html, flter, is_article: bool):
                 link = link_el.attrs["href"]
                 # title = link_el.text
                 # title = ""
-                title = link_el.contents[0]
+                # the leading text, None when it starts with an element
+                title = link_el.first_text()
 
             if isinstance(title, str):
                 valid = check_if_filtered(flter, title)
@@ -256,25 +277,9 @@ def get_articles_data_tt(html, flter, is_article: bool):
     return data
 
 
-def check_if_filtered(flter, title):
-    valid = False
-    if title and isinstance(title, str):
-        if not flter:
-            valid = True
-        else:
-            if isinstance(flter, list):
-                for f in flter:
-                    v = title.find(f) >= 0
-                    if v:
-                        valid = True
-                        break
-                    pass
-                pass
-            else:
-                valid = title.find(flter) >= 0
-    else:
-        pass
-    return valid
+def check_if_filtered(flter: ArticleFilter, title):
+    # flter is compiled once per config item by get_all_update_items
+    return flter.match_title(title)
 
 
 toutiao_www_link = "https://www.toutiao.com"
@@ -293,18 +298,24 @@ def get_update_items(
     is_article: bool,
     cache: bool = True,
 ):
-    if origin == "tt":
-        articles_data = get_articles_data_tt(html, flter=flter, is_article=is_article)
-    elif origin == "wp":
-        articles_data = get_articles_data_wp(html, flter=flter)
-    elif origin == "zy":
-        articles_data = []
-    else:
-        assert False, ""
+    incr("page_source_bytes", len(html))
+    with span("parse"):
+        if origin == "tt":
+            articles_data = get_articles_data_tt(
+                html, flter=flter, is_article=is_article
+            )
+        elif origin == "wp":
+            articles_data = get_articles_data_wp(html, flter=flter)
+        elif origin == "zy":
+            articles_data = []
+        else:
+            assert False, ""
 
     # reversed_articles_data = list(reversed(articles_data))
     reversed_articles_data = articles_data
 
+    manifest = get_manifest(article_path)
+
     update_items = []
     for item in reversed_articles_data:
         link = item["link"]
@@ -330,12 +341,11 @@ def get_update_items(
             assert False, ""
 
         updated = False
-        article_fp = f"{article_path}/{link_num}.txt"
-        if os.path.exists(article_fp):
+        fs = manifest.size(link_num)
+        if fs is not None:
             if cache:
                 pass
             else:
-                fs = os.path.getsize(article_fp)
                 if fs < valid_size:
                     updated = True
             pass
@@ -363,12 +373,16 @@ def get_all_update_items(
     sort_reversed=False,
     max_checks: int = 0,
 ):
+    flter = compile_filter(flter)
+
     # r = requests.get(link, proxies=proxy)
     # # r.encoding = "utf-8"
     # html = r.text
-    driver.get(link)
-    driver.implicitly_wait(2.0)
-    time.sleep(2.0)
+    with span("page_load"):
+        driver.get(link)
+        driver.implicitly_wait(2.0)
+        wait_loaded(page_ready, driver, 2.0)
+    incr("pages")
 
     if sort_reversed:
         cls = "album-sort__wrp js_album_sort"
@@ -411,7 +425,7 @@ def get_all_update_items(
                 # driver.execute_script("arguments[0].click();", el)
                 el.click()
 
-                time.sleep(1.0)
+                wait_loaded(page_ready, driver, 1.0)
             else:
                 print(f"{cls} not found")
         # except Exception as ex:
@@ -430,12 +444,15 @@ def get_all_update_items(
     last_checks = 0
     while True:
         # Scroll down to bottom
-        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+        with span("scroll"):
+            driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
 
-        # Wait to load page
-        time.sleep(SCROLL_PAUSE_TIME)
+            # Wait to load page
+            wait_scrolled(page_ready, driver, last_height, SCROLL_PAUSE_TIME)
+        incr("scrolls")
 
-        html = driver.page_source
+        with span("page_source"):
+            html = driver.page_source
         all_items, update_items = get_update_items(
             article_path,
             flter,
@@ -483,7 +500,8 @@ def get_all_update_items(
         pass
 
     # input("press enter to continue\n")
-    html = driver.page_source
+    with span("page_source"):
+        html = driver.page_source
     all_items, update_items = get_update_items(
         article_path,
         flter,
@@ -501,18 +519,41 @@ def get_all_update_items(
 
 def generate_txts(
     article_items,
+    writer: VolumeWriter,
     filter_original_text: bool = True,
     start_idx: int = 0,
+    rules="zhangyue",
+    cache: TextCache = None,
+    jobs: int = 1,
 ):
-    group_idx = []
-    group_txts = []
-    txts = ""
+    rule_set = load_rule_set(rules, rules_fp)
+
+    # cleaned texts of unchanged articles are reused as long as the rules are the same
+    version = clean_version(rule_set, filter_original_text=filter_original_text)
+    # only the cleaned texts of these articles are loaded
+    hashes = [item.get("hash", None) for item in article_items]
+    cleaned = cache.get_cleaned(version, hashes) if cache is not None else {}
+    new_cleaned = {}
+
+    dirty_txts = []
+    for item in article_items:
+        if item.get("hash", None) in cleaned:
+            continue
+        txt = item["txt"]
+        if txt is not None:
+            dirty_txts.append(txt)
+
+    # the rest are cleaned in order, by a process pool when jobs > 1
+    clean_fn = partial(apply_rules, rules, rules_fp, filter_original_text=filter_original_text)
+    dirty_cleaned = clean_texts(clean_fn, dirty_txts, jobs=jobs)
 
     for idx, item in enumerate(article_items):
         # link = item["link"]
         # title = item["title"]
 
-        txt = item["txt"]
+        # the text of an article cleaned before is not read
+        txt_hash = item.get("hash", None)
+        txt = cleaned[txt_hash] if txt_hash in cleaned else item["txt"]
 
         # if txt.find("张教主的韭阳神功") > -1:
         #     pass
@@ -521,652 +562,70 @@ def generate_txts(
             local_idx_t = idx + 1
             idx_t = local_idx_t + start_idx
 
-            if filter_original_text:
-                txt = re.sub(
-                    r"【原文】(.*?\n)*?(【\s*译文\s*】|【\s*原文华译\s*】|【\s*闲扯\s*】|【\s*解析\s*】|【\s*读解\s*】|【\s*华译\s*】)",
-                    r"【原文】\n 略\n\2",
-                    txt,
-                )
-
-            txt = re.sub(
-                r"(材料：|【材料】)(.*?\n)*?(\s*译文：\s*|【译文】)",
-                r"\1\n 略\n\3",
-                txt,
-            )
-
-            txt = re.sub(
-                r"(《资治通鉴》原文)(.*?\n)*?(\s*译文：\s*)",
-                r"\1\n 略\n\3",
-                txt,
-            )
-
-            txt = re.sub(
-                r"要看(全文)*的关注微信公众号：.*?\n(阅读：.*?\n)*",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"关注微信公众号：.*?\n(阅读：.*?\n)*",
-                r"",
-                txt,
-            )
-
-            txt = re.sub(
-                r"关注公众号.*?\n",
-                r"",
-                txt,
-            )
-
-            txt = re.sub(
-                r"蔡根谈解读资治通鉴三个特点：1､尽量白话文（译文主要摘抄自《华杉讲透资治通鉴》一书；2､借古说今，会更多在营销管理领域进行解读；3､只摘比较典型的片段，不做长篇连载。",
-                r"",
-                txt,
-            )
-
-            txt = re.sub(
-                r"点赞关注不迷路，可关注微信公众号:通鉴风云，防止失联，后期更多精彩文章(。)*",
-                r"",
-                txt,
-            )
-
-            txt = re.sub(
-                r"读资治通鉴，悟人生哲理。笔者自17年研究资治通鉴迄今已是六年四遍，将300万字神书浓缩为18万字读书笔记，皆是智慧经验，学习前人经验少走弯路回头路，感叹古今多少事都付笑谈中。感谢大家关注支持！",
-                r"",
-                txt,
-            )
-
-            txt = re.sub(
-                r"编者按：.*?\n",
-                r"",
-                txt,
-            )
-
-            txt = re.sub(
-                r"#.*?#",
-                r"",
-                txt,
-            )
-
-            txt = re.sub(
-                r"关注我，带你成为学霸，走向人生巅峰！",
-                r"",
-                txt,
-            )
-
-            txt = re.sub(
-                r"点击阅读原文.*?\n",
-                r"",
-                txt,
-            )
-
-            txt = re.sub(
-                r"【鸣谢】.*?\n",
-                r"",
-                txt,
-            )
-
-            txt = re.sub(
-                r"作者简介：.*?\n",
-                r"",
-                txt,
-            )
-
-            txt = re.sub(
-                r"Original 刘志强2018 小学生小强",
-                r"",
-                txt,
-            )
-
-            txt = re.sub(
-                r"读资治通鉴，悟人生哲理.*?\n",
-                r"",
-                txt,
-            )
-
-            txt = re.sub(
-                r"欢迎与作者交流(.*\n)*",
-                r"",
-                txt,
-            )
-
-            txt = re.sub(
-                r"欢迎和作者交流(.*\n)*",
-                r"",
-                txt,
-            )
-
-            txt = re.sub(
-                r"资治通鉴.*\n\d+.*\n企业经营.*\n\d+(.*\n)*",
-                r"",
-                txt,
-            )
-
-            txt = re.sub(
-                r"这是作者的第\d+篇原创文章，欢迎关注！.*\n",
-                r"",
-                txt,
-            )
-
-            txt = re.sub(
-                r"关注.*\n推荐(.*\n)*收藏.*\n分享.*\n",
-                r"",
-                txt,
-            )
-
-            txt = re.sub(
-                r"举报.*\n评论(.*\n)*",
-                r"",
-                txt,
-            )
-
-            txt = re.sub(
-                r"文章来自微信公众号：记忆承载。欢迎前往关注阅读全文。.*?\n",
-                r"",
-                txt,
-            )
-
-            txt = re.sub(
-                r"文章来自微信公众号.*关注阅读全文。.*?\n",
-                r"",
-                txt,
-            )
-
-            txt = re.sub(
-                r"原创 刘志强2018 小学生小强.*?\n",
-                r"",
-                txt,
-            )
-
-            txt = re.sub(
-                r"好消息！《资治通鉴读史悟道·卷贰》已经出版，点击即可雅购⬇*?\n",
-                r"",
-                txt,
-            )
-
-            txt = re.sub(
-                r"欢迎把本号设为星标(.*\n)*people underline.*\n",
-                r"",
-                txt,
-            )
-
-            txt = re.sub(
-                r"(更多精彩文章请|people underline)",
-                r"",
-                txt,
-            )
-
-            txt = re.sub(
-                r"敖让的净化号，无广告，更悟道！.*\n*(\d+)篇原创内容",
-                r"",
-                txt,
-            )
-
-            txt = re.sub(
-                r"(我|敖让)的备用号(.*\n)*敖让的净化号，无广告，更悟道！",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"(我|敖让)的备用号(.*\n)*（早关注，不迷路）",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"敖让的净化号，无广告，更悟道！",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"\n(欢迎把本号设为星标|敖让随笔|战国纵横|铁血前汉|秦并天下|更多精彩文章|后汉风云|三国争霸|收费文章)(.*\n)*people underline.*\n",
-                r"",
-                txt,
-            )
-
-            txt = re.sub(
-                r"(\d+)篇原创内容",
-                r"",
-                txt,
-            )
-
-            txt = re.sub(
-                r"Original (敖让|读史悟道) 资治通鉴读史悟道",
-                r"",
-                txt,
-            )
-
-            txt = re.sub(
-                r"Original 王上北 上北知行观",
-                r"",
-                txt,
-            )
-
-            txt = re.sub(
-                r"点击阅读作者更多文章：(.*\n)*",
-                r"",
-                txt,
-            )
-
-            txt = re.sub(
-                r"全品类优惠码：(.*\n)*",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"（全文完）(.*\n)*",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"历史解读，敖让的个人号，(.*\n)",
-                r"",
-                txt,
-            )
-
-            txt = re.sub(
-                r"更多精彩文章请(.*\n)*公众号",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                # r"(Editor's Note|公众号)",
-                r"Editor's Note",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"\n(铁血前汉|三国争霸|资治通鉴)\n(\d+)(.*\n)*(Read more|下一篇\n.*\n)",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"\n(铁血前汉|三国争霸|资治通鉴|敖让随笔)\n(\d+)",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"点击【阅读原文】.*\n",
-                r"",
-                txt,
-            )
-
-            txt = re.sub(
-                r"点击阅读读史悟道更多精彩文章(.*\n)*",
-                r"",
-                txt,
-            )
-
-            txt = re.sub(
-                r"(我|敖让)的备用号(：|，)早关注，不迷路.*\n.*",
-                r"",
-                txt,
-            )
-
-            txt = re.sub(
-                r"通告公示：.*\n.*",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"资治通鉴读史悟道(.*\n){,4}公众号",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"(我的备用号|备用小号|备用号)(.*\n){,4}公众号",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"(敖让的小店)(.*\n)*(小程序|Mini Program)",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"\d+.*\n 微信豆兑换(.*\n){,3}.*(微信豆兑换|\d+微信豆\))",
-                r"",
-                txt,
-            )
-
-            txt = re.sub(
-                r"(【冠名】|本文由读史悟道官方指定用茶)(.*\n).*共饮一壶茶",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"同读一本书.*(点击了解更多|共饮一壶茶)",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"视频原创：(.*\n){,6}.*【材料】",
-                r"【材料】",
-                txt,
-            )
-            txt = re.sub(
-                r"可试读(.*\n){,6}.*微信豆兑换",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"好消息(.*\n){,6}.*点击即可雅(阅|购)⬇",
-                r"",
-                txt,
-            )
-
-            txt = re.sub(
-                r"(.*\n)关注\n",
-                r"\1\n",
-                txt,
-            )
-            txt = re.sub(
-                r"喜欢此内容的人还喜欢(.*\n)*.*",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"(猜你喜欢：|阅读更多文章，可关注智圆行方读书|往期回顾|往期精彩|您的【点赞】是最好的鼓励！|更多文章，点击下方公众号名片)(.*\n){,10}.*",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"资治通鉴原文(.*\n)*.*译文：",
-                r"资治通鉴原文:\n略\n译文：",
-                txt,
-            )
-
-            txt = re.sub(
-                r"(看更多内容， 点击下方公众号关注|智圆行方读书\n分享读书心得，解读|未经授权，谢绝转载！)(.*\n){,8}.*公众号",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"(交流群只交流和扯淡，不提供训练服务。|推荐服务：|推荐社群：|服务内容：|推荐\d+大社群|\d+ 不要脸交流群|加V：)(.*\n){,10}.*",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"本文是付费阅读，上车(.*\n){0,2}堵住人性的漏洞=管理(.*\n)*.*(所有群，服务周期为一年。|(资治通鉴权谋\n\d+\n)?权谋\n\d+\n)",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"本文是付费阅读，上车(.*\n){0,2}",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"资治通鉴权谋\n\d+\n人情世故\n\d+\n送礼的艺术\n\d+\n",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"未经授权，(严禁|谢绝)转载！(.*\n)*.*推荐阅读(.*\n)*.*",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"(欢迎个人转发至朋友圈|点个【 在看 】)(.*\n)*.*个人观点，仅供参考",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"喜欢文章就帮忙给一个或吧↓↓个人观点，仅供参考.*",
-                r"",
-                txt,
-            )
-
-            txt = re.sub(
-                r"Original (.*) \1",
-                r"\1",
-                txt,
-            )
-            txt = re.sub(
-                r"——END——(.*\n)*",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"\n公众号\n",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"点击上方△蓝字△关注我.*\n每天为你深度解读《资治通鉴.*\n",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"点击下方关注我.*\n发送关键字.*\n",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"PS：.*\n如果你觉得上面内容还不过瘾(.*\n)*.*",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"PS：.*\n很多朋友问我有没有书出版(.*\n)*.*",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"PS：.*\n探花TV(.*\n)*.*",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"(点亮【 在看 】|您的【点赞】)(.*\n)*.*个人观点，仅供参考(.*\n)*.*",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"(最后，做一下我的《资治通鉴》解读专栏推广)(.*\n)*.*关注我，每天为你分享读史感悟(.*\n)*.*",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"(更多《资治通鉴》的*解读|观看更多内容，欢迎订阅我的专栏|最后给我的专栏做个推|最后，给我《资治通鉴》解读专栏)(.*\n)*.*关注我，每天为你分享读史感悟(.*\n)*.*",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"(做个专栏宣传|我的《资治通鉴》解读专栏|关注我，每天为你分享读史感悟。\n更多内容|更多《资治通鉴》解读内容，点击下方文章链接|关注我，每天为你分享读史.*\n往期内容)(.*\n)*.*",
-                r"",
-                txt,
-            )
-
-            txt = re.sub(
-                r"(关注我，每天为你分享读史感悟。|更多干货，关注“ 职场智谋 ” 微信公众号)",
-                r"",
-                txt,
-            )
-
-            if filter_original_text:
-                txt = re.sub(
-                    r"\n原文(.*?\n){,5}?(\n译文\s*)",
-                    r"\n原文\n 略\n\2",
-                    txt,
-                )
-
-            txt = re.sub(
-                r"点击上方蓝字关注我",
-                r"",
-                txt,
-            )
-
-            txt = re.sub(
-                r"(阅读更多文章|更多精彩内容)，请关注首发(.*\n)*.*",
-                r"",
-                txt,
-            )
-
-            txt = re.sub(
-                r"公众号【鉴史悟道】,通过历史故事的分解(.*\n)*.*",
-                r"",
-                txt,
-            )
-
-            txt = re.sub(
-                r"上北知行观\n不是每一次阅读，都能带来成长(.*\n)*.*",
-                r"",
-                txt,
-            )
-
-            txt = re.sub(
-                r"来都来了，点个在看再走吧(.*\n)*.*",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"【免责声明】文章描述过程、图片都来源于网络(.*\n)*.*",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"各位亲爱的读者，阅读此文前(.*\n)",
-                r"",
-                txt,
-            )
-
-            txt = re.sub(
-                r"专栏\n(.*\n){,5}查看\n",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r".{,8}\n\d+\n",
-                r"",
-                txt,
-            )
+            if txt_hash in cleaned:
+                cache.hits += 1
+            else:
+                with span("clean"):
+                    txt = next(dirty_cleaned)
+                if cache is not None and txt_hash is not None:
+                    new_cleaned[txt_hash] = txt
+                    cache.misses += 1
 
-            txt = re.sub(
-                r"点击下方关注我(.*\n)*内部资料领取方式在文末(.*\n)*谋略那些事.*\n",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"点击下方关注我(.*\n)*谋略那些事(.*\n)*启发当下学以致用(.*\n)*",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"(发个小广告|有很多朋友让我推荐)(.*\n)*价格不贵，一包华子而已，就能收获大佬的宝贵经验，很值！.*\n",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"(发个小广告|有很多朋友让我推荐)(.*\n)*这本书个人读了.*\n",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"点击下方关注我(.*\n)*谋略那些事.*\n",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"解读《资治通鉴》，通过历史迷雾，启发当下学以致用。.*\n",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"立志花15年讲完《资治通鉴》(.*\n)*谋略那些事.*\n",
-                r"",
-                txt,
-            )
             if len(txt) > 0:
                 valid_texts = re.search(r"\S", txt)
                 if valid_texts:
-                    txts += f"第{idx_t:04}章\n\n{txt}\n"
-
-                    if idx_t % group_num == 0:
-                        group_idx.append(local_idx_t)
-                        group_txts.append(txts)
-                        txts = ""
+                    writer.write_chapter(idx_t, f"第{idx_t:04}章\n\n{txt}\n")
                 pass
 
         pass
 
-    if txts:
-        group_idx.append(len(article_items) + start_idx)
-        group_txts.append(txts)
+    dirty_cleaned.close()
 
-    return group_idx, group_txts
+    if cache is not None:
+        cache.put_cleaned(version, new_cleaned)
+        cache.report()
 
+    return len(article_items) + start_idx
 
-def write_txts(articles_path, name, group_idx, group_txts):
-    last_idx = 1
-    for i, txts in enumerate(group_txts):
-        idx = group_idx[i]
-
-        # fn = f"{articles_path}/{last_idx:04}_{idx:04}_{name}"
-        # fn = f"{articles_path}/{last_idx:04}_{name}"
-        if last_idx > 1 or len(group_txts) > 1:
-            fn = f"{articles_path}/{last_idx:04}_{name}"
-        else:
-            fn = f"{articles_path}/{name}"
-
-        fn = f"{fn}.txt"
-
-        with open(
-            fn,
-            "w",
-            encoding="utf-8",
-        ) as fp:
-            fp.write(txts)
-            c = idx - last_idx + (1 if last_idx == 1 else 0)
-            last_idx = idx
-            print(colored(f"{fn} generated from {c} txts", "green"))
-        pass
-    pass
 
+def check_cached_link(manifest, article_id, link, cache: bool = True):
+    if cache:
+        return False
 
-def download_link(
-    link,
-    title,
-    link_id,
-    article_fp,
-    include_title: bool,
-    is_article: bool,
-    cache: bool = True,
-):
-    if not cache:
-        if os.path.exists(article_fp):
-            fs = os.path.getsize(article_fp)
-            if fs > valid_size:
-                print(
-                    colored(
-                        f"cached {link}, filesize {fs}, do nothing",
-                        "green",
-                    )
-                )
-                return
-
+    fs = manifest.size(article_id)
+    if fs is not None:
+        if fs > valid_size:
             print(
                 colored(
-                    f"not cached {link},  filesize {fs}, to redownload...",
-                    "red",
+                    f"cached {link}, filesize {fs}, do nothing",
+                    "green",
                 )
             )
-            pass
+            incr("link_cache_hits")
+            return True
+
+        print(
+            colored(
+                f"not cached {link},  filesize {fs}, to redownload...",
+                "red",
+            )
+        )
         pass
 
-    driver.get(link)
+    return False
 
-    time.sleep(1.0)
-    # driver.implicitly_wait(0.1)
 
-    txt = ""
-    meta = ""
+def read_page_content(link, title):
+    """
+    The text of the page the driver is on, None if it has none.
+    """
+    m = None
     try:
 
-        WebDriverWait(driver, 2).until(
+        WebDriverWait(driver, get_timeout(page_ready, driver, "load", 2)).until(
             EC.presence_of_element_located((By.TAG_NAME, "body"))
         )
         m = driver.find_element(By.TAG_NAME, value="body")
-        # meta = m.text
-        meta = ""
     except Exception as ex:
         print(link, title, ex)
 
@@ -1209,10 +668,19 @@ def download_link(
         except Exception:
             pass
 
-    if content is None:
-        print("invalid text:", link, title)
-        return ""
+    return content
 
+
+def save_link_content(link, title, article_fp, content, include_title: bool):
+    manifest = get_manifest(os.path.dirname(article_fp))
+    article_id = Path(article_fp).stem
+
+    incr("fetched_selenium")
+    incr("article_bytes", len(content.encode("utf-8")))
+
+    txt = ""
+    # meta = m.text
+    meta = ""
     try:
         # path = "E:\\downloads\\w.png"
         # with open(path, "wb") as fp:
@@ -1226,20 +694,21 @@ def download_link(
             txt = f"{meta}\n{content}\n\n\n"
 
         updated = True
-        if os.path.exists(article_fp):
-            txt_exist = get_html_from_file(article_fp)
-            if len(txt) > len(txt_exist):
+        length_exist = manifest.length(article_id)
+        if length_exist is not None:
+            if len(txt) > length_exist:
                 updated = True
             else:
                 updated = False
 
         if updated:
-            with open(article_fp, "w", encoding="utf-8") as fp:
-                # fp.write(r.text)
-                fp.write(txt)
-                pass
+            with span("save"):
+                with open(article_fp, "w", encoding="utf-8") as fp:
+                    # fp.write(r.text)
+                    fp.write(txt)
+                    pass
 
-            fs = os.path.getsize(article_fp)
+            fs = manifest.record(article_id, txt, item={"link": link, "title": title})
             color = "green" if fs > valid_size else "red"
             print(
                 colored(
@@ -1260,13 +729,55 @@ def download_link(
     return txt
 
 
+def download_link(
+    link,
+    title,
+    link_id,
+    article_fp,
+    include_title: bool,
+    is_article: bool,
+    cache: bool = True,
+):
+    manifest = get_manifest(os.path.dirname(article_fp))
+    if check_cached_link(manifest, Path(article_fp).stem, link, cache=cache):
+        return
+
+    incr("link_cache_misses")
+    throttle_acquire(throttle, link)
+    with span("fetch"):
+        driver.get(link)
+
+        wait_loaded(page_ready, driver, 1.0)
+        # driver.implicitly_wait(0.1)
+
+        content = read_page_content(link, title)
+        throttle_observe(throttle, link, text=content)
+
+    if content is None:
+        print("invalid text:", link, title)
+        return ""
+
+    return save_link_content(link, title, article_fp, content, include_title)
+
+
 def download_links(
     all_update_items,
     article_path,
     include_title: bool,
     is_article: bool,
     cache: bool = True,
+    tabs: int = 1,
 ):
+    if tabs > 1:
+        download_links_prefetch(
+            all_update_items,
+            article_path,
+            include_title=include_title,
+            cache=cache,
+            tabs=tabs,
+        )
+        return
+
     for idx, item in enumerate(all_update_items):
         link = item["link"]
         title = item["title"]
@@ -1291,48 +802,120 @@ def download_links(
     pass
 
 
-def get_articles_items(article_path):
-    wild_dir: str = os.path.join(article_path, "**")
+def download_links_prefetch(
+    all_update_items,
+    article_path,
+    include_title: bool,
+    cache: bool = True,
+    tabs: int = 3,
+):
+    """
+    Download the links in order, while a page is read and written the next tabs - 1 links
+    are already loading in the other tabs of the driver.
+    """
+    manifest = get_manifest(article_path)
 
-    article_items = []
-    for file_name in glob.iglob(wild_dir, recursive=False):
-        if os.path.isfile(file_name):
-            file_base_name, ext = os.path.splitext(os.path.basename(file_name))
-            with open(file_name, "r", encoding="utf-8") as fp:
-                txt = fp.read()
+    queue = []
+    for idx, item in enumerate(all_update_items):
+        if not check_cached_link(manifest, str(item["id"]), item["link"], cache=cache):
+            queue.append((idx, item))
 
-                txt = re.sub(r"\n{5,}", r"", txt)
+    if not queue:
+        return
 
-                if len(txt) == 0:
-                    continue
+    fallback = 1.0
+    timeout = get_timeout(page_ready, driver, "load", 10.0)
+    with TabPrefetcher(driver, tabs, timeout=timeout, throttle=throttle) as prefetcher:
+        pages = prefetcher.pages([item["link"] for _, item in queue])
 
-                pos_nl = txt.find("\n")
-                if pos_nl > 0:
-                    title = txt[:pos_nl]
-                else:
-                    title = ""
+        for idx, item in queue:
+            title = item["title"]
+            dt = item.get("date", "")
+            article_fp = f"{article_path}/{item['id']}.txt"
 
-                invalid_txt = re.search(r"手机登录\n扫码登录\n获取验证码\n", txt)
-                if invalid_txt:
-                    continue
+            print(f">>>downloading {idx:04} {dt} {title} {item['id']}...")
+            incr("link_cache_misses")
 
-                dts = re.search(r"(\d+-\d+-\d+ \d+:\d+)", txt)
-                if dts:
-                    dt = dttm.datetime.strptime(dts.group(), "%Y-%m-%d %H:%M")
-                else:
-                    # dt = os.path.getmtime(file_name)
-                    dt = dttm.datetime.now()
-                    # continue
-                    pass
+            # only the time the pipeline waited on the page
+            with span("fetch"):
+                link, loading = next(pages)
+
+                # the page was loading while the previous ones were read
+                wait_loaded(page_ready, driver, max(fallback - loading, 0.0))
+                content = read_page_content(link, title)
+                throttle_observe(throttle, link, text=content)
+
+            if content is None:
+                print("invalid text:", link, title)
+            else:
+                save_link_content(link, title, article_fp, content, include_title)
+            pass
+    pass
+
+
+def parse_article_file(file_name):
+    file_base_name, ext = os.path.splitext(os.path.basename(file_name))
+    with open(file_name, "r", encoding="utf-8") as fp:
+        txt = fp.read()
+
+    txt = re.sub(r"\n{5,}", r"", txt)
+
+    if len(txt) == 0:
+        return None
+
+    pos_nl = txt.find("\n")
+    if pos_nl > 0:
+        title = txt[:pos_nl]
+    else:
+        title = ""
+
+    invalid_txt = re.search(r"手机登录\n扫码登录\n获取验证码\n", txt)
+    if invalid_txt:
+        return None
 
-                article_item = {
-                    "link": file_base_name,
-                    "title": title,
-                    "date": dt,
-                    "txt": txt,
-                }
+    dts = re.search(r"(\d+-\d+-\d+ \d+:\d+)", txt)
+    if dts:
+        dt = dttm.datetime.strptime(dts.group(), "%Y-%m-%d %H:%M")
+    else:
+        # dt = os.path.getmtime(file_name)
+        # dated when they are read, see get_articles_items
+        dt = None
+        # continue
+        pass
+
+    article_item = {
+        "link": file_base_name,
+        "title": title,
+        "date": dt,
+        "txt": txt,
+    }
+    return article_item
+
+
+def get_articles_items(article_path):
+    wild_dir: str = os.path.join(article_path, "**")
+
+    # parsed articles are reused until their file changes
+    cache = get_text_cache(article_path)
+
+    article_items = []
+    for file_name in glob.iglob(wild_dir, recursive=False):
+        if os.path.isfile(file_name):
+            st = os.stat(file_name)
+            article_item = cache.get_item(file_name, st)
+            if article_item is None:
+                with span("read"):
+                    article_item = parse_article_file(file_name)
+                article_item = cache.put_item(file_name, st, article_item)
+
+            if article_item:
+                if article_item["date"] is None:
+                    # chapters are written in reading order
+                    article_item["date"] = dttm.datetime.fromtimestamp(st.st_mtime)
                 article_items.append(article_item)
 
+    cache.flush()
+
     return article_items
 
 
@@ -1344,6 +927,7 @@ def scrape_item(
     max_articles,
     is_article: bool,
     max_checks: int = 0,
+    tabs: int = 1,
 ):
     link = item["link"]
     name = item["name"]
@@ -1368,20 +952,11 @@ def scrape_item(
     uid = re.sub(r"=", r"_", uid)
     # uid = uid.replace("/?&", "_")
 
+    suffix = get_filter_suffix(flter)
     if is_article:
-        if isinstance(flter, list):
-            article_path = f".torextrader/toutiao/article_{uid}_{name}"
-            for f in flter:
-                article_path = f"{article_path}_{f}"
-        else:
-            article_path = f".torextrader/toutiao/article_{uid}_{name}_{flter}"
+        article_path = f".torextrader/toutiao/article_{uid}_{name}{suffix}"
     else:
-        if isinstance(flter, list):
-            article_path = f".torextrader/toutiao/w_{uid}_{name}"
-            for f in flter:
-                article_path = f"{article_path}_{f}"
-        else:
-            article_path = f".torextrader/toutiao/w_{uid}_{name}_{flter}"
+        article_path = f".torextrader/toutiao/w_{uid}_{name}{suffix}"
 
     cache_config_info = ""
     if nocache:
@@ -1409,6 +984,9 @@ def scrape_item(
         if not os.path.exists(path):
             os.makedirs(path)
 
+    # the files may have changed since the last crawl of a long running watch
+    get_manifest(article_path, sync=True)
+
     try:
         if scrape:
             all_update_items = get_all_update_items(
@@ -1434,6 +1012,19 @@ def scrape_item(
                     }
                 ]
 
+                # a book read chapter by chapter lists the links of its chapters,
+                # the queue is the newest first
+                chapters = item.get("chapters", None)
+                if chapters:
+                    all_update_items = [
+                        {
+                            "link": chapter,
+                            "title": f"{item['name']} {i + 1}",
+                            "id": i + 1,
+                        }
+                        for i, chapter in reversed(list(enumerate(chapters)))
+                    ]
+
                 # the order the sooner so as to make the older link has an older file
                 reversed_all_update_items = list(reversed(all_update_items))
                 download_links(
@@ -1442,6 +1033,7 @@ def scrape_item(
                     include_title=include_title,
                     is_article=is_article,
                     cache=not nocache,
+                    tabs=tabs,
                 )
         else:
             all_update_items = []
@@ -1538,9 +1130,51 @@ def main():
     )
 
     parser.add_argument("-s", "--scrape", help="scrape", action="store_true")
+    parser.add_argument(
+        "-t",
+        "--tabs",
+        help="tabs to load the next chapters in while one is read, 1 for no prefetch",
+        type=int,
+        default=1,
+    )
     # parser.add_argument("-e", "--edge", help="use edge", action="store_true")
     parser.add_argument("-r", "--chrome", help="use chrome", action="store_true")
+    parser.add_argument(
+        "--throttle",
+        help="pace the article requests per domain, slower on login walls and rate limits, "
+        "the rates are kept in .torextrader/throttle.json",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--adaptive",
+        help="wait on page readiness signals instead of fixed sleeps",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--parser",
+        default=None,
+        type=str,
+        help="html parser, selectolax, lxml or bs4, defaults to the fastest installed",
+    )
 
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        help="number of processes to clean the articles with, 0 for all cores",
+        type=int,
+        default=1,
+    )
+    parser.add_argument(
+        "--metrics",
+        help="write a json run report with the time per phase and a prometheus dump to .torextrader/metrics",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--rules",
+        default=None,
+        type=str,
+        help="cleanup rules config, defaults to cleanup_rules.json next to the script",
+    )
     parser.add_argument(
         "-c",
         "--config",
@@ -1560,9 +1194,18 @@ def main():
     # use_edge_web_driver = args.edge
     use_edge_web_driver = not args.chrome
 
-    global driver
+    global driver, page_ready, rules_fp, throttle
+    rules_fp = args.rules
     driver = create_drive(use_edge_web_driver)
 
+    set_backend(args.parser)
+
+    if args.adaptive:
+        page_ready = PageReadiness()
+
+    if args.throttle:
+        throttle = Throttle()
+
     # time.sleep(50.0)
     force = args.force
     articles_path = ".torextrader/toutiao"
@@ -1601,8 +1244,18 @@ def main():
         print("no config specified")
         return
 
+    if page_ready is not None:
+        page_ready.save()
+
+    if throttle is not None:
+        throttle.save()
+        throttle.report()
+
     driver.quit()
 
+    if args.metrics:
+        metrics.save("download_zhangyue")
+
     pass
 
 
@@ -1612,96 +1265,64 @@ def handle_item(
     name = item.get("name", None)
     flter = item.get("filter", None)
 
-    group_idx = []
-    group_txts = []
-
     all_update_items = []
 
     print(colored(f">>> {idx}", "yellow"))
 
-    is_array = False
-    if "subitems" in item:
-        is_array = True
-        subitems = item["subitems"]
-        force_t = True
-        for ix, itm in enumerate(subitems):
-            sn, update_items, group_idx, group_txts = generate_item(
+    # chapters are streamed to the volumes as they are cleaned, and only kept
+    # when there are updates
+    with VolumeWriter(articles_path, group_num) as writer:
+        end_idx = 0
+        if "subitems" in item:
+            subitems = item["subitems"]
+            force_t = True
+            for ix, itm in enumerate(subitems):
+                sn, update_items, end_idx = generate_item(
+                    args,
+                    max_articles_default,
+                    max_checks,
+                    force_t,
+                    ix,
+                    itm,
+                    writer,
+                    end_idx,
+                )
+                all_update_items = [*all_update_items, *update_items]
+                if name is None:
+                    name = sn
+                pass
+            pass
+        else:
+            sn, update_items, end_idx = generate_item(
                 args,
                 max_articles_default,
                 max_checks,
-                force_t,
-                ix,
-                itm,
-                group_idx,
-                group_txts,
+                force,
+                idx,
+                item,
+                writer,
+                end_idx,
             )
             all_update_items = [*all_update_items, *update_items]
-            if name is None:
-                name = sn
             pass
-        pass
-    else:
-        sn, update_items, group_idx, group_txts = generate_item(
-            args,
-            max_articles_default,
-            max_checks,
-            force,
-            idx,
-            item,
-            group_idx,
-            group_txts,
-        )
-        all_update_items = [*all_update_items, *update_items]
-        pass
 
-    if group_idx and group_txts:
-        grp_idxs = []
-        grp_txts = []
-
-        if is_array:
-            num_total = group_idx[-1]
-            txts = ""
-
-            num_grps = len(group_idx)
-            for i in range(num_grps):
-                idx = group_idx[i]
-                txt = group_txts[i]
-
-                txts += txt
-                last_total = idx
-                if last_total >= group_num:
-                    grp_idxs.append(last_total)
-                    grp_txts.append(txts)
-                    txts = ""
-
-            if txts:
-                grp_idxs.append(last_total)
-                grp_txts.append(txts)
-        else:
-            grp_idxs = group_idx
-            grp_txts = group_txts
-            num_total = group_idx[-1]
-
-        if force or all_update_items:
-            if flter:
-                if isinstance(flter, list):
-                    for f in flter:
-                        name = f"{name}_{f}"
-                else:
-                    name = f"{name}_{flter}"
+        if writer.count > 0:
+            if force or all_update_items:
+                if flter:
+                    name = f"{name}{get_filter_suffix(flter)}"
+                    pass
+                # print(colored(f"generate files {name} from {end_idx} txts...", "green")
+                writer.commit(name)
+                pass
+            else:
+                print(colored(f"no updated articles for {end_idx} txts", "yellow"))
                 pass
-            # print(colored(f"generate files {name} from {num_total} txts...", "green")
-            write_txts(articles_path, name, grp_idxs, grp_txts)
-            pass
-        else:
-            print(colored(f"no updated articles for {num_total} txts", "yellow"))
             pass
-        pass
     pass
 
 
 def generate_item(
-    args, max_articles_default, max_checks, force, idx, item, group_idx, group_txts
+    args, max_articles_default, max_checks, force, idx, item, writer, start_idx
 ):
     name = item.get("name", None)
     max_articles = item.get("max", max_articles_default)
@@ -1715,6 +1336,7 @@ def generate_item(
         max_articles=max_articles,
         is_article=is_article,
         max_checks=max_checks,
+        tabs=args.tabs,
     )
 
     if force or update_items:
@@ -1726,17 +1348,20 @@ def generate_item(
 
         print(colored(f"generate txts from {len(article_items)} articles...", "green"))
 
-        start_idx = group_idx[-1] if group_idx else 0
-
-        group_idx_t, group_txts_t = generate_txts(
+        end_idx = generate_txts(
             sorted_article_items,
+            writer,
             filter_original_text=filter_original_text,
             start_idx=start_idx,
+            rules=item.get("rules", "zhangyue"),
+            cache=get_text_cache(article_path),
+            jobs=args.jobs,
         )
-        group_idx = [*group_idx, *group_idx_t]
-        group_txts = [*group_txts, *group_txts_t]
         pass
-    return name, update_items, group_idx, group_txts
+    else:
+        end_idx = start_idx
+    return name, update_items, end_idx
 
 
-main()
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import queue
+import threading
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+
+class DriverPool:
+    """
+    A bounded pool of WebDriver sessions, sessions are created lazily up to `size`.
+    """
+
+    def __init__(self, create_driver, size: int, drivers=None):
+        # create_driver(worker_idx) -> driver
+        self.create_driver = create_driver
+        self.size = max(size, 1)
+        self.drivers = list(drivers) if drivers else []
+        self.idle = queue.Queue()
+        self.lock = threading.Lock()
+
+        for drv in self.drivers:
+            self.idle.put(drv)
+
+    def acquire(self):
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self.lock:
+            if len(self.drivers) < self.size:
+                drv = self.create_driver(len(self.drivers))
+                self.drivers.append(drv)
+                return drv
+
+        return self.idle.get()
+
+    def release(self, drv):
+        self.idle.put(drv)
+
+    @contextmanager
+    def session(self):
+        drv = self.acquire()
+        try:
+            yield drv
+        finally:
+            self.release(drv)
+
+    def resize(self, size: int):
+        with self.lock:
+            self.size = max(size, self.size)
+
+    def quit(self, keep=None):
+        """
+        Quit every session except `keep`, which is owned by the caller.
+        """
+        with self.lock:
+            for drv in self.drivers:
+                if drv is keep:
+                    continue
+                try:
+                    drv.quit()
+                except Exception as ex:
+                    print(ex)
+
+            self.drivers = [drv for drv in self.drivers if drv is keep]
+            self.idle = queue.Queue()
+            for drv in self.drivers:
+                self.idle.put(drv)
+
+
+class DomainLimiter:
+    """
+    Caps the number of concurrent requests per domain.
+    """
+
+    def __init__(self, limits: dict = None, default: int = 0):
+        self.limits = limits or {}
+        self.default = default
+        self.semaphores = {}
+        self.lock = threading.Lock()
+
+    def get_semaphore(self, domain):
+        with self.lock:
+            sem = self.semaphores.get(domain, None)
+            if sem is None:
+                limit = self.limits.get(domain, self.default)
+                sem = threading.BoundedSemaphore(limit) if limit and limit > 0 else None
+                self.semaphores[domain] = sem
+
+        return sem
+
+    @contextmanager
+    def slot(self, url):
+        sem = self.get_semaphore(urlparse(url).netloc)
+        if sem is None:
+            yield
+            return
+
+        with sem:
+            yield
@@ -0,0 +1,161 @@
+import datetime as dttm
+
+import orjson
+
+# xhr endpoints the profile page loads its cards from
+feed_url_patterns = [
+    "/api/pc/list/user/feed",
+    "/api/pc/list/feed",
+    "/api/pc/feed/",
+]
+
+article_link = "https://www.toutiao.com/article/"
+
+
+def is_feed_url(url):
+    return any([url.find(p) >= 0 for p in feed_url_patterns])
+
+
+def format_time(ts):
+    try:
+        ts = int(ts)
+    except (TypeError, ValueError):
+        return None
+
+    if ts <= 0:
+        return None
+    if ts > 10_000_000_000:
+        # milliseconds
+        ts = ts // 1000
+
+    return dttm.datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M")
+
+
+def get_first(entry, keys):
+    for k in keys:
+        v = entry.get(k, None)
+        if v:
+            return v
+    return None
+
+
+def parse_feed_entry(entry, is_article: bool):
+    """
+    link, title and publish time of a feed entry, None if it is not a card of the requested kind.
+
+    The links look like the hrefs of the rendered cards, absolute for articles and relative for
+    weitoutiao, so they go through the same link handling as the cards parsed from the page.
+    """
+    raw_data = entry.get("raw_data", None)
+    if isinstance(raw_data, str):
+        try:
+            entry = {**entry, **orjson.loads(raw_data)}
+        except orjson.JSONDecodeError:
+            pass
+
+    date = format_time(get_first(entry, ["publish_time", "create_time", "behot_time"]))
+
+    if is_article:
+        item_id = get_first(entry, ["group_id_str", "group_id", "item_id_str", "item_id"])
+        title = entry.get("title", None)
+        if not item_id or not title or entry.get("thread_id", None):
+            return None
+
+        link = f"{article_link}{item_id}/"
+    else:
+        item_id = get_first(entry, ["thread_id_str", "thread_id"])
+        title = get_first(entry, ["content", "title"])
+        if not item_id or not title:
+            return None
+
+        link = f"/w/{item_id}/"
+
+    return {
+        "link": link,
+        "title": str(title).strip(),
+        "date": date,
+    }
+
+
+class FeedCapture:
+    """
+    Reads the cards of a profile page from the feed json it loads, instead of parsing the DOM.
+
+    The responses are found in the performance log of the session, see create_drive(perf_log=True).
+    """
+
+    def __init__(self, drv):
+        self.drv = drv
+        self.responses = 0
+        # feed requests whose body is not complete yet
+        self.pending = []
+
+    def read_logs(self):
+        try:
+            return self.drv.get_log("performance")
+        except Exception as ex:
+            print(f"feed capture: {ex}")
+            return []
+
+    def reset(self):
+        """
+        Drop what was logged so far, call before loading a page.
+        """
+        self.read_logs()
+        self.responses = 0
+        self.pending = []
+
+    def get_bodies(self):
+        request_ids = self.pending
+        finished = set()
+        for entry in self.read_logs():
+            message = orjson.loads(entry["message"])["message"]
+            method = message.get("method", "")
+            params = message.get("params", {})
+
+            if method == "Network.responseReceived":
+                response = params.get("response", {})
+                if is_feed_url(response.get("url", "")) and response.get("status", 0) == 200:
+                    request_ids.append(params["requestId"])
+            elif method == "Network.loadingFinished":
+                finished.add(params["requestId"])
+
+        bodies = []
+        self.pending = []
+        for request_id in request_ids:
+            if request_id not in finished:
+                # still loading, read on the next call
+                self.pending.append(request_id)
+                continue
+            try:
+                body = self.drv.execute_cdp_cmd("Network.getResponseBody", {"requestId": request_id})
+                bodies.append(body["body"])
+            except Exception as ex:
+                print(f"feed capture: {ex}")
+
+        return bodies
+
+    def drain(self, is_article: bool):
+        """
+        The cards of the feed responses received since the last call, in feed order.
+        """
+        items = []
+        for body in self.get_bodies():
+            try:
+                data = orjson.loads(body)
+            except orjson.JSONDecodeError:
+                continue
+
+            if not isinstance(data, dict):
+                continue
+
+            self.responses += 1
+            for entry in data.get("data", None) or []:
+                if not isinstance(entry, dict):
+                    continue
+
+                item = parse_feed_entry(entry, is_article)
+                if item is not None:
+                    items.append(item)
+
+        return items
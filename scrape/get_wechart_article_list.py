@@ -1,9 +1,9 @@
 import yaml
-import time
-import random
 import requests
 import json
 
+from throttle import Throttle
+
 # https://zhuanlan.zhihu.com/p/541713940
 
 
@@ -42,6 +42,7 @@ def generate_url(base_url, params=None):
 def get_article_list(
     headers,
     params,
+    throttle: Throttle,
 ):
     base_url = "https://mp.weixin.qq.com/cgi-bin/appmsgpublish"
 
@@ -53,8 +54,8 @@ def get_article_list(
         begin = i * 5
         params["begin"] = str(begin)
 
-        # 随机暂停几秒，避免过快的请求导致过快的被查到
-        time.sleep(random.randint(1, 10))
+        # 按站点的限速等待，被限流后自动放慢
+        throttle.acquire(base_url)
 
         use_url = True
         if use_url:
@@ -63,11 +64,16 @@ def get_article_list(
         else:
             resp = requests.get(url, headers=headers, params=params, verify=False)
 
-        # 微信流量控制, 退出
+        if resp.status_code == 429:
+            throttle.observe(base_url, status=429, retry_after=resp.headers.get("Retry-After", None))
+            continue
+
+        # 微信流量控制, 降速并冷却后重试
         data = resp.json()
-        if data["base_resp"]["ret"] == 200013:
+        ret = data["base_resp"]["ret"]
+        if throttle.observe(base_url, ret=ret) is not None:
             print("frequencey control, stop at {}".format(str(begin)))
-            time.sleep(3600)
+            throttle.save()
             continue
 
         publish_page_str = data.get("publish_page", None)
@@ -122,7 +128,12 @@ def main():
     config = yaml.safe_load(file_data)
     headers = get_headers(config)
     params = get_params(config)
-    get_article_list(headers, params)
+    throttle = Throttle()
+    try:
+        get_article_list(headers, params, throttle)
+    finally:
+        throttle.save()
+        throttle.report()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,112 @@
+import argparse
+import glob
+import os
+import sys
+import time
+
+from termcolor import colored
+
+import html_parser
+from article_filter import compile_filter
+from download_shuqi import get_articles_data_shuqi
+from web_toutiao import get_articles_data_tt, get_articles_data_wp
+
+# check that every html parser backend extracts the same cards from saved pages, and time them
+# save pages with driver.page_source to .torextrader/fixtures/*.html
+# uv run python .\scrape\html_parity.py .torextrader/fixtures
+# the synthetic pages of scrape/tests/fixtures, not real snapshots, are checked on every backend by
+# tests/test_html_parity.py
+
+no_filter = compile_filter(None)
+
+extractors = {
+    "tt_article": lambda html: get_articles_data_tt(html, no_filter, True),
+    "tt_wtt": lambda html: get_articles_data_tt(html, no_filter, False),
+    "wp": lambda html: get_articles_data_wp(html, no_filter),
+    "shuqi": lambda html: get_articles_data_shuqi(html, no_filter, True),
+}
+
+
+def get_fixtures(paths):
+    fixtures = []
+    for path in paths:
+        if os.path.isdir(path):
+            fixtures.extend(sorted(glob.glob(os.path.join(path, "*.html"))))
+        elif os.path.isfile(path):
+            fixtures.append(path)
+    return fixtures
+
+
+def run_backend(name, html, times):
+    html_parser.set_backend(name)
+
+    results = {}
+    start_time = time.perf_counter()
+    for _ in range(times):
+        for kind, extract in extractors.items():
+            results[kind] = extract(html)
+    elapsed = (time.perf_counter() - start_time) / times
+
+    return results, elapsed
+
+
+def check_fixture(fp, backends, times):
+    with open(fp, "r", encoding="utf-8") as f:
+        html = f.read()
+
+    # bs4 is the reference, it is what the scrapers used before
+    expected, ref_elapsed = run_backend("bs4", html, times)
+    counts = ", ".join([f"{kind} {len(data)}" for kind, data in expected.items() if data])
+    print(f"{fp}: {len(html) / 1024:.0f}KB, {counts if counts else 'no cards'}, bs4 {ref_elapsed * 1000:.1f}ms")
+
+    ok = True
+    for name in backends:
+        if name == "bs4":
+            continue
+
+        results, elapsed = run_backend(name, html, times)
+        speedup = ref_elapsed / elapsed if elapsed > 0 else 0.0
+
+        mismatches = [kind for kind in extractors.keys() if results[kind] != expected[kind]]
+        if mismatches:
+            ok = False
+            print(colored(f"  {name}: {elapsed * 1000:.1f}ms {speedup:.1f}x, differs in {mismatches}", "red"))
+            for kind in mismatches:
+                for i, (a, b) in enumerate(zip(expected[kind], results[kind])):
+                    if a != b:
+                        print(colored(f"    {kind}[{i}]: {a} != {b}", "red"))
+                        break
+                if len(expected[kind]) != len(results[kind]):
+                    print(colored(f"    {kind}: {len(expected[kind])} != {len(results[kind])} cards", "red"))
+        else:
+            print(colored(f"  {name}: {elapsed * 1000:.1f}ms {speedup:.1f}x, same", "green"))
+
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("paths", nargs="*", default=[".torextrader/fixtures"], help="html files or dirs")
+    parser.add_argument("-t", "--times", help="runs per page for the timings", type=int, default=3)
+
+    args = parser.parse_args()
+
+    fixtures = get_fixtures(args.paths)
+    if not fixtures:
+        print("no html fixtures found")
+        return
+
+    backends = html_parser.available_backends
+    print(f"backends: {backends}")
+
+    ok = True
+    for fp in fixtures:
+        ok = check_fixture(fp, backends, args.times) and ok
+
+    html_parser.set_backend(None)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
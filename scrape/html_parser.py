@@ -0,0 +1,146 @@
+from bs4 import BeautifulSoup, NavigableString
+from bs4.element import PreformattedString
+
+try:
+    # selectolax with the lexbor engine, optional, the fastest
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+
+try:
+    # lxml needs cssselect for css selectors
+    import cssselect  # noqa: F401
+    import lxml.html
+except ImportError:
+    lxml = None
+
+backends = ["selectolax", "lxml", "bs4"]
+
+available_backends = [
+    b
+    for b, ok in zip(backends, [LexborHTMLParser is not None, lxml is not None, True])
+    if ok
+]
+
+# None picks the fastest available one
+backend = None
+
+
+def set_backend(name):
+    global backend
+    if name is not None and name not in available_backends:
+        print(f"html parser {name} is not available, use one of {available_backends}")
+        return False
+
+    backend = name
+    return True
+
+
+def get_backend():
+    return backend if backend is not None else available_backends[0]
+
+
+class SelectolaxNode:
+    def __init__(self, node):
+        self.node = node
+
+    def select(self, selector):
+        return [SelectolaxNode(n) for n in self.node.css(selector)]
+
+    def select_one(self, selector):
+        n = self.node.css_first(selector)
+        return SelectolaxNode(n) if n is not None else None
+
+    @property
+    def attrs(self):
+        # boolean attributes are None in selectolax, "" in bs4
+        return {k: (v if v is not None else "") for k, v in self.node.attributes.items()}
+
+    def has_attr(self, name):
+        return name in self.node.attributes
+
+    @property
+    def text(self):
+        return self.node.text(deep=True)
+
+    def first_text(self):
+        child = self.node.child
+        if child is None or child.tag != "-text":
+            return None
+        return child.text_content
+
+
+class LxmlNode:
+    def __init__(self, el):
+        self.el = el
+
+    def select(self, selector):
+        return [LxmlNode(el) for el in self.el.cssselect(selector)]
+
+    def select_one(self, selector):
+        els = self.el.cssselect(selector)
+        return LxmlNode(els[0]) if els else None
+
+    @property
+    def attrs(self):
+        return dict(self.el.attrib)
+
+    def has_attr(self, name):
+        return name in self.el.attrib
+
+    @property
+    def text(self):
+        return self.el.text_content()
+
+    def first_text(self):
+        # text before the first child element, a comment or element first gives None
+        return self.el.text if self.el.text else None
+
+
+class SoupNode:
+    def __init__(self, tag):
+        self.tag = tag
+
+    def select(self, selector):
+        return [SoupNode(t) for t in self.tag.select(selector)]
+
+    def select_one(self, selector):
+        t = self.tag.select_one(selector)
+        return SoupNode(t) if t is not None else None
+
+    @property
+    def attrs(self):
+        return self.tag.attrs
+
+    def has_attr(self, name):
+        return self.tag.has_attr(name)
+
+    @property
+    def text(self):
+        return self.tag.text
+
+    def first_text(self):
+        if not self.tag.contents:
+            return None
+
+        child = self.tag.contents[0]
+        if not isinstance(child, NavigableString) or isinstance(child, PreformattedString):
+            return None
+        return str(child)
+
+
+def parse_html(html, name=None):
+    """
+    Parse a page with the given backend or the current one, the nodes have the same small
+    css selector interface whatever the backend.
+    """
+    name = name if name is not None else get_backend()
+
+    if name == "selectolax":
+        return SelectolaxNode(LexborHTMLParser(html).root)
+
+    if name == "lxml" and html.strip():
+        # lxml refuses an empty document
+        return LxmlNode(lxml.html.document_fromstring(html))
+
+    return SoupNode(BeautifulSoup(html, "html.parser"))
@@ -0,0 +1,175 @@
+import datetime as dttm
+import re
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+
+from throttle import throttle_acquire, throttle_observe
+
+login_wall = "手机登录\n扫码登录"
+
+default_user_agent = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/131.0.0.0 Safari/537.36"
+)
+
+
+def get_text(el):
+    lines = [line.strip() for line in el.get_text("\n").split("\n")]
+    return "\n".join([line for line in lines if line])
+
+
+def extract_toutiao_article(soup):
+    content = soup.find("div", class_="article-content")
+    if content is None:
+        return None
+
+    return get_text(content)
+
+
+def extract_wechat_article(soup, html):
+    content = soup.find("div", id="js_content")
+    if content is None:
+        return None
+
+    lines = []
+
+    title = soup.find("h1", id="activity-name")
+    if title is not None:
+        lines.append(get_text(title))
+
+    # publish_time is filled in by js, the timestamp is in the inline script
+    ct = re.search(r'var ct\s*=\s*"(\d+)"', html)
+    if ct:
+        dt = dttm.datetime.fromtimestamp(int(ct.group(1)))
+        lines.append(dt.strftime("%Y-%m-%d %H:%M"))
+
+    lines.append(get_text(content))
+
+    return "\n".join(lines)
+
+
+def extract_body(html, link):
+    """
+    Extract the article body from a server-rendered page, None if there is none.
+    """
+    soup = BeautifulSoup(html, "html.parser")
+
+    if link.find("mp.weixin.qq.com") > -1:
+        content = extract_wechat_article(soup, html)
+    else:
+        content = extract_toutiao_article(soup)
+
+    if content is None or not content.strip():
+        return None
+
+    return content
+
+
+def extract_page_text(html, link):
+    """
+    The article body of a page, or the text of the whole body like the browser, e.g. weitoutiao
+    pages rendered on the client.
+    """
+    content = extract_body(html, link)
+    if content is not None:
+        return content
+
+    body = BeautifulSoup(html, "html.parser").body
+    if body is None:
+        return None
+
+    for el in body.find_all(["script", "style", "noscript"]):
+        el.decompose()
+    content = get_text(body)
+    return content if content.strip() else None
+
+
+class HttpFetcher:
+    """
+    Fetch server-rendered articles with a pooled keep-alive session, sharing the cookies of the browser.
+    """
+
+    def __init__(self, pool_size: int = 8, timeout: float = 10.0, throttle=None, snapshots=None):
+        self.timeout = timeout
+        self.throttle = throttle
+        self.snapshots = snapshots
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=1)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers["User-Agent"] = default_user_agent
+
+        self.lock = threading.Lock()
+        # path -> [count, seconds]
+        self.stats = {}
+
+    def supports(self, link):
+        # /w/ pages are rendered on the client
+        url = urlparse(link)
+        if url.netloc == "mp.weixin.qq.com":
+            return True
+
+        return url.netloc.endswith("toutiao.com") and url.path.startswith("/article/")
+
+    def load_cookies(self, drv):
+        """
+        Export the cookies of all domains from the Selenium session.
+        """
+        try:
+            cookies = drv.execute_cdp_cmd("Network.getAllCookies", {})["cookies"]
+        except Exception:
+            cookies = drv.get_cookies()
+
+        for c in cookies:
+            self.session.cookies.set(c["name"], c["value"], domain=c.get("domain", ""), path=c.get("path", "/"))
+
+        try:
+            self.session.headers["User-Agent"] = drv.execute_script("return navigator.userAgent")
+        except Exception:
+            pass
+
+    def fetch(self, link):
+        """
+        Returns the article body, None when it has to be fetched by the browser.
+        """
+        throttle_acquire(self.throttle, link)
+        try:
+            r = self.session.get(link, timeout=self.timeout)
+            if r.status_code == 429:
+                throttle_observe(self.throttle, link, status=429, retry_after=r.headers.get("Retry-After", None))
+            if r.status_code != 200:
+                return None
+
+            if r.encoding is None or r.encoding.lower() == "iso-8859-1":
+                # no charset in the headers
+                r.encoding = "utf-8"
+            html = r.text
+        except Exception as ex:
+            print(link, ex)
+            return None
+
+        throttle_observe(self.throttle, link, text=html)
+        if html.find(login_wall) >= 0:
+            return None
+
+        if self.snapshots is not None:
+            self.snapshots.put(link, html, source="http")
+
+        return extract_body(html, link)
+
+    def record(self, path, start_time):
+        elapsed = time.time() - start_time
+        with self.lock:
+            stat = self.stats.setdefault(path, [0, 0.0])
+            stat[0] += 1
+            stat[1] += elapsed
+
+    def report(self):
+        for path, (count, seconds) in sorted(self.stats.items()):
+            avg = seconds / count if count else 0.0
+            print(f"{path}: {count} pages, {seconds:.1f}s, {avg:.2f}s/page")
@@ -5,6 +5,9 @@ import glob
 import argparse
 import datetime as dttm
 
+from clean_pool import clean_texts
+from volume_writer import VolumeWriter
+
 
 def get_articles_items(article_path):
     wild_dir: str = os.path.join(article_path, "**")
@@ -38,84 +41,64 @@ def get_articles_items(article_path):
     return article_items
 
 
+def clean_txt(txt):
+    # txt = re.sub(
+    #     r"【原文】(.*?\n)*?(【\s*译文\s*】|【\s*原文华译\s*】|【\s*闲扯\s*】|【\s*解析\s*】|【\s*读解\s*】|【\s*华译\s*】)",
+    #     r"【原文】\n 略\n\2",
+    #     txt,
+    # )
+
+    for t in [
+        r"转述师：金北平.*?\n",
+        r"创建时间.*?\n",
+        r"更新时间.*?\n",
+        r"URL.*?\n",
+    ]:
+        txt = re.sub(t, r"", txt)
+        pass
+
+    txt = re.sub(r"(.*?)\n{2}", r"\1", txt)
+    txt = re.sub(r" +", r"", txt)
+
+    return txt
+
+
 def generate_txts(
     article_items,
     articles_path,
     filter,
     name,
+    jobs: int = 1,
 ):
     group_num = 1000
 
-    group_idx = []
-    group_txts = []
-    txts = ""
-
-    for idx, item in enumerate(article_items):
-        # link = item["link"]
-        # title = item["title"]
-
-        txt = item["txt"]
+    # cleaned in order, by a process pool when jobs > 1
+    cleaned_txts = clean_texts(
+        clean_txt,
+        [item["txt"] for item in article_items if item["txt"] is not None],
+        jobs=jobs,
+    )
 
-        if txt is not None:
-            idx_t = idx + 1
+    # chapters are streamed to the volumes as they are cleaned, the first volume keeps the bare name
+    with VolumeWriter(articles_path, group_num, number_first=False) as writer:
+        for idx, item in enumerate(article_items):
+            # link = item["link"]
+            # title = item["title"]
 
-            # txt = re.sub(
-            #     r"【原文】(.*?\n)*?(【\s*译文\s*】|【\s*原文华译\s*】|【\s*闲扯\s*】|【\s*解析\s*】|【\s*读解\s*】|【\s*华译\s*】)",
-            #     r"【原文】\n 略\n\2",
-            #     txt,
-            # )
+            txt = item["txt"]
 
-            for t in [
-                r"转述师：金北平.*?\n",
-                r"创建时间.*?\n",
-                r"更新时间.*?\n",
-                r"URL.*?\n",
-            ]:
-                txt = re.sub(t, r"", txt)
-                pass
+            if txt is not None:
+                idx_t = idx + 1
 
-            txt = re.sub(r"(.*?)\n{2}", r"\1", txt)
-            txt = re.sub(r" +", r"", txt)
+                txt = next(cleaned_txts)
 
-            txts += f"第{idx_t:04}章\n\n{txt}\n"
+                writer.write_chapter(idx_t, f"第{idx_t:04}章\n\n{txt}\n")
 
-            if idx_t % group_num == 0:
-                group_idx.append(idx_t)
-                group_txts.append(txts)
-                txts = ""
-
-        pass
-
-    if txts:
-        group_idx.append(len(article_items))
-        group_txts.append(txts)
-
-    last_idx = 1
-
-    for i, txts in enumerate(group_txts):
-        idx = group_idx[i]
-
-        # fn = f"{articles_path}/{last_idx:04}_{idx:04}_{name}"
-        # fn = f"{articles_path}/{last_idx:04}_{name}"
-        if last_idx > 1:
-            fn = f"{articles_path}/{last_idx:04}_{name}"
-        else:
-            fn = f"{articles_path}/{name}"
-
-        if filter:
-            fn = f"{fn}_{filter}.txt"
-        else:
-            fn = f"{fn}.txt"
             pass
 
-        with open(
-            fn,
-            "w",
-            encoding="utf-8",
-        ) as fp:
-            fp.write(txts)
-            last_idx = idx
-            print(f"{fn} generated")
+        cleaned_txts.close()
+
+        writer.commit(f"{name}_{filter}" if filter else name)
 
     pass
 
@@ -124,6 +107,13 @@ def main():
     parser = argparse.ArgumentParser()
 
     parser.add_argument("-d", "--uid", help="uid", type=int, default=1)
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        help="number of processes to clean the articles with, 0 for all cores",
+        type=int,
+        default=1,
+    )
     args = parser.parse_args()
 
     uid = args.uid
@@ -152,8 +142,10 @@ def main():
             articles_path,
             filter=filter,
             name=name,
+            jobs=args.jobs,
         )
     pass
 
 
-main()
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import orjson
+from termcolor import colored
+
+metrics_path = ".torextrader/metrics"
+
+
+class Metrics:
+    """
+    Time spent per phase of a run and counters, e.g. pages loaded, bytes and cache hits.
+
+    Spans of concurrent downloads overlap, their seconds are summed over the threads.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started_at = time.time()
+        # name -> {"count", "seconds", "max"}
+        self.spans = {}
+        # name -> value
+        self.counters = {}
+
+    def add_span(self, name, seconds: float):
+        with self.lock:
+            s = self.spans.get(name, None)
+            if s is None:
+                s = {"count": 0, "seconds": 0.0, "max": 0.0}
+                self.spans[name] = s
+            s["count"] += 1
+            s["seconds"] += seconds
+            s["max"] = max(s["max"], seconds)
+
+    @contextmanager
+    def span(self, name):
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_span(name, time.perf_counter() - start_time)
+
+    def incr(self, name, value=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def report(self):
+        with self.lock:
+            return {
+                "started_at": int(self.started_at),
+                "seconds": round(time.time() - self.started_at, 3),
+                "spans": {
+                    name: {"count": s["count"], "seconds": round(s["seconds"], 3), "max": round(s["max"], 3)}
+                    for name, s in self.spans.items()
+                },
+                "counters": dict(self.counters),
+            }
+
+    def prometheus(self, job):
+        """
+        The report in the prometheus text format, for a textfile collector or a pushgateway.
+        """
+        report = self.report()
+        lines = [
+            "# TYPE scrape_run_seconds gauge",
+            f'scrape_run_seconds{{job="{job}"}} {report["seconds"]}',
+            "# TYPE scrape_span_seconds_total counter",
+        ]
+        for name, s in report["spans"].items():
+            lines.append(f'scrape_span_seconds_total{{job="{job}",span="{name}"}} {s["seconds"]}')
+        lines.append("# TYPE scrape_span_count_total counter")
+        for name, s in report["spans"].items():
+            lines.append(f'scrape_span_count_total{{job="{job}",span="{name}"}} {s["count"]}')
+        lines.append("# TYPE scrape_span_max_seconds gauge")
+        for name, s in report["spans"].items():
+            lines.append(f'scrape_span_max_seconds{{job="{job}",span="{name}"}} {s["max"]}')
+        for name, value in report["counters"].items():
+            metric = f"scrape_{re.sub(r'[^a-zA-Z0-9_]', '_', name)}_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f'{metric}{{job="{job}"}} {value}')
+
+        return "\n".join(lines) + "\n"
+
+    def save(self, job, path=metrics_path):
+        """
+        Write {job}_{time}.json and {job}.prom, print the phases against the last run of the job.
+        """
+        if not os.path.exists(path):
+            os.makedirs(path)
+
+        last_report = load_last_report(job, path)
+        report = self.report()
+
+        stamp = time.strftime("%Y%m%d_%H%M%S", time.localtime(self.started_at))
+        report_fp = os.path.join(path, f"{job}_{stamp}.json")
+        with open(report_fp, "wb") as f:
+            f.write(orjson.dumps(report, option=orjson.OPT_INDENT_2))
+
+        with open(os.path.join(path, f"{job}.prom"), "w", encoding="utf-8") as f:
+            f.write(self.prometheus(job))
+
+        print_report(report, last_report)
+        print(f"run report: {report_fp}")
+        return report_fp
+
+
+def load_last_report(job, path=metrics_path):
+    fps = sorted(Path(path).glob(f"{job}_*.json")) if os.path.exists(path) else []
+    if not fps:
+        return None
+
+    with open(fps[-1], "rb") as f:
+        return orjson.loads(f.read())
+
+
+def print_report(report, last_report=None):
+    last_spans = last_report["spans"] if last_report else {}
+    print(colored(f"run {report['seconds']:.1f}s", "green"))
+    for name, s in sorted(report["spans"].items(), key=lambda t: -t[1]["seconds"]):
+        delta = ""
+        last = last_spans.get(name, None)
+        if last is not None and last["seconds"] > 0:
+            change = (s["seconds"] - last["seconds"]) / last["seconds"] * 100
+            delta = colored(f" {change:+.0f}%", "red" if change > 20 else "green" if change < -20 else "white")
+        print(f"  {name:<16} {s['seconds']:>9.2f}s {s['count']:>7} x, max {s['max']:.2f}s{delta}")
+    for name, value in sorted(report["counters"].items()):
+        print(f"  {name:<16} {value:>10}")
+
+
+# one per run, the scripts are run one at a time
+metrics = Metrics()
+
+
+def span(name):
+    return metrics.span(name)
+
+
+def incr(name, value=1):
+    metrics.incr(name, value)
@@ -0,0 +1,180 @@
+import argparse
+import glob
+import os
+import shutil
+import time
+from functools import partial
+
+import orjson
+from termcolor import colored
+
+import web_toutiao
+from crawl_scheduler import CrawlHistory, CrawlScheduler, CrawlTask
+from metrics import metrics, print_report
+from mock_site import MockServer, add_site_arguments, create_site
+from page_ready import PageReadiness
+
+# scrape profiles of the local mock site with the real scraper and report the articles per minute,
+# to try crawl concurrency and throttling without the network
+# uv run python .\scrape\mock_load_test.py --authors 4 --articles 100 --latency 0.2 --error-rate 0.05 --sessions 2
+
+
+def get_profile_link(base, tab, author):
+    if tab == "wp":
+        return f"{base}/album/{author}/"
+    return f"{base}/c/user/token/{author}/?tab={tab}"
+
+
+def count_downloaded(article_paths):
+    """
+    Article files that were downloaded, and the short ones, e.g. login walls or error pages.
+    """
+    downloaded = 0
+    short = 0
+    for article_path in article_paths:
+        for fp in glob.glob(os.path.join(article_path, "*.txt")):
+            if os.path.getsize(fp) > web_toutiao.valid_size:
+                downloaded += 1
+            else:
+                short += 1
+
+    return downloaded, short
+
+
+def run_items(args, items):
+    """
+    Scrape the items, concurrently on args.sessions sessions, returns their (article_path, update_items).
+    """
+    scrape_args = argparse.Namespace(scrape=True, nocache=False, incremental=args.incremental, resume=False)
+
+    if args.sessions <= 1:
+        return [
+            web_toutiao.scrape_item(
+                idx,
+                item,
+                scrape=True,
+                nocache=False,
+                max_articles=0,
+                is_article=item["is_article"],
+                incremental=args.incremental,
+                workers=args.workers,
+            )
+            for idx, item in enumerate(items)
+        ]
+
+    pool = web_toutiao.get_driver_pool(args.sessions)
+    history = CrawlHistory(os.path.join(".torextrader", "crawl_history.json"))
+    scheduler = CrawlScheduler(pool, history, count_updates=lambda r: len(r[1]))
+
+    results = []
+    tasks = [
+        CrawlTask(web_toutiao.get_crawl_key(item), partial(web_toutiao.scrape_scheduled, scrape_args, 0, 0, idx, item))
+        for idx, item in enumerate(items)
+    ]
+    scheduler.run([(tasks, results.extend)])
+    return [r for r in results if r is not None]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+
+    add_site_arguments(parser)
+    parser.add_argument("--authors", help="profiles to scrape", type=int, default=4)
+    parser.add_argument("--tab", help="article, wtt or wp", choices=["article", "wtt", "wp"], default="article")
+    parser.add_argument("--sessions", help="browser sessions to crawl the profiles with", type=int, default=1)
+    parser.add_argument("-w", "--workers", help="browser sessions to download with, one session", type=int, default=1)
+    parser.add_argument("-i", "--incremental", help="parse only the cards appended by a scroll", action="store_true")
+    parser.add_argument(
+        "--adaptive",
+        help="wait on page readiness signals instead of fixed sleeps",
+        action="store_true",
+    )
+    parser.add_argument("--text-only", help="text-only browser profile", action="store_true")
+    parser.add_argument("-r", "--chrome", help="use chrome", action="store_true")
+    parser.add_argument("--keep", help="keep the articles of the last run, i.e. a cached crawl", action="store_true")
+    parser.add_argument("--workdir", help="scratch dir of the run", type=str, default=".torextrader/mock")
+    parser.add_argument("-o", "--output", help="json report", type=str, default=None)
+
+    args = parser.parse_args()
+
+    site = create_site(args)
+    server = MockServer(site, port=args.port)
+    server.start()
+    print(colored(f"mock site on {server.base}", "green"))
+
+    output = os.path.abspath(args.output) if args.output else None
+    cwd = os.getcwd()
+
+    # the articles of the mock authors never mix with the real ones
+    if not args.keep and os.path.exists(args.workdir):
+        shutil.rmtree(args.workdir)
+    if not os.path.exists(args.workdir):
+        os.makedirs(args.workdir)
+    os.chdir(args.workdir)
+
+    web_toutiao.set_site_base(server.base)
+    web_toutiao.use_edge = not args.chrome
+    web_toutiao.text_only = args.text_only
+    web_toutiao.driver = web_toutiao.create_drive(web_toutiao.use_edge, text_only=args.text_only)
+    if args.adaptive:
+        web_toutiao.page_ready = PageReadiness(stats_fp="")
+
+    tab = "tt_wtt" if args.tab == "wtt" else args.tab
+    items = [
+        {
+            "name": f"mock{i}",
+            "link": get_profile_link(server.base, "wtt" if tab == "tt_wtt" else tab, f"mock{i}"),
+            "filter": "",
+            "origin": "wp" if tab == "wp" else "tt",
+            "is_article": tab != "tt_wtt",
+        }
+        for i in range(args.authors)
+    ]
+
+    start_time = time.time()
+    try:
+        results = run_items(args, items)
+    finally:
+        elapsed = time.time() - start_time
+
+        if web_toutiao.driver_pool is not None:
+            web_toutiao.driver_pool.quit(keep=web_toutiao.driver)
+        web_toutiao.driver.quit()
+        server.stop()
+
+    downloaded, short = count_downloaded([article_path for article_path, _ in results])
+    queued = sum([len(update_items) for _, update_items in results])
+
+    report = {
+        "seconds": round(elapsed, 1),
+        "authors": args.authors,
+        "tab": args.tab,
+        "sessions": args.sessions,
+        "workers": args.workers,
+        "queued": queued,
+        "downloaded": downloaded,
+        "short": short,
+        "articles_per_minute": round(downloaded / elapsed * 60, 1) if elapsed > 0 else 0.0,
+        "site": site.stats,
+        "metrics": metrics.report(),
+    }
+    os.chdir(cwd)
+
+    print_report(report["metrics"])
+    print(f"site: {site.stats}")
+    print(
+        colored(
+            f"{downloaded} articles of {queued} queued, {short} short, in {elapsed:.1f}s: "
+            f"{report['articles_per_minute']} articles/minute",
+            "green",
+        )
+    )
+
+    if output:
+        with open(output, "wb") as f:
+            f.write(orjson.dumps(report, option=orjson.OPT_INDENT_2))
+        print(f"report: {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+import argparse
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import orjson
+
+import bench_fixtures
+
+# a local stand-in for the toutiao profiles and the wechat albums, with their articles, in the
+# markup the scrapers parse, for load tests without the network, see mock_load_test.py
+# uv run python .\scrape\mock_site.py -p 8790 --latency 0.2 --error-rate 0.05
+
+page_size = 20
+
+# what the sites show instead of an article to a session that is not logged in
+login_wall_body = "<div>手机登录</div><div>扫码登录</div><div>获取验证码</div><div>登录后查看全文</div>"
+
+# appends the next page of cards when the page is scrolled to the bottom, like the sites
+scroll_script = """
+<style>.profile-article-card-wrapper, .profile-wtt-card-wrapper, .album__list-item { min-height: 120px; }</style>
+<script>
+(function () {
+    var offset = %(offset)d;
+    var loading = false;
+    var done = false;
+    window.addEventListener("scroll", function () {
+        if (loading || done) {
+            return;
+        }
+        if (window.innerHeight + window.scrollY < document.body.scrollHeight - 300) {
+            return;
+        }
+        loading = true;
+        fetch("/api/cards?author=%(author)s&tab=%(tab)s&offset=" + offset)
+            .then(function (r) { return r.ok ? r.text() : null; })
+            .then(function (html) {
+                if (html === "") {
+                    done = true;
+                } else if (html) {
+                    document.querySelector("%(root)s").insertAdjacentHTML("beforeend", html);
+                    offset += %(page_size)d;
+                }
+                loading = false;
+            })
+            .catch(function () { loading = false; });
+    });
+})();
+</script>
+"""
+
+tab_roots = {
+    "tt_article": "div.profile-tab-feed",
+    "tt_wtt": "div.profile-tab-feed",
+    "wp": "ul.album__list",
+}
+
+
+class MockSite:
+    """
+    Profiles of any author name, each with `articles` articles, newest first and `page_size` cards
+    a page. A new article is published every `publish_every` seconds, if set.
+
+    The article links do not name the author, so every author lists the same articles, each
+    profile is still scraped to its own article dir.
+    """
+
+    def __init__(
+        self,
+        articles: int = 200,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        login_wall_rate: float = 0.0,
+        publish_every: float = 0.0,
+        seed: int = 1,
+    ):
+        self.articles = articles
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.login_wall_rate = login_wall_rate
+        self.publish_every = publish_every
+        self.seed = seed
+        self.started_at = time.time()
+
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "profiles": 0, "cards": 0, "articles": 0, "errors": 0, "login_walls": 0}
+
+    def count(self, name, value=1):
+        with self.lock:
+            self.stats[name] += value
+
+    def roll(self, rate):
+        if rate <= 0:
+            return False
+        with self.lock:
+            return self.rng.random() < rate
+
+    def delay(self):
+        if self.latency <= 0 and self.jitter <= 0:
+            return
+        with self.lock:
+            jitter = self.rng.uniform(-self.jitter, self.jitter) if self.jitter > 0 else 0.0
+        time.sleep(max(self.latency + jitter, 0.0))
+
+    def num_articles(self):
+        if self.publish_every <= 0:
+            return self.articles
+        return self.articles + int((time.time() - self.started_at) / self.publish_every)
+
+    def cards(self, tab, offset: int, base):
+        n = self.num_articles()
+        # newest first
+        indices = range(n - 1 - offset, max(n - 1 - offset - page_size, -1), -1)
+        self.count("cards", len(indices))
+        return bench_fixtures.profile_cards(tab, indices, seed=self.seed, base=base)
+
+    def profile(self, author, tab, base):
+        self.count("profiles")
+        head = scroll_script % {
+            "offset": page_size,
+            "author": author,
+            "tab": tab,
+            "root": tab_roots[tab],
+            "page_size": page_size,
+        }
+        cards = self.cards(tab, 0, base)
+        return bench_fixtures.profile_page(tab, 0, cards=cards, head=head)
+
+    def article(self, kind, article_id):
+        self.count("articles")
+        if self.roll(self.login_wall_rate):
+            self.count("login_walls")
+            return bench_fixtures.wrap_page("登录", login_wall_body)
+
+        i = (int(article_id) - int(bench_fixtures.get_article_id(0))) // 7919
+        return bench_fixtures.article_page(kind, i, seed=self.seed)
+
+    def handle(self, path, query, base):
+        """
+        (status, content type, body) of a request.
+        """
+        self.count("requests")
+        self.delay()
+
+        if path == "/status":
+            with self.lock:
+                stats = {**self.stats, "uptime": round(time.time() - self.started_at, 1)}
+            return 200, "application/json", orjson.dumps(stats)
+
+        if self.roll(self.error_rate):
+            self.count("errors")
+            return 503, "text/html", b"<html><body>503 Service Temporarily Unavailable</body></html>"
+
+        parts = [p for p in path.split("/") if p]
+
+        # /c/user/token/{author}/?tab=article|wtt, /album/{author}/
+        if len(parts) >= 4 and parts[:3] == ["c", "user", "token"]:
+            tab = "tt_wtt" if query.get("tab", ["article"])[0] == "wtt" else "tt_article"
+            return 200, "text/html", self.profile(parts[3], tab, base).encode("utf-8")
+        if len(parts) == 2 and parts[0] == "album":
+            return 200, "text/html", self.profile(parts[1], "wp", base).encode("utf-8")
+
+        if path == "/api/cards":
+            tab = query.get("tab", ["tt_article"])[0]
+            offset = int(query.get("offset", ["0"])[0])
+            return 200, "text/html", self.cards(tab, offset, base).encode("utf-8")
+
+        # /article/{id}/, /w/{id}/, /s?__biz=...
+        if len(parts) == 2 and parts[0] in ["article", "w"] and parts[1].isdigit():
+            kind = "tt_article_page" if parts[0] == "article" else "tt_wtt_page"
+            return 200, "text/html", self.article(kind, parts[1]).encode("utf-8")
+        if path == "/s" and "__biz" in query:
+            i = int(query["__biz"][0][4:].rstrip("="))
+            article_id = bench_fixtures.get_article_id(i)
+            return 200, "text/html", self.article("wp_article_page", article_id).encode("utf-8")
+
+        return 404, "text/html", b"<html><body>404 Not Found</body></html>"
+
+
+class MockServer:
+    """
+    Serves a MockSite on http://host:port in a background thread.
+    """
+
+    def __init__(self, site: MockSite, port: int = 0, host: str = "127.0.0.1"):
+        self.site = site
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                host_header = self.headers.get("Host", None) or f"{host}:{self.server.server_address[1]}"
+                try:
+                    status, content_type, c = site.handle(url.path, parse_qs(url.query), f"http://{host_header}")
+                except (ValueError, KeyError):
+                    status, content_type, c = 400, "text/html", b"<html><body>400 Bad Request</body></html>"
+
+                self.send_response(status)
+                self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+                self.send_header("Content-Length", str(len(c)))
+                self.end_headers()
+                self.wfile.write(c)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def add_site_arguments(parser):
+    parser.add_argument("-p", "--port", help="port, 0 for any free one", type=int, default=8790)
+    parser.add_argument("--articles", help="articles of each profile", type=int, default=200)
+    parser.add_argument("--latency", help="seconds before each response", type=float, default=0.0)
+    parser.add_argument("--jitter", help="+- seconds around the latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", help="share of the requests answered with a 503", type=float, default=0.0)
+    parser.add_argument(
+        "--login-wall-rate",
+        help="share of the articles served behind a login wall",
+        type=float,
+        default=0.0,
+    )
+    parser.add_argument("--publish-every", help="seconds between new articles, 0 for none", type=float, default=0.0)
+
+
+def create_site(args) -> MockSite:
+    return MockSite(
+        articles=args.articles,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        login_wall_rate=args.login_wall_rate,
+        publish_every=args.publish_every,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    add_site_arguments(parser)
+    args = parser.parse_args()
+
+    server = MockServer(create_site(args), port=args.port)
+    server.start()
+    print(f"mock site on {server.base}")
+    print(f"  profiles: {server.base}/c/user/token/{{author}}/?tab=article|wtt, {server.base}/album/{{author}}/")
+    print(f"  status:   {server.base}/status")
+
+    try:
+        while True:
+            time.sleep(1.0)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+import hashlib
+import re
+
+# near-duplicate articles, reposts and lightly edited copies, found by the simhash of their clauses.
+# the candidates of an article come from the bands of its fingerprint, so the cost grows with the
+# corpus and not with its pairs
+
+fingerprint_bits = 64
+# per-bit weights of a fingerprint are summed in parallel, one lane of an int per bit
+lane_bits = 32
+lane_mask = (1 << lane_bits) - 1
+
+# digits are dropped, the publish time and the read counts differ between copies
+digits_re = re.compile(r"\d+")
+clause_re = re.compile(r"[^\s，。、；：？！“”‘’《》（）,.;:?!\"'()\[\]]{4,}")
+
+# spread[p][b]: the bits of byte b at position p of a hash, each moved to its lane
+spread = [
+    [sum(((b >> k) & 1) << ((p * 8 + k) * lane_bits) for k in range(8)) for b in range(256)]
+    for p in range(fingerprint_bits // 8)
+]
+
+
+def get_clauses(txt):
+    return clause_re.findall(digits_re.sub("", txt))
+
+
+def simhash(txt, min_chars: int = 200):
+    """
+    64-bit simhash of the clauses of a text weighted by their length, None when the text is shorter
+    than min_chars, short texts look alike too easily.
+    """
+    acc = 0
+    total = 0
+    for clause in get_clauses(txt):
+        h = hashlib.blake2b(clause.encode("utf-8"), digest_size=8).digest()
+        lanes = 0
+        for p, b in enumerate(h):
+            lanes += spread[p][b]
+        acc += lanes * len(clause)
+        total += len(clause)
+
+    if total < min_chars:
+        return None
+
+    fp = 0
+    for j in range(fingerprint_bits):
+        if ((acc >> (j * lane_bits)) & lane_mask) * 2 > total:
+            fp |= 1 << j
+    return fp
+
+
+def get_bands(max_distance: int):
+    """
+    (shift, mask) of max_distance + 1 bands of the fingerprint, two fingerprints that differ in at
+    most max_distance bits are equal in one band at least.
+    """
+    n = min(max_distance + 1, fingerprint_bits)
+    bands = []
+    start = 0
+    for i in range(n):
+        width = fingerprint_bits // n + (1 if i < fingerprint_bits % n else 0)
+        bands.append((start, (1 << width) - 1))
+        start += width
+    return bands
+
+
+class NearDupIndex:
+    """
+    Fingerprints of the articles added so far, an added article similar to an earlier one at
+    `threshold` or more, 1 - differing bits / 64, is a copy of it.
+
+    Articles are added oldest first so the earliest copy is the one kept.
+    """
+
+    def __init__(self, threshold: float = 0.9, min_chars: int = 200):
+        self.threshold = threshold
+        self.min_chars = min_chars
+        self.max_distance = max(int((1 - threshold) * fingerprint_bits), 0)
+        self.bands = get_bands(self.max_distance)
+        # per band, band value -> keys
+        self.buckets = [{} for _ in self.bands]
+        self.fingerprints = {}
+        # key of a copy -> key of the article it copies
+        self.copies = {}
+        # text hash -> fingerprint, the same text is in several article dirs
+        self.memo = {}
+
+    def get_fingerprint(self, txt, txt_hash=None):
+        if txt_hash is None:
+            return simhash(txt, self.min_chars)
+
+        fp = self.memo.get(txt_hash, False)
+        if fp is False:
+            fp = simhash(txt, self.min_chars)
+            self.memo[txt_hash] = fp
+        return fp
+
+    def find(self, fp):
+        """
+        The key of an indexed article within max_distance bits of the fingerprint, None if there is none.
+        """
+        seen = set()
+        for (shift, mask), buckets in zip(self.bands, self.buckets):
+            for key in buckets.get((fp >> shift) & mask, []):
+                if key in seen:
+                    continue
+                seen.add(key)
+                if (fp ^ self.fingerprints[key]).bit_count() <= self.max_distance:
+                    return key
+        return None
+
+    def add(self, key, txt, txt_hash=None):
+        """
+        Index an article, returns the key of the article it is a copy of, None if it is not a copy.
+        """
+        fp = self.get_fingerprint(txt, txt_hash)
+        if fp is None:
+            return None
+
+        original = self.find(fp)
+        if original is not None:
+            self.copies[key] = original
+            return original
+
+        self.fingerprints[key] = fp
+        for (shift, mask), buckets in zip(self.bands, self.buckets):
+            buckets.setdefault((fp >> shift) & mask, []).append(key)
+        return None
+
+    def add_items(self, keyed_items):
+        """
+        Index (key, article item) pairs oldest first, returns the number of copies found.
+        """
+        n = len(self.copies)
+        for key, item in sorted(keyed_items, key=lambda t: t[1]["date"]):
+            if item["txt"] is not None:
+                self.add(key, item["txt"], item.get("hash", None))
+        return len(self.copies) - n
+
+    def is_copy(self, key):
+        return key in self.copies
@@ -0,0 +1,198 @@
+import os
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlparse
+
+import orjson
+
+# resolves once the document is complete and neither the DOM nor the network
+# changed for quiet_ms, or the body grew past min_height when scrolling
+wait_script = """
+const quietMs = arguments[0];
+const timeoutMs = arguments[1];
+const minHeight = arguments[2];
+const done = arguments[arguments.length - 1];
+
+const start = performance.now();
+let last = start;
+let resources = performance.getEntriesByType("resource").length;
+
+const observer = new MutationObserver(() => {
+    last = performance.now();
+});
+observer.observe(document, { childList: true, subtree: true, characterData: true });
+
+const timer = setInterval(() => {
+    const now = performance.now();
+    const n = performance.getEntriesByType("resource").length;
+    if (n !== resources) {
+        resources = n;
+        last = now;
+    }
+
+    const height = document.body ? document.body.scrollHeight : 0;
+    const grown = minHeight <= 0 || height > minHeight;
+    const quiet = now - last >= quietMs;
+    const complete = document.readyState === "complete";
+
+    if (complete && grown && quiet) {
+        finish(true, height);
+    } else if (now - start >= timeoutMs) {
+        finish(false, height);
+    }
+}, 25);
+
+function finish(ready, height) {
+    clearInterval(timer);
+    observer.disconnect();
+    done({ ready: ready, elapsed: performance.now() - start, height: height });
+}
+"""
+
+# seconds, used until a site has enough samples
+default_timeouts = {
+    "load": 10.0,
+    "scroll": 3.0,
+}
+
+min_timeouts = {
+    "load": 1.0,
+    "scroll": 0.5,
+}
+
+max_timeouts = {
+    "load": 30.0,
+    "scroll": 10.0,
+}
+
+max_samples = 200
+min_samples = 10
+
+
+def percentile(samples, p):
+    if not samples:
+        return 0.0
+
+    ordered = sorted(samples)
+    k = min(int(round(p / 100.0 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[k]
+
+
+class PageReadiness:
+    """
+    Waits on in-page MutationObserver and network-idle signals instead of fixed sleeps.
+
+    The latencies seen per site are persisted, their p95 sets the timeouts of the next waits, up to
+    max_timeouts. Only the waits that became ready are sampled, a scroll times out at the end of a
+    feed and a page that never goes quiet always does.
+    """
+
+    def __init__(self, stats_fp=".torextrader/page_ready.json", quiet_ms: int = 300):
+        self.stats_fp = stats_fp
+        self.quiet_ms = quiet_ms
+        self.lock = threading.Lock()
+
+        # site -> kind -> [seconds]
+        self.samples = {}
+        if os.path.exists(stats_fp):
+            with open(stats_fp, "rb") as fp:
+                c = fp.read()
+                if len(c) > 0:
+                    self.samples = orjson.loads(c)
+
+    def get_site(self, drv):
+        try:
+            return urlparse(drv.current_url).netloc
+        except Exception:
+            return ""
+
+    def timeout(self, site, kind):
+        with self.lock:
+            samples = self.samples.get(site, {}).get(kind, [])
+            if len(samples) < min_samples:
+                return default_timeouts[kind]
+
+            p95 = percentile(samples, 95)
+
+        return min(max(p95 * 1.5, min_timeouts[kind]), max_timeouts[kind])
+
+    def add_sample(self, site, kind, seconds):
+        with self.lock:
+            kinds = self.samples.setdefault(site, {})
+            samples = kinds.setdefault(kind, [])
+            samples.append(round(seconds, 3))
+            if len(samples) > max_samples:
+                del samples[: len(samples) - max_samples]
+
+    def wait(self, drv, kind, min_height: int = 0):
+        site = self.get_site(drv)
+        timeout = self.timeout(site, kind)
+
+        last_script_timeout = get_script_timeout(drv)
+        drv.set_script_timeout(timeout + 5.0)
+        start_time = time.time()
+        try:
+            state = drv.execute_async_script(wait_script, self.quiet_ms, int(timeout * 1000), min_height)
+        except Exception as ex:
+            print(f"page readiness: {ex}")
+            return False
+        finally:
+            if last_script_timeout is not None:
+                drv.set_script_timeout(last_script_timeout)
+
+        if state["ready"]:
+            self.add_sample(site, kind, time.time() - start_time)
+
+        return state["ready"]
+
+    def wait_loaded(self, drv):
+        return self.wait(drv, "load")
+
+    def wait_scrolled(self, drv, last_height):
+        """
+        Returns False if nothing was appended before the timeout, i.e. the end of the feed.
+        """
+        return self.wait(drv, "scroll", min_height=last_height)
+
+    def save(self):
+        path = Path(self.stats_fp).parent
+        if not path.exists():
+            os.makedirs(path)
+
+        with self.lock:
+            c = orjson.dumps(self.samples)
+
+        with open(self.stats_fp, "wb") as fp:
+            fp.write(c)
+
+
+def get_script_timeout(drv):
+    # seconds, None when the driver does not tell
+    try:
+        return drv.timeouts.script
+    except Exception:
+        return None
+
+
+def wait_loaded(readiness, drv, fallback: float):
+    if readiness is None:
+        time.sleep(fallback)
+        return
+
+    readiness.wait_loaded(drv)
+
+
+def wait_scrolled(readiness, drv, last_height, fallback: float):
+    if readiness is None:
+        time.sleep(fallback)
+        return
+
+    readiness.wait_scrolled(drv, last_height)
+
+
+def get_timeout(readiness, drv, kind, fallback: float):
+    if readiness is None:
+        return fallback
+
+    return readiness.timeout(readiness.get_site(drv), kind)
@@ -14,6 +14,9 @@ import pdftotext
 from pypdf import PdfReader
 import pypdfium2
 
+from clean_pool import clean_texts
+from volume_writer import VolumeWriter
+
 
 def load_json(filename: str) -> dict:
     """
@@ -94,130 +97,111 @@ def get_articles_items(article_path):
     return article_items
 
 
+def clean_txt(txt):
+    txt = re.sub(
+        r"【原文】(.*?\n)*?(【\s*译文\s*】|【\s*原文华译\s*】|【\s*闲扯\s*】|【\s*解析\s*】|【\s*读解\s*】|【\s*华译\s*】)",
+        r"【原文】\n 略\n\2",
+        txt,
+    )
+
+    # txt = re.sub(
+    #     r"【原文】((.*)\n)*?【注释】((.*)\n)*?【译文】",
+    #     r"【原文】\n 略\n【译文】",
+    #     txt,
+    # )
+
+    txt = re.sub(
+        r"蔡根谈解读资治通鉴三个特点：1､尽量白话文（译文主要摘抄自《华杉讲透资治通鉴》一书；2､借古说今，会更多在营销管理领域进行解读；3､只摘比较典型的片段，不做长篇连载。",
+        r"",
+        txt,
+    )
+
+    txt = re.sub(
+        r"点赞关注不迷路，可关注微信公众号:通鉴风云，防止失联，后期更多精彩文章(。)*",
+        r"",
+        txt,
+    )
+
+    txt = re.sub(
+        r"读资治通鉴，悟人生哲理。笔者自17年研究资治通鉴迄今已是六年四遍，将300万字神书浓缩为18万字读书笔记，皆是智慧经验，学习前人经验少走弯路回头路，感叹古今多少事都付笑谈中。感谢大家关注支持！",
+        r"",
+        txt,
+    )
+
+    txt = re.sub(
+        r"编者按：.*?\n",
+        r"",
+        txt,
+    )
+
+    txt = re.sub(
+        r"#.*?#",
+        r"",
+        txt,
+    )
+
+    txt = re.sub(
+        r"关注我，带你成为学霸，走向人生巅峰！",
+        r"",
+        txt,
+    )
+
+    txt = re.sub(
+        r"作者简介：.*?\n",
+        r"",
+        txt,
+    )
+
+    txt = re.sub(
+        r"读资治通鉴，悟人生哲理.*?\n",
+        r"",
+        txt,
+    )
+
+    return txt
+
+
 def generate_txts(
     article_items,
     articles_path,
     filter,
     name,
+    jobs: int = 1,
 ):
     group_num = 1000
 
-    group_idx = []
-    group_txts = []
-    txts = ""
-
-    for idx, item in enumerate(article_items):
-        # link = item["link"]
-        # title = item["title"]
-
-        txt = item["txt"]
-
-        if txt is not None:
-            idx_t = idx + 1
-
-            txt = re.sub(
-                r"【原文】(.*?\n)*?(【\s*译文\s*】|【\s*原文华译\s*】|【\s*闲扯\s*】|【\s*解析\s*】|【\s*读解\s*】|【\s*华译\s*】)",
-                r"【原文】\n 略\n\2",
-                txt,
-            )
-
-            # txt = re.sub(
-            #     r"【原文】((.*)\n)*?【注释】((.*)\n)*?【译文】",
-            #     r"【原文】\n 略\n【译文】",
-            #     txt,
-            # )
-
-            txt = re.sub(
-                r"蔡根谈解读资治通鉴三个特点：1､尽量白话文（译文主要摘抄自《华杉讲透资治通鉴》一书；2､借古说今，会更多在营销管理领域进行解读；3､只摘比较典型的片段，不做长篇连载。",
-                r"",
-                txt,
-            )
-
-            txt = re.sub(
-                r"点赞关注不迷路，可关注微信公众号:通鉴风云，防止失联，后期更多精彩文章(。)*",
-                r"",
-                txt,
-            )
-
-            txt = re.sub(
-                r"读资治通鉴，悟人生哲理。笔者自17年研究资治通鉴迄今已是六年四遍，将300万字神书浓缩为18万字读书笔记，皆是智慧经验，学习前人经验少走弯路回头路，感叹古今多少事都付笑谈中。感谢大家关注支持！",
-                r"",
-                txt,
-            )
-
-            txt = re.sub(
-                r"编者按：.*?\n",
-                r"",
-                txt,
-            )
-
-            txt = re.sub(
-                r"#.*?#",
-                r"",
-                txt,
-            )
-
-            txt = re.sub(
-                r"关注我，带你成为学霸，走向人生巅峰！",
-                r"",
-                txt,
-            )
-
-            txt = re.sub(
-                r"作者简介：.*?\n",
-                r"",
-                txt,
-            )
-
-            txt = re.sub(
-                r"读资治通鉴，悟人生哲理.*?\n",
-                r"",
-                txt,
-            )
-
-            txts += f"第{idx_t:04}章\n\n{txt}\n"
-
-            if idx_t % group_num == 0:
-                group_idx.append(idx_t)
-                group_txts.append(txts)
-                txts = ""
-
-        pass
-
-    if txts:
-        group_idx.append(len(article_items))
-        group_txts.append(txts)
-
-    last_idx = 1
-    for i, txts in enumerate(group_txts):
-        idx = group_idx[i]
-
-        # fn = f"{articles_path}/{last_idx:04}_{idx:04}_{name}"
-        # fn = f"{articles_path}/{last_idx:04}_{name}"
-        if last_idx > 1:
-            fn = f"{articles_path}/{last_idx:04}_{name}"
-        else:
-            fn = f"{articles_path}/{name}"
+    # cleaned in order, by a process pool when jobs > 1
+    cleaned_txts = clean_texts(
+        clean_txt,
+        [item["txt"] for item in article_items if item["txt"] is not None],
+        jobs=jobs,
+    )
+
+    # chapters are streamed to the volumes as they are cleaned, the first volume keeps the bare name
+    with VolumeWriter(articles_path, group_num, number_first=False) as writer:
+        for idx, item in enumerate(article_items):
+            # link = item["link"]
+            # title = item["title"]
+
+            txt = item["txt"]
+
+            if txt is not None:
+                idx_t = idx + 1
+
+                txt = next(cleaned_txts)
+
+                writer.write_chapter(idx_t, f"第{idx_t:04}章\n\n{txt}\n")
 
-        if filter:
-            fn = f"{fn}_{filter}.txt"
-        else:
-            fn = f"{fn}.txt"
             pass
 
-        with open(
-            fn,
-            "w",
-            encoding="utf-8",
-        ) as fp:
-            fp.write(txts)
-            last_idx = idx
-            print(f"{fn} generated")
+        cleaned_txts.close()
+
+        writer.commit(f"{name}_{filter}" if filter else name)
 
     pass
 
 
-def handle_item(item, force, nocache, max_articles):
+def handle_item(item, force, nocache, max_articles, jobs=1):
     link = item["link"]
     name = item["name"]
     filter = item["filter"]
@@ -238,6 +222,7 @@ def handle_item(item, force, nocache, max_articles):
         articles_path,
         filter=filter,
         name=name,
+        jobs=jobs,
     )
 
 
@@ -255,6 +240,13 @@ def main():
         "-n", "--nocache", help="refresh all articles", action="store_true"
     )
     parser.add_argument("-x", "--index", help="index", type=int, default=None)
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        help="number of processes to clean the articles with, 0 for all cores",
+        type=int,
+        default=1,
+    )
     parser.add_argument(
         "-c",
         "--config",
@@ -278,11 +270,11 @@ def main():
 
             item = items[idx]
             max_articles = item.get("max", max_articles_default)
-            handle_item(item, args.force, args.nocache, max_articles)
+            handle_item(item, args.force, args.nocache, max_articles, args.jobs)
         else:
             for item in items:
                 max_articles = item.get("max", max_articles_default)
-                handle_item(item, args.force, args.nocache, max_articles)
+                handle_item(item, args.force, args.nocache, max_articles, args.jobs)
                 pass
     else:
         print("no config specified")
@@ -291,4 +283,5 @@ def main():
     pass
 
 
-main()
+if __name__ == "__main__":
+    main()
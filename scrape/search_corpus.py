@@ -0,0 +1,154 @@
+import argparse
+import datetime as dttm
+import glob
+import os
+import time
+
+from termcolor import colored
+
+import web_toutiao
+from search_index import get_search_index, search_index_fp
+from text_cache import get_text_cache
+from volume_writer import VolumeWriter
+
+# search the downloaded articles of all the authors and write the hits as a topic volume
+# uv run python .\scrape\search_corpus.py --update 资治通鉴
+# uv run python .\scrape\search_corpus.py 资治通鉴 -白话 --export
+# the index is kept up to date by web_toutiao --search, --update indexes the articles it missed
+
+articles_path = ".torextrader/toutiao"
+
+
+def get_article_paths(path=articles_path):
+    return sorted(
+        p for p in glob.glob(os.path.join(path, "*")) if os.path.isdir(p) and not os.path.basename(p).startswith(".")
+    )
+
+
+def update_index(index, article_paths):
+    """
+    Index the new and changed articles and drop the removed ones, returns (added, removed).
+    """
+    stats = index.get_stats()
+    seen = set()
+    added = 0
+    for article_path in article_paths:
+        # parses the new files into the text cache, the items below are read from it
+        web_toutiao.get_articles_items(article_path)
+        cache = get_text_cache(article_path)
+
+        for file_name in glob.iglob(os.path.join(article_path, "**"), recursive=False):
+            if not os.path.isfile(file_name):
+                continue
+            path = os.path.normpath(file_name)
+            seen.add(path)
+
+            st = os.stat(file_name)
+            if stats.get(path, None) == (st.st_mtime_ns, st.st_size):
+                continue
+            index.add(file_name, cache.get_item(file_name, st) or None, st=st, commit=False)
+            added += 1
+
+    index.commit()
+
+    roots = set(os.path.normpath(p) for p in article_paths)
+    removed = [p for p in stats if p not in seen and os.path.dirname(p) in roots]
+    index.remove(removed)
+
+    return added, len(removed)
+
+
+def load_hits(hits):
+    """
+    The article items of the hits, oldest first, their texts are read from the text caches.
+    """
+    article_items = []
+    for hit in hits:
+        file_name = hit["path"]
+        if not os.path.isfile(file_name):
+            continue
+        cache = get_text_cache(hit["article_path"])
+        st = os.stat(file_name)
+        article_item = cache.get_item(file_name, st)
+        if article_item is None:
+            article_item = web_toutiao.parse_article_file(file_name, date=hit["date"])
+            cache.record(file_name, article_item)
+        if article_item:
+            article_items.append(article_item)
+
+    return sorted(article_items, key=lambda x: x["date"] or dttm.datetime.min)
+
+
+def export_topic(hits, name, group_num: int = 2000):
+    article_items = load_hits(hits)
+    if not article_items:
+        return
+
+    with VolumeWriter(articles_path, group_num) as writer:
+        web_toutiao.generate_txts(article_items, writer, rules="toutiao", cache=None)
+        writer.commit(f"topic_{name}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("query", nargs="*", help="terms all matched, -term excludes the articles with it")
+    parser.add_argument("--update", help="index the articles that changed since the last update", action="store_true")
+    parser.add_argument("--rebuild", help="drop the index and index all the articles again", action="store_true")
+    parser.add_argument("--title", help="match the titles only", action="store_true")
+    parser.add_argument("-a", "--authors", nargs="*", default=None, help="article dirs to search, defaults to all")
+    parser.add_argument("-n", "--limit", type=int, default=20, help="hits to list, 0 for all")
+    parser.add_argument(
+        "--export",
+        nargs="?",
+        const="",
+        default=None,
+        type=str,
+        help="write all the hits to topic_{name}.txt, the name defaults to the query",
+    )
+    parser.add_argument("-g", "--group_num", type=int, default=2000, help="articles per volume")
+    parser.add_argument("--db", default=search_index_fp, type=str, help="index file")
+
+    # -term is an exclusion, not an option
+    args, rest = parser.parse_known_args()
+    unknown = [a for a in rest if a.startswith("--") or not a.startswith("-")]
+    if unknown:
+        parser.error(f"unrecognized arguments: {' '.join(unknown)}")
+    args.query += rest
+
+    index = get_search_index(args.db)
+
+    if args.rebuild:
+        index.rebuild()
+
+    if args.update or args.rebuild:
+        start_time = time.perf_counter()
+        added, removed = update_index(index, get_article_paths())
+        elapsed = time.perf_counter() - start_time
+        print(f"indexed {added} articles, removed {removed}, {index.count()} in all, {elapsed:.1f}s")
+
+    if not args.query:
+        return
+
+    query = " ".join(args.query)
+    article_paths = [os.path.join(articles_path, a) for a in args.authors] if args.authors else None
+
+    start_time = time.perf_counter()
+    hits = index.search(query, title_only=args.title, article_paths=article_paths)
+    elapsed = time.perf_counter() - start_time
+    print(colored(f"{len(hits)} articles match {query}, {elapsed * 1000:.1f}ms", "green"))
+
+    shown = hits if args.limit <= 0 else hits[: args.limit]
+    for hit in shown:
+        date = hit["date"].strftime("%Y-%m-%d") if hit["date"] else "----------"
+        print(f"{date} {os.path.basename(hit['article_path'])} {hit['title']}")
+    if len(shown) < len(hits):
+        print(f"... {len(hits) - len(shown)} more")
+
+    if args.export is not None and hits:
+        name = args.export or "_".join(t for t in args.query if not t.startswith("-"))
+        export_topic(hits, name, group_num=args.group_num)
+
+
+if __name__ == "__main__":
+    main()
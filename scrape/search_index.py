@@ -0,0 +1,234 @@
+import datetime as dttm
+import os
+import re
+import sqlite3
+import threading
+
+# full-text index of the downloaded articles of all the authors, sqlite fts5 over cjk bigrams,
+# see search_corpus.py for the cli and the topic volumes
+
+search_index_fp = ".torextrader/search.sqlite"
+
+# bumped when the tables change, an older index is dropped and built again by the next update
+schema_version = 2
+
+cjk = "\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff"
+word_re = re.compile(f"[{cjk}]+|[0-9a-zA-Z]+")
+cjk_re = re.compile(f"[{cjk}]")
+
+
+def tokenize(text):
+    """
+    The text as space separated tokens for fts5, runs of cjk characters as overlapping bigrams,
+    e.g. 资治通鉴 is 资治 治通 通鉴, latin words and numbers lowercased.
+    """
+    tokens = []
+    for m in word_re.finditer(text):
+        w = m.group()
+        if cjk_re.match(w) is None:
+            tokens.append(w.lower())
+        elif len(w) == 1:
+            tokens.append(w)
+        else:
+            tokens.extend(w[i : i + 2] for i in range(len(w) - 1))
+    return " ".join(tokens)
+
+
+def to_match(query, title_only: bool = False):
+    """
+    The fts5 expression of a query, its terms are all matched as substrings, a term starting with
+    - excludes the articles with it. None when the query has no term to match.
+    """
+    positive = []
+    negative = []
+    for term in query.split():
+        exclude = term.startswith("-") and len(term) > 1
+        phrase = tokenize(term[1:] if exclude else term)
+        if not phrase:
+            continue
+
+        # a single cjk character matches the bigrams it starts
+        expr = f'"{phrase}" *' if len(phrase) == 1 and cjk_re.match(phrase) else f'"{phrase}"'
+        (negative if exclude else positive).append(expr)
+
+    if not positive:
+        return None
+
+    expr = " AND ".join(positive)
+    if negative:
+        expr = f"({expr}) NOT " + " NOT ".join(negative)
+    return f"title : ({expr})" if title_only else expr
+
+
+class SearchIndex:
+    """
+    The articles are in `docs`, their tokenized title and text in the fts5 table `fts` under the
+    same rowid. The fts rows of an article are deleted with it, so an article written again only
+    matches its new text and a reused rowid matches nothing of the article it had before.
+    """
+
+    def __init__(self, db_fp=search_index_fp):
+        self.db_fp = db_fp
+        self.lock = threading.Lock()
+
+        path = os.path.dirname(db_fp)
+        if path and not os.path.exists(path):
+            os.makedirs(path)
+
+        self.conn = sqlite3.connect(db_fp, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.create()
+
+    def create(self):
+        if self.conn.execute("PRAGMA user_version").fetchone()[0] != schema_version:
+            # version 1 had a contentless fts table, its rows could not be deleted
+            self.drop()
+            self.conn.execute(f"PRAGMA user_version = {schema_version}")
+
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS docs (
+                id INTEGER PRIMARY KEY,
+                path TEXT UNIQUE,
+                article_path TEXT,
+                link_id TEXT,
+                title TEXT,
+                date TEXT,
+                mtime_ns INTEGER,
+                size INTEGER
+            )
+            """
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS docs_article_path ON docs (article_path)")
+        self.conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS fts USING fts5(title, body)")
+        self.conn.commit()
+
+    def drop(self):
+        self.conn.execute("DROP TABLE IF EXISTS fts")
+        self.conn.execute("DROP TABLE IF EXISTS docs")
+        self.conn.commit()
+
+    def delete(self, path):
+        # with the lock held
+        self.conn.execute("DELETE FROM fts WHERE rowid IN (SELECT id FROM docs WHERE path = ?)", (path,))
+        self.conn.execute("DELETE FROM docs WHERE path = ?", (path,))
+
+    def get_stats(self):
+        """
+        path -> (mtime_ns, size) of the indexed articles of all the dirs.
+        """
+        with self.lock:
+            rows = self.conn.execute("SELECT path, mtime_ns, size FROM docs")
+            return dict((r[0], (r[1], r[2])) for r in rows)
+
+    def add(self, file_name, article_item, st=None, commit: bool = True):
+        """
+        Index an article file with its parsed item, None for an invalid one, which is dropped.
+        """
+        path = os.path.normpath(file_name)
+        st = st if st is not None else os.stat(file_name)
+
+        with self.lock:
+            self.delete(path)
+            if article_item:
+                date = article_item["date"].isoformat() if article_item["date"] else None
+                cur = self.conn.execute(
+                    "INSERT INTO docs (path, article_path, link_id, title, date, mtime_ns, size) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        path,
+                        os.path.dirname(path),
+                        article_item["link"],
+                        article_item["title"],
+                        date,
+                        st.st_mtime_ns,
+                        st.st_size,
+                    ),
+                )
+                self.conn.execute(
+                    "INSERT INTO fts (rowid, title, body) VALUES (?, ?, ?)",
+                    (cur.lastrowid, tokenize(article_item["title"] or ""), tokenize(article_item["txt"] or "")),
+                )
+            if commit:
+                self.conn.commit()
+
+    def remove(self, paths):
+        with self.lock:
+            for path in paths:
+                self.delete(os.path.normpath(path))
+            self.conn.commit()
+
+    def commit(self):
+        with self.lock:
+            self.conn.commit()
+
+    def search(self, query, title_only: bool = False, article_paths=None, limit: int = 0):
+        """
+        The articles matching the query, oldest first, as dicts of path, article_path, link_id,
+        title and date.
+        """
+        expr = to_match(query, title_only=title_only)
+        if expr is None:
+            return []
+
+        sql = (
+            "SELECT docs.path, docs.article_path, docs.link_id, docs.title, docs.date "
+            "FROM fts JOIN docs ON docs.id = fts.rowid WHERE fts MATCH ?"
+        )
+        params = [expr]
+        if article_paths:
+            paths = [os.path.normpath(p) for p in article_paths]
+            sql += f" AND docs.article_path IN ({','.join('?' * len(paths))})"
+            params.extend(paths)
+        sql += " ORDER BY docs.date"
+        if limit > 0:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        with self.lock:
+            rows = self.conn.execute(sql, params).fetchall()
+
+        return [
+            {
+                "path": r[0],
+                "article_path": r[1],
+                "link_id": r[2],
+                "title": r[3],
+                "date": dttm.datetime.fromisoformat(r[4]) if r[4] else None,
+            }
+            for r in rows
+        ]
+
+    def rebuild(self):
+        """
+        Drop everything, the next update indexes all the articles again.
+        """
+        with self.lock:
+            self.drop()
+            self.create()
+
+    def count(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+search_indexes = {}
+search_indexes_lock = threading.Lock()
+
+
+def get_search_index(db_fp=search_index_fp) -> SearchIndex:
+    """
+    Get the shared search index, it is opened once per process.
+    """
+    with search_indexes_lock:
+        index = search_indexes.get(db_fp, None)
+        if index is None:
+            index = SearchIndex(db_fp)
+            search_indexes[db_fp] = index
+
+    return index
@@ -0,0 +1,127 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+try:
+    # zstandard, optional, zlib otherwise
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# the raw html of the fetched pages, so the articles can be extracted and cleaned again without
+# crawling, see --snapshots and --reprocess of web_toutiao
+
+snapshots_path = ".torextrader/snapshots"
+
+codecs = {"zst": "zstd", "z": "zlib"}
+
+
+class SnapshotStore:
+    """
+    Content-addressed page snapshots, objects/{hash[:2]}/{hash}.zst, or .z without zstandard, a
+    page fetched again unchanged is stored once. index.sqlite maps a link to its last snapshot.
+    """
+
+    def __init__(self, path=snapshots_path, level: int = 10):
+        self.path = path
+        self.level = level
+        self.lock = threading.Lock()
+        self.ext = "zst" if zstandard is not None else "z"
+
+        if not os.path.exists(path):
+            os.makedirs(path)
+
+        self.conn = sqlite3.connect(os.path.join(path, "index.sqlite"), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS snapshots (
+                link TEXT PRIMARY KEY,
+                hash TEXT,
+                ext TEXT,
+                size INTEGER,
+                stored INTEGER,
+                fetched_at REAL,
+                source TEXT
+            )
+            """
+        )
+        self.conn.commit()
+
+    def get_object_fp(self, h, ext):
+        return os.path.join(self.path, "objects", h[:2], f"{h}.{ext}")
+
+    def compress(self, data: bytes):
+        if self.ext == "zst":
+            return zstandard.ZstdCompressor(level=self.level).compress(data)
+        return zlib.compress(data, 6)
+
+    def decompress(self, data: bytes, ext):
+        if ext == "zst":
+            if zstandard is None:
+                raise RuntimeError("the snapshot is zstd compressed, install zstandard")
+            return zstandard.ZstdDecompressor().decompress(data)
+        return zlib.decompress(data)
+
+    def put(self, link, html, source="selenium"):
+        """
+        Store the html of a link, returns its hash.
+        """
+        data = html.encode("utf-8")
+        h = hashlib.sha1(data).hexdigest()
+
+        object_fp = self.get_object_fp(h, self.ext)
+        stored = 0
+        if not os.path.exists(object_fp):
+            c = self.compress(data)
+            os.makedirs(os.path.dirname(object_fp), exist_ok=True)
+            # written aside and renamed, a concurrent put of the same page writes the same bytes
+            tmp_fp = f"{object_fp}.{threading.get_ident()}.tmp"
+            with open(tmp_fp, "wb") as fp:
+                fp.write(c)
+            os.replace(tmp_fp, object_fp)
+            stored = len(c)
+
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (link, h, self.ext, len(data), stored, time.time(), source),
+            )
+            self.conn.commit()
+
+        return h
+
+    def get(self, link):
+        """
+        The html of the last snapshot of a link, None if there is none.
+        """
+        with self.lock:
+            row = self.conn.execute("SELECT hash, ext FROM snapshots WHERE link = ?", (link,)).fetchone()
+
+        if row is None:
+            return None
+
+        h, ext = row
+        object_fp = self.get_object_fp(h, ext)
+        if not os.path.exists(object_fp):
+            return None
+
+        with open(object_fp, "rb") as fp:
+            return self.decompress(fp.read(), ext).decode("utf-8")
+
+    def report(self):
+        with self.lock:
+            n, size, stored = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(stored), 0) FROM snapshots"
+            ).fetchone()
+
+        ratio = size / stored if stored else 0.0
+        print(f"snapshots: {n} pages, {size / 1e6:.1f}MB of html in {stored / 1e6:.1f}MB, {ratio:.1f}x")
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,103 @@
+import time
+from collections import deque
+
+from selenium.webdriver.support.wait import WebDriverWait
+
+from throttle import throttle_acquire
+
+# marks the document a tab is leaving, the next page is loaded once the mark is gone
+navigate_script = """
+window.__prefetchStale = true;
+window.location.assign(arguments[0]);
+"""
+
+ready_script = """
+return !window.__prefetchStale && document.readyState === "complete";
+"""
+
+
+class TabPrefetcher:
+    """
+    Loads the next links of a queue in the other tabs of one driver while the page of the
+    current one is read, at most `tabs` pages are loading or read at a time.
+
+    The first tab is the one the driver is on, the others are opened by open() and closed
+    by close().
+    """
+
+    def __init__(self, drv, tabs: int = 3, timeout: float = 10.0, throttle=None):
+        self.drv = drv
+        self.throttle = throttle
+        self.tabs = max(tabs, 1)
+        self.timeout = timeout
+        self.main = None
+        self.handles = []
+
+    def open(self):
+        self.main = self.drv.current_window_handle
+        self.handles = [self.main]
+        for _ in range(self.tabs - 1):
+            self.drv.switch_to.new_window("tab")
+            self.handles.append(self.drv.current_window_handle)
+        self.drv.switch_to.window(self.main)
+
+    def close(self):
+        for handle in self.handles:
+            if handle == self.main:
+                continue
+            try:
+                self.drv.switch_to.window(handle)
+                self.drv.close()
+            except Exception as ex:
+                print("close tab failed:", ex)
+        self.drv.switch_to.window(self.main)
+        self.handles = []
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def navigate(self, handle, link):
+        # returns at once, unlike driver.get, the page loads while the other tabs are read
+        throttle_acquire(self.throttle, link)
+        self.drv.switch_to.window(handle)
+        self.drv.execute_script(navigate_script, link)
+
+    def wait_ready(self):
+        try:
+            WebDriverWait(self.drv, self.timeout, poll_frequency=0.05).until(
+                lambda d: d.execute_script(ready_script)
+            )
+            return True
+        except Exception as ex:
+            print("page not ready:", ex)
+            return False
+
+    def pages(self, links):
+        """
+        Yields (link, seconds since its load started) in queue order, with the driver on the
+        tab of the link and the document loaded. The tab loads the link `tabs` ahead once
+        the caller asks for the next page.
+        """
+        links = iter(links)
+        pending = deque()
+        for handle in self.handles:
+            link = next(links, None)
+            if link is None:
+                break
+            self.navigate(handle, link)
+            pending.append((link, handle, time.perf_counter()))
+
+        while pending:
+            link, handle, started_at = pending.popleft()
+            self.drv.switch_to.window(handle)
+            self.wait_ready()
+            yield link, time.perf_counter() - started_at
+
+            link = next(links, None)
+            if link is not None:
+                self.navigate(handle, link)
+                pending.append((link, handle, time.perf_counter()))
@@ -0,0 +1,47 @@
+import pytest
+
+from article_filter import compile_filter, get_filter_suffix
+
+titles = ["读资治通鉴", "史记·项羽本纪", "汉书", "第12卷 周纪", "资治通鉴广告"]
+
+
+@pytest.mark.parametrize("flter", [None, "", [], [""], {"keywords": [""]}, {"keywords": ""}])
+def test_empty_filter_matches_every_title(flter):
+    article_filter = compile_filter(flter)
+    assert all(article_filter.match_title(t) for t in titles)
+    assert not article_filter.match_title("")
+    assert not article_filter.match_title(None)
+
+
+def test_empty_keyword_is_ignored():
+    article_filter = compile_filter(["", "汉书"])
+    assert [t for t in titles if article_filter.match_title(t)] == ["汉书"]
+
+
+@pytest.mark.parametrize("flter", ["资治通鉴", ["史记", "汉书"], ["通鉴", "周纪"]])
+def test_keywords_match_like_find(flter):
+    keywords = flter if isinstance(flter, list) else [flter]
+    article_filter = compile_filter(flter)
+    for t in titles:
+        assert article_filter.match_title(t) == any(t.find(k) >= 0 for k in keywords)
+
+
+def test_regex_and_exclude():
+    article_filter = compile_filter({"keywords": "资治通鉴", "regex": [r"第\d+卷"], "exclude": ["广告"]})
+    assert [t for t in titles if article_filter.match_title(t)] == ["读资治通鉴", "第12卷 周纪"]
+
+
+def test_body_is_matched_once_downloaded():
+    article_filter = compile_filter({"keywords": ["赤壁"], "exclude": ["广告"], "body": True})
+    assert article_filter.match_title("三国")
+    assert not article_filter.match_title("三国广告")
+    assert article_filter.match("三国", "赤壁之战")
+    assert not article_filter.match("三国", "官渡之战")
+    assert not article_filter.match("三国", "赤壁之战 广告")
+
+
+def test_suffix_of_string_and_list_filters_is_unchanged():
+    assert get_filter_suffix(None) == "_None"
+    assert get_filter_suffix("资治通鉴") == "_资治通鉴"
+    assert get_filter_suffix(["史记", "汉书"]) == "_史记_汉书"
+    assert get_filter_suffix({"keywords": ["史记"], "name": "史"}) == "_史"
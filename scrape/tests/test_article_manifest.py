@@ -0,0 +1,32 @@
+from article_manifest import get_manifest, manifest_name
+
+
+def test_sync_sees_the_files_changed_since_open(tmp_path):
+    manifest = get_manifest(str(tmp_path))
+    manifest.record("1", "a" * 300)
+    manifest.record("2", "b" * 300)
+    assert manifest.size("1") == 300
+
+    # rewritten and removed outside of the process between two crawls
+    (tmp_path / "1.txt").write_text("a" * 10, encoding="utf-8")
+    (tmp_path / "3.txt").write_text("c" * 20, encoding="utf-8")
+
+    assert get_manifest(str(tmp_path)).size("1") == 300
+    manifest = get_manifest(str(tmp_path), sync=True)
+    assert manifest.size("1") == 10
+    assert manifest.length("1") == 10
+    assert manifest.get("1")["status"] == "short"
+    assert manifest.size("2") is None
+    assert manifest.size("3") == 20
+
+
+def test_lookup_does_not_create_the_dir(tmp_path):
+    article_path = tmp_path / "article_x"
+    manifest = get_manifest(str(article_path))
+    assert manifest.size("1") is None
+    assert manifest.items() == []
+    assert not article_path.exists()
+
+    manifest.record("1", "a" * 300, item={"link": "x"})
+    assert (article_path / manifest_name).exists()
+    assert manifest.items() == [("1", {"link": "x"})]
@@ -0,0 +1,43 @@
+import orjson
+
+from crawl_checkpoint import CrawlCheckpoint, checkpoint_name
+
+link = "https://www.toutiao.com/c/user/token/x/"
+
+
+def test_downloaded_links_survive_a_restart(tmp_path):
+    checkpoint = CrawlCheckpoint(str(tmp_path), link)
+    items = [{"link": f"https://www.toutiao.com/article/{i}/", "title": str(i)} for i in range(100)]
+    checkpoint.save_scan(items, 1000, done=True)
+    state = (tmp_path / checkpoint_name).read_bytes()
+
+    for item in items[:60]:
+        checkpoint.mark_downloaded(item["link"])
+    # the queue is not written again per downloaded link
+    assert (tmp_path / checkpoint_name).read_bytes() == state
+
+    resumed = CrawlCheckpoint(str(tmp_path), link)
+    assert resumed.exists and resumed.scanned
+    assert len(resumed.update_items) == 100
+    assert len(resumed.downloaded) == 60
+    assert resumed.is_downloaded(items[59]["link"])
+    assert not resumed.is_downloaded(items[60]["link"])
+
+    resumed.clear()
+    assert not CrawlCheckpoint(str(tmp_path), link).exists
+
+
+def test_links_of_an_older_checkpoint_are_read(tmp_path):
+    state = {"link": link, "scanned": False, "scroll_height": 10, "scrolls": 1, "update_items": [], "downloaded": ["a"]}
+    (tmp_path / checkpoint_name).write_bytes(orjson.dumps(state))
+
+    checkpoint = CrawlCheckpoint(str(tmp_path), link)
+    checkpoint.mark_downloaded("b")
+    checkpoint.save_scan([], 20)
+    assert CrawlCheckpoint(str(tmp_path), link).downloaded == {"a", "b"}
+
+
+def test_checkpoint_of_another_profile_is_ignored(tmp_path):
+    checkpoint = CrawlCheckpoint(str(tmp_path), link)
+    checkpoint.mark_downloaded("a")
+    assert not CrawlCheckpoint(str(tmp_path), "https://other/").exists
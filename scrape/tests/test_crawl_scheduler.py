@@ -0,0 +1,35 @@
+import threading
+from contextlib import contextmanager
+
+from crawl_scheduler import CrawlHistory, CrawlScheduler, CrawlTask
+
+
+class FakePool:
+    size = 2
+
+    @contextmanager
+    def session(self):
+        yield None
+
+
+def test_tasks_of_the_same_key_are_crawled_once(tmp_path):
+    lock = threading.Lock()
+    runs = []
+
+    def crawl(key, drv):
+        with lock:
+            runs.append(key)
+        return [key]
+
+    def task(key):
+        return CrawlTask(key, lambda drv: crawl(key, drv))
+
+    merged = []
+    groups = [
+        ([task("a")], merged.append),
+        ([task("b"), task("a")], merged.append),
+    ]
+    CrawlScheduler(FakePool(), CrawlHistory(str(tmp_path / "history.json"))).run(groups)
+
+    assert sorted(runs) == ["a", "b"]
+    assert merged == [[["a"]], [["b"], ["a"]]]
@@ -0,0 +1,45 @@
+import datetime as dttm
+import random
+
+import bench_fixtures
+import web_toutiao
+
+
+def write_article(article_path, i, txt):
+    fp = article_path / f"{bench_fixtures.get_article_id(i)}.txt"
+    fp.write_text(txt, encoding="utf-8")
+
+
+def test_copy_is_kept_when_original_fails_body_filter(tmp_path):
+    article_path = tmp_path / "article_1_a"
+    article_path.mkdir()
+
+    original = bench_fixtures.make_article_txt(random.Random(1), 0, dttm.datetime(2024, 1, 1))
+    write_article(article_path, 0, original)
+    # a repost a day later that also mentions the keyword
+    copy = bench_fixtures.make_article_txt(random.Random(1), 0, dttm.datetime(2024, 1, 2))
+    write_article(article_path, 1, f"{copy}\n\n赤壁之战的故事\n")
+
+    item = {"filter": {"keywords": ["赤壁"], "body": True}}
+    article_items = web_toutiao.get_items_to_write(str(article_path), item, 0)
+    assert [x["link"] for x in article_items] == [bench_fixtures.get_article_id(1)]
+
+    dedup = web_toutiao.get_dedup_index(0.9, [(str(article_path), article_items)])
+    assert not dedup.is_copy((str(article_path), bench_fixtures.get_article_id(1)))
+
+
+def test_copy_of_written_article_is_dropped(tmp_path):
+    article_path = tmp_path / "article_1_a"
+    article_path.mkdir()
+
+    original = bench_fixtures.make_article_txt(random.Random(1), 0, dttm.datetime(2024, 1, 1))
+    write_article(article_path, 0, f"{original}\n\n赤壁之战\n")
+    copy = bench_fixtures.make_article_txt(random.Random(1), 0, dttm.datetime(2024, 1, 2))
+    write_article(article_path, 1, f"{copy}\n\n赤壁之战的故事\n")
+
+    item = {"filter": {"keywords": ["赤壁"], "body": True}}
+    article_items = web_toutiao.get_items_to_write(str(article_path), item, 0)
+    assert len(article_items) == 2
+
+    dedup = web_toutiao.get_dedup_index(0.9, [(str(article_path), article_items)])
+    assert dedup.is_copy((str(article_path), bench_fixtures.get_article_id(1)))
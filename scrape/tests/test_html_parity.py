@@ -0,0 +1,46 @@
+import json
+import os
+
+import pytest
+
+import html_parser
+from html_parity import extractors
+
+# the fixtures are synthetic pages, the cards of bench_fixtures with a few hand written edge cards,
+# not saved snapshots of the sites, a real page may still parse differently on a backend
+fixtures_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# backend -> the module it needs
+backend_modules = {
+    "selectolax": "selectolax.lexbor",
+    "lxml": "lxml.html",
+    "bs4": "bs4",
+}
+
+
+def load_fixture(kind):
+    with open(os.path.join(fixtures_path, f"{kind}.html"), "r", encoding="utf-8") as f:
+        html = f.read()
+    with open(os.path.join(fixtures_path, f"{kind}.json"), "r", encoding="utf-8") as f:
+        expected = json.load(f)
+    return html, expected
+
+
+@pytest.fixture
+def backend(request):
+    name = request.param
+    pytest.importorskip(backend_modules[name])
+    if name == "lxml":
+        pytest.importorskip("cssselect")
+
+    html_parser.set_backend(name)
+    yield name
+    html_parser.set_backend(None)
+
+
+@pytest.mark.parametrize("backend", list(backend_modules), indirect=True)
+@pytest.mark.parametrize("kind", list(extractors))
+def test_backend_extracts_the_fixture_cards(backend, kind):
+    html, expected = load_fixture(kind)
+    assert html_parser.get_backend() == backend
+    assert extractors[kind](html) == expected
@@ -0,0 +1,54 @@
+import datetime as dttm
+
+from search_index import SearchIndex
+
+
+def write_article(tmp_path, name, title, txt):
+    fp = tmp_path / name
+    fp.write_text(f"{title}\n\n{txt}", encoding="utf-8")
+    item = {"link": fp.stem, "title": title, "date": dttm.datetime(2024, 1, 1), "txt": txt}
+    return str(fp), item
+
+
+def test_reindexed_article_drops_old_terms(tmp_path):
+    index = SearchIndex(str(tmp_path / "search.sqlite"))
+
+    fp, item = write_article(tmp_path, "1.txt", "三国", "赤壁之战")
+    index.add(fp, item)
+    assert len(index.search("赤壁")) == 1
+
+    fp, item = write_article(tmp_path, "1.txt", "三国", "官渡之战")
+    index.add(fp, item)
+    assert index.search("赤壁") == []
+    assert len(index.search("官渡")) == 1
+    assert index.count() == 1
+
+
+def test_reused_rowid_does_not_match_removed_article(tmp_path):
+    index = SearchIndex(str(tmp_path / "search.sqlite"))
+
+    index.add(*write_article(tmp_path, "1.txt", "史记", "项羽本纪"))
+    fp, item = write_article(tmp_path, "2.txt", "汉书", "高帝纪")
+    index.add(fp, item)
+    index.remove([fp])
+
+    # the rowid of 2.txt is reused
+    index.add(*write_article(tmp_path, "3.txt", "通鉴", "周纪"))
+    assert index.search("高帝") == []
+    assert [h["title"] for h in index.search("周纪")] == ["通鉴"]
+
+
+def test_contentless_index_is_rebuilt(tmp_path):
+    db_fp = str(tmp_path / "search.sqlite")
+    index = SearchIndex(db_fp)
+    index.conn.execute("DROP TABLE fts")
+    index.conn.execute("CREATE VIRTUAL TABLE fts USING fts5(title, body, content='')")
+    index.conn.execute("PRAGMA user_version = 1")
+    index.conn.commit()
+    index.close()
+
+    index = SearchIndex(db_fp)
+    fp, item = write_article(tmp_path, "1.txt", "三国", "赤壁之战")
+    index.add(fp, item)
+    index.add(*write_article(tmp_path, "1.txt", "三国", "官渡之战"))
+    assert index.search("赤壁") == []
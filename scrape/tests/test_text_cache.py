@@ -0,0 +1,24 @@
+import os
+
+from text_cache import TextCache
+
+
+def test_flush_drops_cleaned_texts_of_removed_articles_with_skipped_ones(tmp_path):
+    cache = TextCache(str(tmp_path))
+    for name in ["1.txt", "2.txt", "3.txt"]:
+        (tmp_path / name).write_text(name, encoding="utf-8")
+
+    item = {"title": "t", "date": None, "txt": "正文"}
+    cache.put_item(str(tmp_path / "1.txt"), os.stat(tmp_path / "1.txt"), item)
+    cache.put_item(str(tmp_path / "2.txt"), os.stat(tmp_path / "2.txt"), {"title": "t", "date": None, "txt": "别的"})
+    # a skipped article, its hash is null
+    cache.put_item(str(tmp_path / "3.txt"), os.stat(tmp_path / "3.txt"), None)
+    cache.flush()
+    cache.put_cleaned("v1", {item["hash"]: "cleaned"})
+
+    os.remove(tmp_path / "1.txt")
+    for name in ["2.txt", "3.txt"]:
+        cache.get_item(str(tmp_path / name), os.stat(tmp_path / name))
+    cache.flush()
+
+    assert cache.get_cleaned("v1") == {}
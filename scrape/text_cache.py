@@ -0,0 +1,279 @@
+import datetime as dttm
+import hashlib
+import os
+import sqlite3
+import threading
+
+from metrics import incr
+
+cache_name = ".text_cache.sqlite"
+
+
+class ArticleItem(dict):
+    """
+    A cached article item, its text is read from the cache the first time item["txt"] is used,
+    so listing, sorting and truncating the articles only loads their metadata.
+    """
+
+    def __init__(self, cache, name, **meta):
+        super().__init__(**meta)
+        self.cache = cache
+        self.name = name
+
+    def __missing__(self, key):
+        if key != "txt":
+            raise KeyError(key)
+
+        txt = self.cache.get_txt(self.name)
+        self["txt"] = txt
+        return txt
+
+
+class TextCache:
+    """
+    Persistent cache of the parsed and the cleaned article texts of one article directory.
+
+    Parsed articles are reused while the file stat is unchanged, cleaned texts are keyed by
+    (text hash, rule-set version) so only new or changed articles are cleaned again.
+
+    Only the metadata of the articles is loaded, the texts are read when they are used. The
+    scrapers record an article when they write it, see record().
+    """
+
+    def __init__(self, article_path):
+        self.article_path = article_path
+        self.db_path = os.path.join(article_path, cache_name)
+        self.lock = threading.Lock()
+
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS articles (
+                name TEXT PRIMARY KEY,
+                mtime_ns INTEGER,
+                size INTEGER,
+                hash TEXT,
+                title TEXT,
+                date TEXT,
+                txt TEXT
+            )
+            """
+        )
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS cleaned (
+                hash TEXT,
+                version TEXT,
+                txt TEXT,
+                PRIMARY KEY (hash, version)
+            )
+            """
+        )
+        self.conn.commit()
+
+        self.articles = None
+        self.pending_articles = []
+        self.seen = set()
+
+        self.hits = 0
+        self.misses = 0
+
+    def load(self):
+        # with the lock held, the merges and the scrapes of run_scheduled share the cache
+        rows = self.conn.execute("SELECT name, mtime_ns, size, hash, title, date FROM articles")
+        self.articles = dict((r[0], r[1:]) for r in rows)
+        self.seen = set()
+
+    def get_item(self, file_name, st):
+        """
+        The cached article item of a file, None if the file is new or changed. An article
+        that was skipped when parsed is returned as False.
+        """
+        name = os.path.basename(file_name)
+        with self.lock:
+            if self.articles is None:
+                self.load()
+            self.seen.add(name)
+            entry = self.articles.get(name, None)
+
+        if entry is None:
+            incr("text_cache_misses")
+            return None
+
+        mtime_ns, size, txt_hash, title, date = entry
+        if mtime_ns != st.st_mtime_ns or size != st.st_size:
+            incr("text_cache_misses")
+            return None
+
+        incr("text_cache_hits")
+        if txt_hash is None:
+            return False
+
+        return ArticleItem(
+            self,
+            name,
+            link=os.path.splitext(name)[0],
+            title=title,
+            date=dttm.datetime.fromisoformat(date) if date else None,
+            hash=txt_hash,
+        )
+
+    def get_txt(self, name):
+        with self.lock:
+            row = self.conn.execute("SELECT txt FROM articles WHERE name = ?", (name,)).fetchone()
+
+        return row[0] if row else None
+
+    def get_row(self, name, st, article_item):
+        if article_item is None:
+            return (name, st.st_mtime_ns, st.st_size, None, None, None, None)
+
+        txt_hash = text_hash(article_item["txt"])
+        article_item["hash"] = txt_hash
+
+        date = article_item["date"].isoformat() if article_item["date"] else None
+        return (name, st.st_mtime_ns, st.st_size, txt_hash, article_item["title"], date, article_item["txt"])
+
+    def put_item(self, file_name, st, article_item):
+        """
+        Cache a freshly parsed article, None for a skipped one. Returns the item with its text hash.
+        """
+        name = os.path.basename(file_name)
+        row = self.get_row(name, st, article_item)
+
+        with self.lock:
+            self.seen.add(name)
+            self.pending_articles.append(row)
+        return article_item
+
+    def record(self, file_name, article_item):
+        """
+        Index an article as it is written, None for an invalid one, so that listing the
+        articles does not read the file again.
+        """
+        name = os.path.basename(file_name)
+        row = self.get_row(name, os.stat(file_name), article_item)
+
+        with self.lock:
+            self.conn.execute("INSERT OR REPLACE INTO articles VALUES (?, ?, ?, ?, ?, ?, ?)", row)
+            self.conn.commit()
+            if self.articles is not None:
+                self.articles[name] = row[1:-1]
+
+    def flush(self):
+        """
+        Write the parsed articles and drop the entries of the files that are gone.
+        """
+        with self.lock:
+            if self.pending_articles:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO articles VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    self.pending_articles,
+                )
+
+            removed = []
+            if self.articles is not None:
+                removed = [(name,) for name in self.articles.keys() if name not in self.seen]
+                if removed:
+                    self.conn.executemany("DELETE FROM articles WHERE name = ?", removed)
+
+            if self.pending_articles or removed:
+                # the hash of a skipped article is null, NOT IN would never be true
+                self.conn.execute(
+                    "DELETE FROM cleaned WHERE NOT EXISTS (SELECT 1 FROM articles WHERE articles.hash = cleaned.hash)"
+                )
+            self.conn.commit()
+
+            self.pending_articles = []
+            self.articles = None
+
+    def get_cleaned(self, version, hashes=None):
+        """
+        hash -> cleaned text of the articles cleaned with a rule-set version, only those of the
+        given text hashes if any.
+        """
+        with self.lock:
+            if hashes is None:
+                rows = self.conn.execute("SELECT hash, txt FROM cleaned WHERE version = ?", (version,))
+                return dict(rows)
+
+            cleaned = {}
+            hashes = [h for h in set(hashes) if h is not None]
+            # sqlite has a limit on the number of parameters
+            for i in range(0, len(hashes), 500):
+                chunk = hashes[i : i + 500]
+                rows = self.conn.execute(
+                    f"SELECT hash, txt FROM cleaned WHERE version = ? AND hash IN ({','.join('?' * len(chunk))})",
+                    (version, *chunk),
+                )
+                cleaned.update(rows)
+            return cleaned
+
+    def put_cleaned(self, version, cleaned):
+        if not cleaned:
+            return
+
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO cleaned VALUES (?, ?, ?)",
+                [(txt_hash, version, txt) for txt_hash, txt in cleaned.items()],
+            )
+            self.conn.commit()
+
+    def clear(self):
+        """
+        Drop every cached text, the next run parses and cleans all the articles again.
+        """
+        with self.lock:
+            self.conn.execute("DELETE FROM articles")
+            self.conn.execute("DELETE FROM cleaned")
+            self.conn.commit()
+
+            self.articles = None
+            self.pending_articles = []
+            self.seen = set()
+
+    def report(self):
+        incr("clean_cache_hits", self.hits)
+        incr("clean_cache_misses", self.misses)
+
+        total = self.hits + self.misses
+        if total > 0:
+            print(f"text cache: {self.hits}/{total} cleaned texts reused")
+        self.hits = 0
+        self.misses = 0
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+def text_hash(txt):
+    return hashlib.sha1(txt.encode("utf-8")).hexdigest()
+
+
+def clean_version(rule_set, **flags):
+    flags = ",".join([f"{k}={int(bool(v))}" for k, v in sorted(flags.items())])
+    return f"{rule_set.version}:{flags}"
+
+
+caches = {}
+caches_lock = threading.Lock()
+
+
+def get_text_cache(article_path) -> TextCache:
+    """
+    Get the shared text cache of an article directory, it is opened once per process.
+    """
+    key = os.path.normpath(article_path)
+    with caches_lock:
+        cache = caches.get(key, None)
+        if cache is None:
+            if not os.path.exists(article_path):
+                os.makedirs(article_path)
+            cache = TextCache(article_path)
+            caches[key] = cache
+
+    return cache
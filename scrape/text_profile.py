@@ -0,0 +1,106 @@
+import orjson
+
+# the profile keeps the image/font settings, so it is not the everyday browser profile,
+# log in once with it and the cookies are reused
+text_only_profile_path = ".torextrader/profiles/text_only"
+
+# passed to Network.setBlockedURLs, "*" matches any characters
+blocked_url_patterns = [
+    # images
+    "*.png*",
+    "*.jpg*",
+    "*.jpeg*",
+    "*.gif*",
+    "*.webp*",
+    "*.avif*",
+    "*.bmp*",
+    "*.ico*",
+    "*.svg*",
+    "*.image*",
+    "*toutiaoimg.com*",
+    "*mmbiz.qpic.cn*",
+    # fonts
+    "*.woff*",
+    "*.ttf*",
+    "*.otf*",
+    "*.eot*",
+    # video and audio
+    "*.mp4*",
+    "*.m3u8*",
+    "*.flv*",
+    "*.mp3*",
+    "*.m4a*",
+    "*ixigua.com*",
+    # tracking
+    "*mcs.snssdk.com*",
+    "*mon.snssdk.com*",
+    "*log.snssdk.com*",
+    "*/log/sentry/*",
+    "*google-analytics.com*",
+    "*googletagmanager.com*",
+    "*hm.baidu.com*",
+    "*cnzz.com*",
+]
+
+# blink content settings, 2 is block
+blocked_content_settings = {
+    "profile.managed_default_content_settings.images": 2,
+    "profile.managed_default_content_settings.media_stream": 2,
+    "profile.default_content_setting_values.notifications": 2,
+}
+
+
+def apply_text_only_options(options, window_size=(1024, 768)):
+    """
+    Options of a browser that only renders text, images, video and gpu are off.
+    """
+    options.add_argument("--blink-settings=imagesEnabled=false")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--disable-remote-fonts")
+    options.add_argument("--mute-audio")
+    options.add_argument("--autoplay-policy=user-gesture-required")
+    options.add_argument(f"--window-size={window_size[0]},{window_size[1]}")
+    options.add_experimental_option("prefs", blocked_content_settings)
+
+
+def enable_blocking(drv, patterns=None):
+    """
+    Block requests by url pattern for the whole session.
+
+    Images are also blocked by type by the content settings, the url patterns catch what is
+    loaded some other way, fonts, media and tracking beacons.
+    """
+    patterns = blocked_url_patterns if patterns is None else patterns
+    try:
+        drv.execute_cdp_cmd("Network.enable", {})
+        drv.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns})
+        return True
+    except Exception as ex:
+        print(f"request blocking: {ex}")
+        return False
+
+
+def get_network_stats(drv):
+    """
+    Requests, blocked requests and bytes on the wire since the last call, from the performance log.
+    """
+    stats = {"requests": 0, "blocked": 0, "bytes": 0}
+
+    try:
+        logs = drv.get_log("performance")
+    except Exception:
+        return stats
+
+    for entry in logs:
+        message = orjson.loads(entry["message"])["message"]
+        method = message.get("method", "")
+        params = message.get("params", {})
+
+        if method == "Network.requestWillBeSent":
+            stats["requests"] += 1
+        elif method == "Network.loadingFinished":
+            stats["bytes"] += int(params.get("encodedDataLength", 0))
+        elif method == "Network.loadingFailed" and params.get("blockedReason", None):
+            stats["blocked"] += 1
+
+    return stats
@@ -0,0 +1,221 @@
+import os
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlparse
+
+import orjson
+
+# per-domain request rates, raised while a site answers and cut when it pushes back, i.e. a login
+# wall, a wechat frequency-control code or a 429, the rates are kept for the next run
+
+throttle_fp = ".torextrader/throttle.json"
+
+login_wall = "手机登录"
+
+# wechat frequency control, the session is blocked for a while
+wechat_frequency_codes = [200013]
+
+# requests per second a domain starts at, before it has a learned rate
+default_rates = {
+    "mp.weixin.qq.com": 0.2,
+}
+
+
+class DomainBucket:
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated_at = time.time()
+        # no request before this time, set by a penalty with a cooldown
+        self.blocked_until = 0.0
+        # consecutive penalties, doubles the cooldown of the next one
+        self.strikes = 0
+        self.successes = 0
+        self.penalties = {}
+
+    def refill(self, now):
+        self.tokens = min(self.tokens + (now - self.updated_at) * self.rate, self.burst)
+        self.updated_at = now
+
+    def to_json(self):
+        return {
+            "rate": round(self.rate, 4),
+            "blocked_until": self.blocked_until,
+            "strikes": self.strikes,
+            "penalties": self.penalties,
+        }
+
+
+class Throttle:
+    """
+    A token bucket per domain whose rate is adjusted AIMD: raised by `increase` requests per second
+    on each success, cut by `decrease` on each penalty, between min_rate and max_rate.
+
+    A penalty with a cooldown also blocks the domain, the cooldown doubles on each consecutive
+    penalty, up to max_cooldown.
+    """
+
+    def __init__(
+        self,
+        state_fp=throttle_fp,
+        default_rate: float = 1.0,
+        burst: float = 2.0,
+        min_rate: float = 0.02,
+        max_rate: float = 5.0,
+        increase: float = 0.02,
+        decrease: float = 0.5,
+        max_cooldown: float = 3600.0,
+    ):
+        self.state_fp = state_fp
+        self.default_rate = default_rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.max_cooldown = max_cooldown
+
+        self.lock = threading.Lock()
+        self.buckets = {}
+        self.state = self.load()
+
+    def load(self):
+        if not self.state_fp or not os.path.exists(self.state_fp):
+            return {}
+
+        with open(self.state_fp, "rb") as fp:
+            return orjson.loads(fp.read())
+
+    def save(self):
+        if not self.state_fp:
+            return
+
+        path = Path(self.state_fp).parent
+        if not path.exists():
+            os.makedirs(path)
+
+        with self.lock:
+            state = {**self.state, **{domain: b.to_json() for domain, b in self.buckets.items()}}
+            c = orjson.dumps(state, option=orjson.OPT_INDENT_2)
+
+        with open(self.state_fp, "wb") as fp:
+            fp.write(c)
+
+    def get_bucket(self, domain):
+        # with the lock held
+        bucket = self.buckets.get(domain, None)
+        if bucket is None:
+            saved = self.state.get(domain, {})
+            rate = saved.get("rate", default_rates.get(domain, self.default_rate))
+            bucket = DomainBucket(min(max(rate, self.min_rate), self.max_rate), self.burst)
+            bucket.blocked_until = saved.get("blocked_until", 0.0)
+            bucket.strikes = saved.get("strikes", 0)
+            bucket.penalties = dict(saved.get("penalties", {}))
+            self.buckets[domain] = bucket
+
+        return bucket
+
+    def acquire(self, url):
+        """
+        Wait for a token of the domain of the url, returns the seconds waited.
+        """
+        domain = get_domain(url)
+        waited = 0.0
+        while True:
+            with self.lock:
+                bucket = self.get_bucket(domain)
+                now = time.time()
+                if now < bucket.blocked_until:
+                    wait = bucket.blocked_until - now
+                else:
+                    bucket.refill(now)
+                    if bucket.tokens >= 1.0:
+                        bucket.tokens -= 1.0
+                        return waited
+                    wait = (1.0 - bucket.tokens) / bucket.rate
+
+            time.sleep(wait)
+            waited += wait
+
+    def success(self, url):
+        with self.lock:
+            bucket = self.get_bucket(get_domain(url))
+            bucket.rate = min(bucket.rate + self.increase, self.max_rate)
+            bucket.strikes = 0
+            bucket.successes += 1
+
+    def penalize(self, url, reason, cooldown: float = 0.0, backoff: bool = True):
+        """
+        Cut the rate of the domain, and block it for the cooldown doubled per consecutive penalty,
+        or as is without `backoff`.
+        """
+        with self.lock:
+            bucket = self.get_bucket(get_domain(url))
+            bucket.rate = max(bucket.rate * self.decrease, self.min_rate)
+            bucket.tokens = 0.0
+            bucket.penalties[reason] = bucket.penalties.get(reason, 0) + 1
+            if cooldown > 0:
+                if backoff:
+                    cooldown = cooldown * 2**bucket.strikes
+                cooldown = min(cooldown, self.max_cooldown)
+                bucket.blocked_until = max(bucket.blocked_until, time.time() + cooldown)
+            bucket.strikes += 1
+            rate = bucket.rate
+
+        print(f"throttle {get_domain(url)}: {reason}, {rate:.3f} requests/s, cooldown {cooldown:.0f}s")
+
+    def observe(self, url, text=None, status=None, ret=None, retry_after=None):
+        """
+        Adjust the rate of the domain from a response, returns the reason of the penalty, None for
+        a success.
+        """
+        reason = None
+        cooldown = 0.0
+        backoff = True
+        if status == 429:
+            reason = "http_429"
+            cooldown = 30.0
+            if retry_after:
+                try:
+                    # the server said how long, it is not doubled
+                    cooldown = float(retry_after)
+                    backoff = False
+                except ValueError:
+                    # an http date
+                    pass
+        elif ret in wechat_frequency_codes:
+            reason = f"ret_{ret}"
+            cooldown = 60.0
+        elif text is not None and text.find(login_wall) >= 0:
+            reason = "login_wall"
+
+        if reason is None:
+            self.success(url)
+        else:
+            self.penalize(url, reason, cooldown=cooldown, backoff=backoff)
+        return reason
+
+    def report(self):
+        with self.lock:
+            for domain, b in sorted(self.buckets.items()):
+                print(f"{domain}: {b.rate:.3f} requests/s, {b.successes} ok, penalties {b.penalties}")
+
+
+def get_domain(url):
+    return urlparse(url).netloc or url
+
+
+def throttle_acquire(throttle, url):
+    if throttle is None:
+        return 0.0
+
+    return throttle.acquire(url)
+
+
+def throttle_observe(throttle, url, text=None, status=None, retry_after=None):
+    if throttle is None:
+        return None
+
+    return throttle.observe(url, text=text, status=status, retry_after=retry_after)
@@ -0,0 +1,91 @@
+import os
+
+from termcolor import colored
+
+from metrics import incr, span
+
+
+class VolumeWriter:
+    """
+    Writes chapters straight to the output volumes, rolling to the next volume at the group_num boundary.
+
+    Volumes are written to hidden .part files, commit() renames them to `{name}.txt`, or to
+    `{idx:04}_{name}.txt` when there are several, discard() removes them. Without `number_first`
+    the first of several volumes keeps `{name}.txt`.
+    """
+
+    def __init__(self, articles_path, gn: int = 2000, number_first: bool = True):
+        self.articles_path = articles_path
+        self.gn = gn
+        self.number_first = number_first
+
+        self.fp = None
+        self.part_fn = None
+        # (part_fn, last_idx, num_chapters)
+        self.volumes = []
+        self.last_idx = 1
+        self.num_chapters = 0
+        self.count = 0
+
+        if not os.path.exists(articles_path):
+            os.makedirs(articles_path)
+
+    def open_volume(self):
+        self.part_fn = os.path.join(self.articles_path, f".{os.getpid()}_{id(self):x}_{len(self.volumes):04}.part")
+        self.fp = open(self.part_fn, "w", encoding="utf-8")
+        self.num_chapters = 0
+
+    def close_volume(self):
+        if self.fp is None:
+            return
+
+        self.fp.close()
+        self.volumes.append((self.part_fn, self.last_idx, self.num_chapters))
+        self.fp = None
+        self.part_fn = None
+
+    def write_chapter(self, idx_t: int, txt: str):
+        if self.fp is None:
+            self.open_volume()
+
+        with span("write"):
+            self.fp.write(txt)
+        incr("chapters")
+        self.num_chapters += 1
+        self.count += 1
+
+        if idx_t % self.gn == 0:
+            self.close_volume()
+            self.last_idx = idx_t
+
+    def commit(self, name):
+        self.close_volume()
+
+        for part_fn, last_idx, num_chapters in self.volumes:
+            if last_idx > 1 or (self.number_first and len(self.volumes) > 1):
+                fn = f"{self.articles_path}/{last_idx:04}_{name}"
+            else:
+                fn = f"{self.articles_path}/{name}"
+
+            fn = f"{fn}.txt"
+
+            os.replace(part_fn, fn)
+            print(colored(f"{fn} generated from {num_chapters} txts", "green"))
+
+        self.volumes = []
+
+    def discard(self):
+        self.close_volume()
+
+        for part_fn, _, _ in self.volumes:
+            if os.path.exists(part_fn):
+                os.remove(part_fn)
+
+        self.volumes = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # anything not committed is dropped
+        self.discard()
@@ -0,0 +1,126 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import orjson
+
+
+class WatchSchedule:
+    """
+    When each config item is due to be polled again, every item on its own interval.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # key -> {"name", "interval", "next_due", "polls", "updates", ...}
+        self.items = {}
+        self.started_at = time.time()
+        self.rounds = 0
+        # names of the items of the round being polled
+        self.polling = []
+
+    def add(self, key, name, interval: float):
+        with self.lock:
+            self.items[key] = {
+                "name": name,
+                "interval": interval,
+                # every item is polled once at start
+                "next_due": 0.0,
+                "last_poll": None,
+                "last_seconds": None,
+                "last_updates": None,
+                "polls": 0,
+                "updates": 0,
+                "errors": 0,
+                "last_error": None,
+            }
+
+    def due(self, now=None):
+        now = now if now is not None else time.time()
+        with self.lock:
+            keys = [key for key, s in self.items.items() if s["next_due"] <= now]
+            return sorted(keys, key=lambda key: self.items[key]["next_due"])
+
+    def next_due(self):
+        with self.lock:
+            return min([s["next_due"] for s in self.items.values()], default=None)
+
+    def start_round(self, keys):
+        with self.lock:
+            self.polling = [self.items[key]["name"] for key in keys]
+
+    def end_round(self):
+        with self.lock:
+            self.rounds += 1
+            self.polling = []
+
+    def done(self, key, updates, seconds: float, error=None):
+        now = time.time()
+        with self.lock:
+            s = self.items[key]
+            s["last_poll"] = now
+            s["last_seconds"] = round(seconds, 1)
+            s["next_due"] = now + s["interval"]
+            s["polls"] += 1
+            if error is not None:
+                s["errors"] += 1
+                s["last_error"] = error
+            else:
+                s["last_updates"] = updates
+                s["updates"] += updates
+
+    def status(self):
+        with self.lock:
+            return {
+                "started_at": int(self.started_at),
+                "uptime": int(time.time() - self.started_at),
+                "rounds": self.rounds,
+                "polling": self.polling,
+                "items": [{"key": key, **s} for key, s in self.items.items()],
+            }
+
+
+class StatusServer:
+    """
+    Serves the status of the daemon as json on http://host:port/status, and the prometheus text
+    of get_metrics() on /metrics, in a background thread.
+    """
+
+    def __init__(self, get_status, port: int, host: str = "127.0.0.1", get_metrics=None):
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split("?")[0]
+                if path == "/metrics" and get_metrics is not None:
+                    c = get_metrics().encode("utf-8")
+                    content_type = "text/plain; version=0.0.4"
+                elif path in ["/", "/status"]:
+                    c = orjson.dumps(get_status(), option=orjson.OPT_INDENT_2)
+                    content_type = "application/json"
+                else:
+                    self.send_error(404)
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(c)))
+                self.end_headers()
+                self.wfile.write(c)
+
+            def log_message(self, format, *args):
+                # the scraper output is noisy enough
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/status"
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
@@ -3,7 +3,10 @@ import datetime as dttm
 import glob
 import os
 import re
+import threading
 import time
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 # import pandas as pd
@@ -11,7 +14,6 @@ from pathlib import Path
 # import html2text
 import commentjson
 import orjson
-from bs4 import BeautifulSoup
 from selenium import webdriver
 
 # from selenium import webdriver
@@ -24,6 +26,27 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.wait import WebDriverWait
 from termcolor import colored
 
+from article_manifest import content_hash, get_manifest
+from cleanup_rules import apply_rules, load_rule_set
+from clean_pool import clean_texts
+from volume_writer import VolumeWriter
+from text_cache import TextCache, clean_version, get_text_cache
+from page_ready import PageReadiness, get_timeout, wait_loaded, wait_scrolled
+from html_parser import parse_html, set_backend
+from driver_pool import DomainLimiter, DriverPool
+from http_fetch import HttpFetcher, extract_page_text
+from feed_capture import FeedCapture
+from crawl_scheduler import CrawlHistory, CrawlScheduler, CrawlTask
+from crawl_checkpoint import CrawlCheckpoint
+from watch_daemon import StatusServer, WatchSchedule
+from metrics import incr, metrics, span
+from near_dup import NearDupIndex
+from article_filter import ArticleFilter, compile_filter, get_filter_suffix
+from throttle import Throttle, throttle_acquire, throttle_observe
+from snapshot_store import SnapshotStore
+from search_index import get_search_index
+from text_profile import apply_text_only_options, enable_blocking, text_only_profile_path
+
 # # from webdriver_manager.chrome import ChromeDriverManager
 
 # # # _driver = webdriver.Chrome(ChromeDriverManager().install())
@@ -46,7 +69,12 @@ from termcolor import colored
 group_num: int = 2000
 
 
-def create_drive(use_edge_web_driver: bool):
+def create_drive(
+    use_edge_web_driver: bool,
+    user_data_dir: str = None,
+    text_only: bool = False,
+    perf_log: bool = False,
+):
     # proxy = ""
 
     if use_edge_web_driver:
@@ -67,9 +95,24 @@ def create_drive(use_edge_web_driver: bool):
     # options.add_argument("--remote-debugging-port=9222")
     options.add_experimental_option("excludeSwitches", ["enable-logging"])
 
+    if text_only:
+        apply_text_only_options(options)
+
+    if perf_log:
+        # network events for get_network_stats
+        options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+
     home_dir = Path.home()
 
-    if use_edge_web_driver:
+    if user_data_dir is None and text_only:
+        user_data_dir = text_only_profile_path
+        if not os.path.exists(user_data_dir):
+            os.makedirs(user_data_dir)
+
+    if user_data_dir is not None:
+        # a dedicated profile, a profile dir can not be shared by concurrently running browsers
+        user_data_dir = os.path.abspath(user_data_dir)
+    elif use_edge_web_driver:
         # "user-data-dir=C:\\Users\\rapto\\AppData\\Local\\Microsoft\\Edge\\User Data\\Default"
         user_data_dir = os.path.join(home_dir, "AppData\\Local\\Microsoft\\Edge\\User Data\\Default")
 
@@ -107,6 +150,9 @@ def create_drive(use_edge_web_driver: bool):
         # driver = ChromeWebDriver(service=service, options=options)
         driver = webdriver.Edge(options=options)
 
+    if text_only:
+        enable_blocking(driver)
+
     # driver.add_cookie(
     #     {
     #         "name": "passport_csrf_token",
@@ -119,7 +165,55 @@ def create_drive(use_edge_web_driver: bool):
 
 driver = None
 
+# adaptive waits instead of fixed sleeps, see --adaptive
+page_ready = None
+use_edge = True
+# block images, fonts, media and trackers, see --text-only
+text_only = False
+
+# extra sessions for --workers, created on demand
+driver_pool = None
+# concurrent requests per domain, "domain_limits" of the config overrides it per domain
+default_domain_limit = 2
+domain_limits = {}
+worker_profiles_path = ".torextrader/profiles"
+
+# try plain http before the browser, see --http
+http_fetcher = None
+
+# request pacing per domain, see --throttle
+throttle = None
+
+# raw html of the fetched pages, see --snapshots
+snapshots = None
+
+# full-text index of the articles, see --search
+search_index = None
+
+# read the cards from the feed json instead of the page, see --feed
+feed_capture = None
+
+# the session of the item being scraped on this thread, see run_scheduled
+local_session = threading.local()
+
+
+def get_driver():
+    drv = getattr(local_session, "driver", None)
+    return drv if drv is not None else driver
+
+
+def get_feed_capture():
+    if feed_capture is None:
+        return None
+
+    capture = getattr(local_session, "feed_capture", None)
+    return capture if capture is not None else feed_capture
+
+
 valid_size = 250
+
+# cleanup rules config, see --rules
+rules_fp = None
 # # "text/html; charset=utf-8"
 
 # h = html2text.HTML2Text()
@@ -156,20 +250,22 @@ def load_json(filename: str) -> dict:
 
 
 def scroll_till_end():
+    drv = get_driver()
+
     SCROLL_PAUSE_TIME = 1.0
 
     # Get scroll height
-    last_height = driver.execute_script("return document.body.scrollHeight")
+    last_height = drv.execute_script("return document.body.scrollHeight")
 
     while True:
         # Scroll down to bottom
-        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+        drv.execute_script("window.scrollTo(0, document.body.scrollHeight);")
 
         # Wait to load page
-        time.sleep(SCROLL_PAUSE_TIME)
+        wait_scrolled(page_ready, drv, last_height, SCROLL_PAUSE_TIME)
 
         # Calculate new scroll height and compare with last scroll height
-        new_height = driver.execute_script("return document.body.scrollHeight")
+        new_height = drv.execute_script("return document.body.scrollHeight")
         if new_height == last_height:
             break
         last_height = new_height
@@ -185,15 +281,15 @@ def get_html_from_file(fp):
 def get_articles_data_wp(html, flter):
     data = []
 
-    soup = BeautifulSoup(html, "html.parser")
-    # print(soup.title.text)
+    doc = parse_html(html)
+    # print(doc.select_one("title").text)
 
-    uls = soup.find_all("ul", class_="album__list js_album_list")
+    uls = doc.select("ul.album__list.js_album_list")
     if not uls:
         return data
 
     ul = uls[0]
-    articles = ul.find_all("li", class_="album__list-item js_album_item js_wx_tap_highlight wx_tap_cell")
+    articles = ul.select("li.album__list-item.js_album_item.js_wx_tap_highlight.wx_tap_cell")
     for article in articles:
         item = {}
 
@@ -225,21 +321,21 @@ def get_articles_data_tt(html, flter, is_article: bool):
     data = []
 
     try:
-        soup = BeautifulSoup(html, "html.parser")
-        # print(soup.title.text)
+        doc = parse_html(html)
+        # print(doc.select_one("title").text)
 
         cls = "profile-article-card-wrapper" if is_article else "profile-wtt-card-wrapper"
 
-        articles = soup.find_all("div", class_=cls)
+        articles = doc.select(f"div.{cls}")
         for article in articles:
             item = {}
 
             if is_article:
-                link_el = article.find("a", class_="title")
+                link_el = article.select_one("a.title")
                 link = link_el.attrs["href"]
                 title = link_el.text
             else:
-                links = article.findAll("a", {"target": "_blank"})
+                links = article.select('a[target="_blank"]')
                 link_el = None
                 for i in range(1, len(links)):
                     link = links[i]
@@ -250,7 +346,8 @@ def get_articles_data_tt(html, flter, is_article: bool):
                 link = link_el.attrs["href"]
                 # title = link_el.text
                 # title = ""
-                title = link_el.contents[0]
+                # the leading text, None when it starts with an element
+                title = link_el.first_text()
 
             if isinstance(title, str):
                 valid = check_if_filtered(flter, title)
@@ -271,25 +368,9 @@ def get_articles_data_tt(html, flter, is_article: bool):
     return data
 
 
-def check_if_filtered(flter, title):
-    valid = False
-    if title and isinstance(title, str):
-        if not flter:
-            valid = True
-        else:
-            if isinstance(flter, list):
-                for f in flter:
-                    v = title.find(f) >= 0
-                    if v:
-                        valid = True
-                        break
-                    pass
-                pass
-            else:
-                valid = title.find(flter) >= 0
-    else:
-        pass
-    return valid
+def check_if_filtered(flter: ArticleFilter, title):
+    # flter is compiled once per config item by get_all_update_items
+    return flter.match_title(title)
 
 
 toutiao_www_link = "https://www.toutiao.com"
@@ -300,6 +381,28 @@ w_link = "https://www.toutiao.com/w/"
 wp_prefix = "http://mp.weixin.qq.com/s?__biz="
 
 
+def set_site_base(base):
+    """
+    Point the toutiao and wechat links at another site, e.g. the mock site of mock_load_test.py.
+    """
+    global toutiao_www_link, tt_article_link, w_link, wp_prefix
+    toutiao_www_link = base
+    tt_article_link = f"{base}/article/"
+    w_link = f"{base}/w/"
+    wp_prefix = f"{base}/s?__biz="
+
+
+def get_articles_data(html, flter, origin, is_article: bool):
+    if origin == "tt":
+        articles_data = get_articles_data_tt(html, flter=flter, is_article=is_article)
+    elif origin == "wp":
+        articles_data = get_articles_data_wp(html, flter=flter)
+    else:
+        assert False, ""
+
+    return articles_data
+
+
 def get_update_items(
     article_path,
     flter,
@@ -308,16 +411,31 @@ def get_update_items(
     is_article: bool,
     cache: bool = True,
 ):
-    if origin == "tt":
-        articles_data = get_articles_data_tt(html, flter=flter, is_article=is_article)
-    elif origin == "wp":
-        articles_data = get_articles_data_wp(html, flter=flter)
-    else:
-        assert False, ""
+    incr("page_source_bytes", len(html))
+    with span("parse"):
+        articles_data = get_articles_data(html, flter, origin, is_article=is_article)
+
+    return check_update_items(
+        article_path,
+        articles_data,
+        origin,
+        is_article=is_article,
+        cache=cache,
+    )
+
 
+def check_update_items(
+    article_path,
+    articles_data,
+    origin,
+    is_article: bool,
+    cache: bool = True,
+):
     # reversed_articles_data = list(reversed(articles_data))
     reversed_articles_data = articles_data
 
+    manifest = get_manifest(article_path)
+
     update_items = []
     for item in reversed_articles_data:
         link = item["link"]
@@ -343,12 +461,11 @@ def get_update_items(
             assert False, ""
 
         updated = False
-        article_fp = f"{article_path}/{link_num}.txt"
-        if os.path.exists(article_fp):
+        fs = manifest.size(link_num)
+        if fs is not None:
             if not cache:
                 pass
             else:
-                fs = os.path.getsize(article_fp)
                 if fs < valid_size:
                     updated = True
             pass
@@ -365,6 +482,116 @@ def get_update_items(
     return reversed_articles_data, update_items
 
 
+# cards are read straight from the DOM starting at the cursor, so each scroll
+# only pays for the cards appended since the previous one
+get_cards_script = """
+const root = arguments[0] ? document.querySelector(arguments[0]) : document;
+if (!root) {
+    return [0, []];
+}
+const cards = root.querySelectorAll(arguments[1]);
+const htmls = [];
+for (let i = arguments[2]; i < cards.length; i++) {
+    htmls.push(cards[i].outerHTML);
+}
+return [cards.length, htmls];
+"""
+
+
+def get_cards_selector(origin, is_article: bool):
+    if origin == "tt":
+        cls = "profile-article-card-wrapper" if is_article else "profile-wtt-card-wrapper"
+        return "", f"div.{cls}", "<div>", "</div>"
+    elif origin == "wp":
+        ul_cls = "album__list js_album_list"
+        li_cls = "album__list-item js_album_item js_wx_tap_highlight wx_tap_cell"
+        return f'ul[class="{ul_cls}"]', f'li[class="{li_cls}"]', f'<ul class="{ul_cls}">', "</ul>"
+    else:
+        assert False, ""
+
+
+def get_update_items_incremental(
+    article_path,
+    flter,
+    origin,
+    is_article: bool,
+    cache: bool,
+    cursor: int,
+    seen_links: set,
+):
+    """
+    Parse only the cards appended after `cursor`, returns the new cursor and the new items.
+    """
+    drv = get_driver()
+
+    root_selector, card_selector, wrap_begin, wrap_end = get_cards_selector(origin, is_article)
+
+    with span("page_source"):
+        num_cards, htmls = drv.execute_script(get_cards_script, root_selector, card_selector, cursor)
+        if num_cards < cursor:
+            # the feed was re-rendered, start over and rely on seen_links to skip known cards
+            cursor = 0
+            num_cards, htmls = drv.execute_script(get_cards_script, root_selector, card_selector, cursor)
+
+    if not htmls:
+        return num_cards, [], []
+
+    html = f"{wrap_begin}{''.join(htmls)}{wrap_end}"
+    incr("page_source_bytes", len(html))
+    with span("parse"):
+        articles_data = get_articles_data(html, flter, origin, is_article=is_article)
+    all_items, update_items = check_update_items(
+        article_path,
+        articles_data,
+        origin,
+        is_article=is_article,
+        cache=cache,
+    )
+
+    new_all_items, new_update_items = filter_seen_items(all_items, update_items, seen_links)
+
+    return num_cards, new_all_items, new_update_items
+
+
+def filter_seen_items(all_items, update_items, seen_links: set):
+    new_all_items = []
+    for item in all_items:
+        link = item["link"]
+        if link in seen_links:
+            continue
+        seen_links.add(link)
+        new_all_items.append(item)
+
+    new_ids = set(id(item) for item in new_all_items)
+    new_update_items = [item for item in update_items if id(item) in new_ids]
+
+    return new_all_items, new_update_items
+
+
+def get_update_items_feed(
+    article_path,
+    flter,
+    is_article: bool,
+    cache: bool,
+    seen_links: set,
+):
+    """
+    The cards of the feed json received since the last call, they come with their publish time.
+    """
+    capture = get_feed_capture()
+    with span("feed"):
+        articles_data = [item for item in capture.drain(is_article) if check_if_filtered(flter, item["title"])]
+    all_items, update_items = check_update_items(
+        article_path,
+        articles_data,
+        "tt",
+        is_article=is_article,
+        cache=cache,
+    )
+
+    return filter_seen_items(all_items, update_items, seen_links)
+
+
 def get_all_update_items(
     origin,
     link,
@@ -375,13 +602,25 @@ def get_all_update_items(
     is_article: bool,
     sort_reversed=False,
     max_checks: int = 0,
+    incremental: bool = False,
+    checkpoint: CrawlCheckpoint = None,
 ):
+    drv = get_driver()
+    flter = compile_filter(flter)
+
     # r = requests.get(link, proxies=proxy)
     # # r.encoding = "utf-8"
     # html = r.text
-    driver.get(link)
-    driver.implicitly_wait(2.0)
-    time.sleep(2.0)
+    capture = get_feed_capture()
+    use_feed = capture is not None and origin == "tt"
+    if use_feed:
+        capture.reset()
+
+    with span("page_load"):
+        drv.get(link)
+        drv.implicitly_wait(2.0)
+        wait_loaded(page_ready, drv, 2.0)
+    incr("pages")
 
     if sort_reversed:
         cls = "album-sort__wrp js_album_sort"
@@ -400,12 +639,12 @@ def get_all_update_items(
             #     EC.element_to_be_clickable(By.XPATH, f"//div[@class='{cls}']")
             # )
 
-            WebDriverWait(driver, 2).until(EC.presence_of_element_located((By.XPATH, f"//div[@class='{cls}']")))
+            WebDriverWait(drv, 2).until(EC.presence_of_element_located((By.XPATH, f"//div[@class='{cls}']")))
 
             xp = f"//div[@class='{cls}']/div[@class='js_negative_order order_opr_con']/span['album-sort__word']"
             # xp = '//*[@id="js_content_overlay"]/div[1]/div/div[5]/div[1]/div[1]/span'
             # xp = f"//div[@class='{cls}']"
-            el = driver.find_element(By.XPATH, xp)
+            el = drv.find_element(By.XPATH, xp)
 
             # button = WebDriverWait(driver, 10).until(
             #     EC.element_to_be_clickable((By.XPATH, xp))
@@ -414,14 +653,14 @@ def get_all_update_items(
 
             if el:
                 # time.sleep(5.0)
-                driver.implicitly_wait(2)
+                drv.implicitly_wait(2)
 
                 print("sort reversed")
 
                 # driver.execute_script("arguments[0].click();", el)
                 el.click()
 
-                time.sleep(1.0)
+                wait_loaded(page_ready, drv, 1.0)
             else:
                 print(f"{cls} not found")
         # except Exception as ex:
@@ -433,27 +672,75 @@ def get_all_update_items(
     SCROLL_PAUSE_TIME = 1.0
 
     # Get scroll height
-    last_height = driver.execute_script("return document.body.scrollHeight")
+    last_height = drv.execute_script("return document.body.scrollHeight")
+
+    if checkpoint is not None and checkpoint.scroll_height > last_height:
+        last_height = scroll_to_height(drv, checkpoint.scroll_height, last_height, SCROLL_PAUSE_TIME)
 
     last_all_items = []
     last_update_items = []
     last_checks = 0
-    while True:
-        # Scroll down to bottom
-        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
 
-        # Wait to load page
-        time.sleep(SCROLL_PAUSE_TIME)
+    cursor = 0
+    seen_links = set()
+    all_items = []
+    update_items = []
 
-        html = driver.page_source
-        all_items, update_items = get_update_items(
+    if use_feed:
+        # the first page of the feed is loaded with the page
+        all_items, update_items = get_update_items_feed(
             article_path,
             flter,
-            html,
-            origin,
             is_article=is_article,
             cache=cache,
+            seen_links=seen_links,
         )
+        if capture.responses == 0:
+            print(colored("no feed responses captured, parse the page instead", "yellow"))
+            use_feed = False
+
+    while True:
+        # Scroll down to bottom
+        with span("scroll"):
+            drv.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+
+            # Wait to load page
+            wait_scrolled(page_ready, drv, last_height, SCROLL_PAUSE_TIME)
+        incr("scrolls")
+
+        if use_feed:
+            new_all_items, new_update_items = get_update_items_feed(
+                article_path,
+                flter,
+                is_article=is_article,
+                cache=cache,
+                seen_links=seen_links,
+            )
+            all_items = [*all_items, *new_all_items]
+            update_items = [*update_items, *new_update_items]
+        elif incremental:
+            cursor, new_all_items, new_update_items = get_update_items_incremental(
+                article_path,
+                flter,
+                origin,
+                is_article=is_article,
+                cache=cache,
+                cursor=cursor,
+                seen_links=seen_links,
+            )
+            all_items = [*all_items, *new_all_items]
+            update_items = [*update_items, *new_update_items]
+        else:
+            with span("page_source"):
+                html = drv.page_source
+            all_items, update_items = get_update_items(
+                article_path,
+                flter,
+                html,
+                origin,
+                is_article=is_article,
+                cache=cache,
+            )
 
         if max_articles > 0 and len(all_items) > max_articles:
             print(f"stop here, {max_articles} reached")
@@ -486,22 +773,51 @@ def get_all_update_items(
         last_checks = updated_items
 
         # Calculate new scroll height and compare with last scroll height
-        new_height = driver.execute_script("return document.body.scrollHeight")
+        new_height = drv.execute_script("return document.body.scrollHeight")
+        if checkpoint is not None:
+            checkpoint.save_scan(update_items, new_height)
         if new_height == last_height:
             break
         last_height = new_height
         pass
 
     # input("press enter to continue\n")
-    html = driver.page_source
-    all_items, update_items = get_update_items(
-        article_path,
-        flter,
-        html,
-        origin,
-        is_article=is_article,
-        cache=cache,
-    )
+    if use_feed:
+        new_all_items, new_update_items = get_update_items_feed(
+            article_path,
+            flter,
+            is_article=is_article,
+            cache=cache,
+            seen_links=seen_links,
+        )
+        update_items = [*update_items, *new_update_items]
+    elif incremental:
+        cursor, new_all_items, new_update_items = get_update_items_incremental(
+            article_path,
+            flter,
+            origin,
+            is_article=is_article,
+            cache=cache,
+            cursor=cursor,
+            seen_links=seen_links,
+        )
+        update_items = [*update_items, *new_update_items]
+    else:
+        with span("page_source"):
+            html = drv.page_source
+        all_items, update_items = get_update_items(
+            article_path,
+            flter,
+            html,
+            origin,
+            is_article=is_article,
+            cache=cache,
+        )
+
+    if checkpoint is not None:
+        # the queue of the interrupted crawl too, its downloaded links are skipped later
+        checkpoint.save_scan(update_items, last_height, done=True)
+        update_items = checkpoint.update_items
 
     updated_items = len(update_items)
     print(f"{updated_items} updated items")
@@ -509,916 +825,242 @@ def get_all_update_items(
     return update_items
 
 
+def scroll_to_height(drv, height, last_height, pause):
+    """
+    Scroll down to the depth an interrupted crawl reached, the cards on the way are parsed once there.
+    """
+    print(colored(f"resuming at scroll height {height}", "cyan"))
+    while last_height < height:
+        with span("scroll"):
+            drv.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+            wait_scrolled(page_ready, drv, last_height, pause)
+        incr("scrolls")
+
+        new_height = drv.execute_script("return document.body.scrollHeight")
+        if new_height == last_height:
+            break
+        last_height = new_height
+
+    return last_height
+
+
 def generate_txts(
     article_items,
+    writer: VolumeWriter,
     filter_original_text: bool = True,
     start_idx: int = 0,
-    gn: int = 2000,
+    rules="toutiao",
+    cache: TextCache = None,
+    jobs: int = 1,
 ):
-    group_idx = []
-    group_txts = []
-    txts = ""
+    rule_set = load_rule_set(rules, rules_fp)
+
+    # cleaned texts of unchanged articles are reused as long as the rules are the same
+    version = clean_version(rule_set, filter_original_text=filter_original_text)
+    # only the cleaned texts of these articles are loaded
+    hashes = [item.get("hash", None) for item in article_items]
+    cleaned = cache.get_cleaned(version, hashes) if cache is not None else {}
+    new_cleaned = {}
+
+    dirty_txts = []
+    for item in article_items:
+        if item.get("hash", None) in cleaned:
+            continue
+        txt = item["txt"]
+        if txt is not None:
+            dirty_txts.append(txt)
+
+    # the rest are cleaned in order, by a process pool when jobs > 1
+    clean_fn = partial(apply_rules, rules, rules_fp, filter_original_text=filter_original_text)
+    dirty_cleaned = clean_texts(clean_fn, dirty_txts, jobs=jobs)
 
     for idx, item in enumerate(article_items):
         # link = item["link"]
         # title = item["title"]
 
-        txt = item["txt"]
-
-        if txt.find("给你个建议，求人办事，事前露财，拉高办事成本") > -1:
-            pass
+        # the text of an article cleaned before is not read
+        txt_hash = item.get("hash", None)
+        txt = cleaned[txt_hash] if txt_hash in cleaned else item["txt"]
 
         if txt is not None:
             local_idx_t = idx + 1
             idx_t = local_idx_t + start_idx
 
-            if filter_original_text:
-                txt = re.sub(
-                    r"【原文】(.*?\n)*?(【\s*译文\s*】|【\s*原文华译\s*】|【\s*闲扯\s*】|【\s*解析\s*】|【\s*读解\s*】|【\s*华译\s*】)",
-                    r"【原文】\n 略\n\2",
-                    txt,
-                )
+            if txt_hash in cleaned:
+                cache.hits += 1
+            else:
+                with span("clean"):
+                    txt = next(dirty_cleaned)
+                if cache is not None and txt_hash is not None:
+                    new_cleaned[txt_hash] = txt
+                    cache.misses += 1
 
-            txt = re.sub(
-                r"(材料：|【材料】)(.*?\n)*?(\s*译文：\s*|【译文】)",
-                r"\1\n 略\n\3",
-                txt,
-            )
+            if len(txt) > 0:
+                valid_texts = re.search(r"\S", txt)
+                if valid_texts:
+                    writer.write_chapter(idx_t, f"\n第{idx_t:04}章\n\n{txt}\n")
+                pass
 
-            txt = re.sub(
-                r"(《资治通鉴》原文)(.*?\n)*?(\s*译文：\s*)",
-                r"\1\n 略\n\3",
-                txt,
-            )
+        pass
 
-            txt = re.sub(
-                r"要看(全文)*的关注微信公众号：.*?\n(阅读：.*?\n)*",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"关注微信公众号：.*?\n(阅读：.*?\n)*",
-                r"",
-                txt,
-            )
+    dirty_cleaned.close()
 
-            txt = re.sub(
-                r"关注公众号.*?\n",
-                r"",
-                txt,
-            )
+    if cache is not None:
+        cache.put_cleaned(version, new_cleaned)
+        cache.report()
 
-            txt = re.sub(
-                r"蔡根谈解读资治通鉴三个特点：1､尽量白话文（译文主要摘抄自《华杉讲透资治通鉴》一书；2､借古说今，会更多在营销管理领域进行解读；3､只摘比较典型的片段，不做长篇连载。",
-                r"",
-                txt,
-            )
+    return len(article_items) + start_idx
 
-            txt = re.sub(
-                r"点赞关注不迷路，可关注微信公众号:通鉴风云，防止失联，后期更多精彩文章(。)*",
-                r"",
-                txt,
-            )
 
-            txt = re.sub(
-                r"读资治通鉴，悟人生哲理。笔者自17年研究资治通鉴迄今已是六年四遍，将300万字神书浓缩为18万字读书笔记，皆是智慧经验，学习前人经验少走弯路回头路，感叹古今多少事都付笑谈中。感谢大家关注支持！",
-                r"",
-                txt,
-            )
+def check_cached_link(link, article_fp, cache: bool = True):
+    if cache:
+        return False
 
-            txt = re.sub(
-                r"编者按：.*?\n",
-                r"",
-                txt,
-            )
+    manifest = get_manifest(os.path.dirname(article_fp))
+    article_id = Path(article_fp).stem
 
-            txt = re.sub(
-                r"#.*?#",
-                r"",
-                txt,
+    fs = manifest.size(article_id)
+    if fs is not None:
+        if fs > valid_size:
+            print(
+                colored(
+                    f"cached {link}, filesize {fs}, do nothing",
+                    "green",
+                )
             )
+            incr("link_cache_hits")
+            return True
 
-            txt = re.sub(
-                r"关注我，带你成为学霸，走向人生巅峰！",
-                r"",
-                txt,
+        print(
+            colored(
+                f"not cached {link},  filesize {fs}, to redownload...",
+                "red",
             )
+        )
+        pass
 
-            txt = re.sub(
-                r"点击阅读原文.*?\n",
-                r"",
-                txt,
-            )
+    incr("link_cache_misses")
+    return False
 
-            txt = re.sub(
-                r"【鸣谢】.*?\n",
-                r"",
-                txt,
-            )
 
-            txt = re.sub(
-                r"作者简介：.*?\n",
-                r"",
-                txt,
-            )
+def fetch_link_content(link, title, drv=None):
+    drv = drv if drv is not None else get_driver()
 
-            txt = re.sub(
-                r"Original 刘志强2018 小学生小强",
-                r"",
-                txt,
-            )
+    drv.get(link)
 
-            txt = re.sub(
-                r"读资治通鉴，悟人生哲理.*?\n",
-                r"",
-                txt,
-            )
+    wait_loaded(page_ready, drv, 1.0)
+    # driver.implicitly_wait(0.1)
 
-            txt = re.sub(
-                r"欢迎与作者交流(.*\n)*",
-                r"",
-                txt,
-            )
+    try:
+        WebDriverWait(drv, get_timeout(page_ready, drv, "load", 2)).until(
+            EC.presence_of_element_located((By.TAG_NAME, "body"))
+        )
+        m = drv.find_element(By.TAG_NAME, value="body")
+    except Exception as ex:
+        print(link, title, ex)
 
-            txt = re.sub(
-                r"欢迎和作者交流(.*\n)*",
-                r"",
-                txt,
-            )
+    content = None
 
-            txt = re.sub(
-                r"资治通鉴.*\n\d+.*\n企业经营.*\n\d+(.*\n)*",
-                r"",
-                txt,
-            )
+    # it = 0
+    # while it < 5:
+    #     try:
+    #         content = m.text
+    #         break
+    #     except Exception as ex:
+    #         print(link, title, ex)
+    #         pass
+    #     time.sleep(0.3)
+    #     it += 1
+    #     pass
 
-            txt = re.sub(
-                r"这是作者的第\d+篇原创文章，欢迎关注！.*\n",
-                r"",
-                txt,
-            )
+    # if content is None:
+    #     return ""
 
-            txt = re.sub(
-                r"关注.*\n推荐(.*\n)*收藏.*\n分享.*\n",
-                r"",
-                txt,
-            )
+    try:
+        content = m.text
+    except Exception as ex:
+        print(link, title, ex)
+        pass
 
-            txt = re.sub(
-                r"举报.*\n评论(.*\n)*",
-                r"",
-                txt,
-            )
+    if content is None:
+        try:
+            m = drv.find_element(By.CLASS_NAME, value="weitoutiao-html")
+            if m is not None:
+                content = m.text
+        except Exception:
+            pass
 
-            txt = re.sub(
-                r"文章来自微信公众号：记忆承载。欢迎前往关注阅读全文。.*?\n",
-                r"",
-                txt,
-            )
+    if content is None:
+        try:
+            m = drv.find_element(By.CLASS_NAME, value="article-content")
+            if m is not None:
+                content = m.text
+        except Exception:
+            pass
 
-            txt = re.sub(
-                r"文章来自微信公众号.*关注阅读全文。.*?\n",
-                r"",
-                txt,
-            )
+    if snapshots is not None and content is not None:
+        with span("snapshot"):
+            snapshots.put(link, drv.page_source)
 
-            txt = re.sub(
-                r"原创 刘志强2018 小学生小强.*?\n",
-                r"",
-                txt,
-            )
+    return content
 
-            txt = re.sub(
-                r"好消息！《资治通鉴读史悟道·卷贰》已经出版，点击即可雅购⬇*?\n",
-                r"",
-                txt,
-            )
 
-            txt = re.sub(
-                r"欢迎把本号设为星标(.*\n)*people underline.*\n",
-                r"",
-                txt,
-            )
+def fetch_link(link, title, drv=None, pool=None):
+    """
+    Fetch the article content, returns the content and the path that served it, "http" or "selenium".
+    """
+    with span("fetch"):
+        content, source = fetch_link_source(link, title, drv=drv, pool=pool)
 
-            txt = re.sub(
-                r"(更多精彩文章请|people underline)",
-                r"",
-                txt,
-            )
+    if content is not None:
+        incr(f"fetched_{source}")
+        incr("article_bytes", len(content.encode("utf-8")))
 
-            txt = re.sub(
-                r"敖让的净化号，无广告，更悟道！.*\n*(\d+)篇原创内容",
-                r"",
-                txt,
-            )
+    return content, source
 
-            txt = re.sub(
-                r"(我|敖让)的备用号(.*\n)*敖让的净化号，无广告，更悟道！",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"(我|敖让)的备用号(.*\n)*（早关注，不迷路）",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"敖让的净化号，无广告，更悟道！",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"\n(欢迎把本号设为星标|敖让随笔|战国纵横|铁血前汉|秦并天下|更多精彩文章|后汉风云|三国争霸|收费文章)(.*\n)*people underline.*\n",
-                r"",
-                txt,
-            )
 
-            txt = re.sub(
-                r"(\d+)篇原创内容",
-                r"",
-                txt,
-            )
+def fetch_link_source(link, title, drv=None, pool=None):
+    if http_fetcher is not None and http_fetcher.supports(link):
+        start_time = time.time()
+        content = http_fetcher.fetch(link)
+        if content is not None:
+            http_fetcher.record("http", start_time)
+            return content, "http"
 
-            txt = re.sub(
-                r"Original (敖让|读史悟道) 资治通鉴读史悟道",
-                r"",
-                txt,
-            )
-
-            txt = re.sub(
-                r"Original 王上北 上北知行观",
-                r"",
-                txt,
-            )
-
-            txt = re.sub(
-                r"点击阅读作者更多文章：(.*\n)*",
-                r"",
-                txt,
-            )
-
-            txt = re.sub(
-                r"全品类优惠码：(.*\n)*",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"（全文完）(.*\n)*",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"历史解读，敖让的个人号，(.*\n)",
-                r"",
-                txt,
-            )
-
-            txt = re.sub(
-                r"更多精彩文章请(.*\n)*公众号",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                # r"(Editor's Note|公众号)",
-                r"Editor's Note",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"\n(铁血前汉|三国争霸|资治通鉴)\n(\d+)(.*\n)*(Read more|下一篇\n.*\n)",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"\n(铁血前汉|三国争霸|资治通鉴|敖让随笔)\n(\d+)",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"点击【阅读原文】.*\n",
-                r"",
-                txt,
-            )
-
-            txt = re.sub(
-                r"点击阅读读史悟道更多精彩文章(.*\n)*",
-                r"",
-                txt,
-            )
-
-            txt = re.sub(
-                r"(我|敖让)的备用号(：|，)早关注，不迷路.*\n.*",
-                r"",
-                txt,
-            )
-
-            txt = re.sub(
-                r"通告公示：.*\n.*",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"资治通鉴读史悟道(.*\n){,4}公众号",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"(我的备用号|备用小号|备用号)(.*\n){,4}公众号",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"(敖让的小店)(.*\n)*(小程序|Mini Program)",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"\d+.*\n 微信豆兑换(.*\n){,3}.*(微信豆兑换|\d+微信豆\))",
-                r"",
-                txt,
-            )
-
-            txt = re.sub(
-                r"(【冠名】|本文由读史悟道官方指定用茶)(.*\n).*共饮一壶茶",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"同读一本书.*(点击了解更多|共饮一壶茶)",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"视频原创：(.*\n){,6}.*【材料】",
-                r"【材料】",
-                txt,
-            )
-            txt = re.sub(
-                r"可试读(.*\n){,6}.*微信豆兑换",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"好消息(.*\n){,6}.*点击即可雅(阅|购)⬇",
-                r"",
-                txt,
-            )
-
-            txt = re.sub(
-                r"(.*\n)关注\n",
-                r"\1\n",
-                txt,
-            )
-            txt = re.sub(
-                r"喜欢此内容的人还喜欢(.*\n)*.*",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"(猜你喜欢：|阅读更多文章，可关注智圆行方读书|往期回顾|往期精彩|您的【点赞】是最好的鼓励！|更多文章，点击下方公众号名片)(.*\n){,10}.*",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"资治通鉴原文(.*\n)*.*译文：",
-                r"资治通鉴原文:\n略\n译文：",
-                txt,
-            )
-
-            txt = re.sub(
-                r"(看更多内容， 点击下方公众号关注|智圆行方读书\n分享读书心得，解读|未经授权，谢绝转载！)(.*\n){,8}.*公众号",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"(交流群只交流和扯淡，不提供训练服务。|推荐服务：|推荐社群：|服务内容：|推荐\d+大社群|\d+ 不要脸交流群|加V：)(.*\n){,10}.*",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"本文是付费阅读，上车(.*\n){0,2}堵住人性的漏洞=管理(.*\n)*.*(所有群，服务周期为一年。|(资治通鉴权谋\n\d+\n)?权谋\n\d+\n)",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"本文是付费阅读，上车(.*\n){0,2}",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"资治通鉴权谋\n\d+\n人情世故\n\d+\n送礼的艺术\n\d+\n",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"未经授权，(严禁|谢绝)转载！(.*\n)*.*推荐阅读(.*\n)*.*",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"(欢迎个人转发至朋友圈|点个【 在看 】)(.*\n)*.*个人观点，仅供参考",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"喜欢文章就帮忙给一个或吧↓↓个人观点，仅供参考.*",
-                r"",
-                txt,
-            )
-
-            txt = re.sub(
-                r"Original (.*) \1",
-                r"\1",
-                txt,
-            )
-            txt = re.sub(
-                r"——END——(.*\n)*",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"\n公众号\n",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"点击上方△蓝字△关注我.*\n每天为你深度解读《资治通鉴.*\n",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"点击下方关注我.*\n发送关键字.*\n",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"PS：.*\n如果你觉得上面内容还不过瘾(.*\n)*.*",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"PS：.*\n很多朋友问我有没有书出版(.*\n)*.*",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"PS：.*\n探花TV(.*\n)*.*",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"(点亮【 在看 】|您的【点赞】)(.*\n)*.*个人观点，仅供参考(.*\n)*.*",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"(最后，做一下我的《资治通鉴》解读专栏推广)(.*\n)*.*关注我，每天为你分享读史感悟(.*\n)*.*",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"(更多《资治通鉴》的*解读|观看更多内容，欢迎订阅我的专栏|最后给我的专栏做个推|最后，给我《资治通鉴》解读专栏)(.*\n)*.*关注我，每天为你分享读史感悟(.*\n)*.*",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"(做个专栏宣传|我的《资治通鉴》解读专栏|关注我，每天为你分享读史感悟。\n更多内容|更多《资治通鉴》解读内容，点击下方文章链接|关注我，每天为你分享读史.*\n往期内容)(.*\n)*.*",
-                r"",
-                txt,
-            )
-
-            txt = re.sub(
-                r"(关注我，每天为你分享读史感悟。|更多干货，关注“ 职场智谋 ” 微信公众号)",
-                r"",
-                txt,
-            )
-
-            if filter_original_text:
-                txt = re.sub(
-                    r"\n原文(.*?\n){,5}?(\n译文\s*)",
-                    r"\n原文\n 略\n\2",
-                    txt,
-                )
-
-            txt = re.sub(
-                r"点击上方蓝字关注我",
-                r"",
-                txt,
-            )
-
-            txt = re.sub(
-                r"(阅读更多文章|更多精彩内容)，请关注首发(.*\n)*.*",
-                r"",
-                txt,
-            )
-
-            txt = re.sub(
-                r"公众号【鉴史悟道】,通过历史故事的分解(.*\n)*.*",
-                r"",
-                txt,
-            )
-
-            txt = re.sub(
-                r"上北知行观\n不是每一次阅读，都能带来成长(.*\n)*.*",
-                r"",
-                txt,
-            )
-
-            txt = re.sub(
-                r"来都来了，点个在看再走吧(.*\n)*.*",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"【免责声明】文章描述过程、图片都来源于网络(.*\n)*.*",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"各位亲爱的读者，阅读此文前(.*\n)",
-                r"",
-                txt,
-            )
-
-            txt = re.sub(
-                r"专栏\n(.*\n){,5}查看\n",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r".{,8}\n\d+\n",
-                r"",
-                txt,
-            )
-
-            txt = re.sub(
-                r"点击下方关注我(.*\n)*内部资料领取方式在文末(.*\n)*谋略那些事.*\n",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"点击下方关注我(.*\n)*谋略那些事(.*\n)*启发当下学以致用(.*\n)*",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"(发个小广告|有很多朋友让我推荐)(.*\n)*价格不贵，一包华子而已，就能收获大佬的宝贵经验，很值！.*\n",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"(发个小广告|有很多朋友让我推荐)(.*\n)*这本书个人读了.*\n",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"点击下方关注我(.*\n)*谋略那些事.*\n",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"解读《资治通鉴》，通过历史迷雾，启发当下学以致用。.*\n",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"立志花15年讲完《资治通鉴》(.*\n){,5}谋略那些事.*\n",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"PS：.*\n我建了一个私密分享群，目前提供六种服务(.*\n)*Comment.*\n",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"最后推荐一个非常棒的深度历史类公众号(.*\n)*.*一见误终身。.*\n",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"点击下方关注我.*(了解“私密分享群”|了解宝书《职场避坑指南》|了解社群|领取方式在文末|合集在文末领取)",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"点击上方△蓝字△关注我.*(你深度解读《资治通鉴)",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"点击上方关注我.*(电子版送您|领取电子版|送您电子版)",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"▼点击下方名片(发送|关注).*(送私密干货。)",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"发送关键字【\s*1.*",
-                r"",
-                txt,
-            )
-
-            txt = re.sub(
-                r"专注硬核历史创作，深挖被人忽视的历史细节。《大汉荣耀四百年》正在连载中。.*（[一二三四五六七八九]*十[一二三四五六七八九]*）",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"星球发送关键字【.*",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"不奢求您的打赏，有个赞就够了.*",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"喜欢的话请关注我的公众号，长期更新觉得文章还可以的话.*",
-                r"",
-                txt,
-            )
-
-            txt = re.sub(
-                r"想第一时间读到我的文章，欢迎扫描下方的二维码关注我.*",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"请看丹阳论道付费课程：你想成功上位吗.*",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"想第一时间读到我的文章欢迎扫描下方的二维码.*",
-                r"",
-                txt,
-            )
-
-            txt = re.sub(
-                r"《鬼谷子大智慧》已成书，实体版已断货，请加微信.*",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"解读《资治通鉴》目录.*",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"PS：如果你觉得上面内容还不过瘾.*",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"PS：专属群，专注个人成长内容分享，每天会分享.*",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"年近不惑、以书解惑。精华分享群每天分享.*",
-                r"",
-                txt,
-            )
-
-            txt = re.sub(
-                r"最后推荐一个非常棒的深度历史类公众号，我也经常看.*",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"关键字【.*",
-                r"",
-                txt,
-            )
-
-            txt = re.sub(
-                r"如果没有关注我的朋友，扫描二维码后.*",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"PS：我建了一个私密分享群.*",
-                r"",
-                txt,
-            )
-
-            txt = re.sub(
-                r"全文完，感谢阅读，如果喜欢请三连.*",
-                r"",
-                txt,
-            )
-
-            txt = re.sub(
-                r"PS：上面文章还不过瘾，这里还有一个精选分享群.*",
-                r"",
-                txt,
-            )
-
-            txt = re.sub(
-                r"不求您的打赏，但求您能点个赞、您看成吗？.*",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"今天的内容又有点长，您也别打赏了，就点个赞和再看好吗？.*",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"不知不觉.*多字，.*您也别打赏了，能否点个赞？.*",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"福利:.*再次恳请大家谅解.*",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"历史不断重复.*一起变的更厉害",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"▼点击下方名片关注.*可得私密干货。",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"▼点击下方名片关注.*请别忘记",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"立*志花15年讲完.*现在已经坚持了6年",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"立*志用15年讲完.*现在已经坚持了6年",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"推荐一个非常棒的深度历史类公众号.*期待你的加入。",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"PS：很多朋友问我有没有书出版.*感兴趣的朋友可以通过下面链接购入一读，绝对不会让你失望.*",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"PS：我们的专属分享群.*期待你的加入。",
-                r"",
-                txt,
-            )
-            txt = re.sub(
-                r"每日\d{2}:\d{2}发布.* | 认知提升",
-                r"",
-                txt,
-            )
-
-            if len(txt) > 0:
-                valid_texts = re.search(r"\S", txt)
-                if valid_texts:
-                    txts += f"\n第{idx_t:04}章\n\n{txt}\n"
-
-                    if idx_t % gn == 0:
-                        group_idx.append(local_idx_t)
-                        group_txts.append(txts)
-                        txts = ""
-                pass
-
-        pass
-
-    if txts:
-        group_idx.append(len(article_items) + start_idx)
-        group_txts.append(txts)
-
-    return group_idx, group_txts
+        # empty or login wall, fall back to the browser
+        http_fetcher.record("http_miss", start_time)
 
+    start_time = time.time()
+    throttle_acquire(throttle, link)
+    if pool is not None:
+        with pool.session() as drv:
+            content = fetch_link_content(link, title, drv=drv)
+    else:
+        content = fetch_link_content(link, title, drv=drv)
+    throttle_observe(throttle, link, text=content)
 
-def write_txts(articles_path, name, group_idx, group_txts):
-    last_idx = 1
-    for i, txts in enumerate(group_txts):
-        idx = group_idx[i]
+    if http_fetcher is not None:
+        http_fetcher.record("selenium", start_time)
 
-        # fn = f"{articles_path}/{last_idx:04}_{idx:04}_{name}"
-        # fn = f"{articles_path}/{last_idx:04}_{name}"
-        if last_idx > 1 or len(group_txts) > 1:
-            fn = f"{articles_path}/{last_idx:04}_{name}"
-        else:
-            fn = f"{articles_path}/{name}"
-
-        fn = f"{fn}.txt"
-
-        with open(
-            fn,
-            "w",
-            encoding="utf-8",
-        ) as fp:
-            fp.write(txts)
-            c = idx - last_idx + (1 if last_idx == 1 else 0)
-            last_idx = idx
-            print(colored(f"{fn} generated from {c} txts", "green"))
-        pass
-    pass
+    return content, "selenium"
 
 
-def download_link(
+def save_link_content(
     link,
     title,
-    link_id,
     article_fp,
+    content,
     include_title: bool,
-    is_article: bool,
-    cache: bool = True,
+    source: str = "selenium",
+    date=None,
+    force: bool = False,
 ):
-    if not cache:
-        if os.path.exists(article_fp):
-            fs = os.path.getsize(article_fp)
-            if fs > valid_size:
-                print(
-                    colored(
-                        f"cached {link}, filesize {fs}, do nothing",
-                        "green",
-                    )
-                )
-                return
-
-            print(
-                colored(
-                    f"not cached {link},  filesize {fs}, to redownload...",
-                    "red",
-                )
-            )
-            pass
-        pass
-
-    driver.get(link)
-
-    time.sleep(1.0)
-    # driver.implicitly_wait(0.1)
+    manifest = get_manifest(os.path.dirname(article_fp))
+    article_id = Path(article_fp).stem
 
     txt = ""
+    # meta = m.text
     meta = ""
-    try:
-        WebDriverWait(driver, 2).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
-        m = driver.find_element(By.TAG_NAME, value="body")
-        # meta = m.text
-        meta = ""
-    except Exception as ex:
-        print(link, title, ex)
-
-    content = None
-
-    # it = 0
-    # while it < 5:
-    #     try:
-    #         content = m.text
-    #         break
-    #     except Exception as ex:
-    #         print(link, title, ex)
-    #         pass
-    #     time.sleep(0.3)
-    #     it += 1
-    #     pass
-
-    # if content is None:
-    #     return ""
-
-    try:
-        content = m.text
-    except Exception as ex:
-        print(link, title, ex)
-        pass
-
-    if content is None:
-        try:
-            m = driver.find_element(By.CLASS_NAME, value="weitoutiao-html")
-            if m is not None:
-                content = m.text
-        except Exception:
-            pass
-
-    if content is None:
-        try:
-            m = driver.find_element(By.CLASS_NAME, value="article-content")
-            if m is not None:
-                content = m.text
-        except Exception:
-            pass
-
-    if content is None:
-        print("invalid text:", link, title)
-        return ""
 
     try:
         # path = "E:\\downloads\\w.png"
@@ -1433,24 +1075,39 @@ def download_link(
             txt = f"{meta}\n{content}\n\n\n"
 
         updated = True
-        if os.path.exists(article_fp):
-            txt_exist = get_html_from_file(article_fp)
-            if len(txt) > len(txt_exist):
+        length_exist = manifest.length(article_id)
+        if force:
+            # reprocessed, written unless the text is the same, shorter is fine
+            row = manifest.get(article_id)
+            updated = row is None or row["hash"] != content_hash(txt)
+        elif length_exist is not None:
+            if len(txt) > length_exist:
                 updated = True
             else:
                 updated = False
 
         if updated:
-            with open(article_fp, "w", encoding="utf-8") as fp:
-                # fp.write(r.text)
-                fp.write(txt)
-                pass
+            with span("save"):
+                with open(article_fp, "w", encoding="utf-8") as fp:
+                    # fp.write(r.text)
+                    fp.write(txt)
+                    pass
 
-            fs = os.path.getsize(article_fp)
+            meta_item = {"link": link, "title": title, "source": source}
+            if date:
+                # the exact publish time from the feed, see get_articles_items
+                meta_item["date"] = date
+            fs = manifest.record(article_id, txt, item=meta_item)
+            # the title and date are indexed now, listing the articles does not read the file again
+            article_item = parse_article_file(article_fp, date=get_manifest_date(manifest, article_id), txt=txt)
+            get_text_cache(os.path.dirname(article_fp)).record(article_fp, article_item)
+            if search_index is not None:
+                with span("index"):
+                    search_index.add(article_fp, article_item)
             color = "green" if fs > valid_size else "red"
             print(
                 colored(
-                    f"downloaded {link} size {fs} {title}",
+                    f"downloaded {link} size {fs} {title} [{source}]",
                     color,
                 )
             )
@@ -1467,24 +1124,83 @@ def download_link(
     return txt
 
 
+def download_link(
+    link,
+    title,
+    link_id,
+    article_fp,
+    include_title: bool,
+    is_article: bool,
+    cache: bool = True,
+    date=None,
+):
+    if check_cached_link(link, article_fp, cache=cache):
+        return
+
+    content, source = fetch_link(link, title)
+
+    if content is None:
+        print("invalid text:", link, title)
+        return ""
+
+    return save_link_content(
+        link,
+        title,
+        article_fp,
+        content,
+        include_title=include_title,
+        source=source,
+        date=date,
+    )
+
+
+def get_link_id(link, is_article: bool):
+    prefix_len = len(tt_article_link) if is_article else len(w_link)
+    return link[prefix_len:-1]
+
+
 def download_links(
     all_update_items,
     article_path,
     include_title: bool,
     is_article: bool,
     cache: bool = True,
+    workers: int = 1,
+    checkpoint: CrawlCheckpoint = None,
 ):
+    if checkpoint is not None:
+        downloaded = len(all_update_items)
+        all_update_items = [item for item in all_update_items if not checkpoint.is_downloaded(item["link"])]
+        downloaded -= len(all_update_items)
+        if downloaded > 0:
+            print(colored(f"{downloaded} articles downloaded before, skipped", "cyan"))
+
+    if http_fetcher is not None:
+        # the profile page was just visited, the session cookies are fresh
+        http_fetcher.load_cookies(get_driver())
+
+    if workers > 1:
+        download_links_parallel(
+            all_update_items,
+            article_path,
+            include_title=include_title,
+            is_article=is_article,
+            cache=cache,
+            workers=workers,
+            checkpoint=checkpoint,
+        )
+        return
+
     for idx, item in enumerate(all_update_items):
         link = item["link"]
         title = item["title"]
         dt = item.get("date", "")
 
-        prefix_len = len(tt_article_link) if is_article else len(w_link)
-        link_id = link[prefix_len:-1]
+        link_id = get_link_id(link, is_article)
         article_fp = f"{article_path}/{link_id}.txt"
 
         print(f">>>downloading {idx:04} {dt} {title} {link_id}...")
-        download_link(
+        txt = download_link(
             link,
             title,
             link_id,
@@ -1492,69 +1208,274 @@ def download_links(
             include_title=include_title,
             is_article=is_article,
             cache=cache,
+            date=dt,
+        )
+
+        # "" is an invalid text, to be fetched again
+        if checkpoint is not None and txt != "":
+            checkpoint.mark_downloaded(link)
+        pass
+    pass
+
+
+def copy_session_cookies(src, dst):
+    """
+    Copy the cookies of all domains from one session to another, returns the number copied.
+    """
+    try:
+        cookies = src.execute_cdp_cmd("Network.getAllCookies", {})["cookies"]
+        dst.execute_cdp_cmd("Network.setCookies", {"cookies": cookies})
+        return len(cookies)
+    except Exception:
+        pass
+
+    # only the cookies of the page the main session is on, add_cookie needs the same domain
+    cookies = src.get_cookies()
+    dst.get(src.current_url)
+    for c in cookies:
+        dst.add_cookie({k: v for k, v in c.items() if k != "sameSite"})
+    return len(cookies)
+
+
+def create_worker_drive(worker_idx):
+    """
+    An extra session with its own profile. The profile is not logged in, the cookies of the main
+    session are copied when it is created, a login done later in the main session is not.
+    """
+    user_data_dir = os.path.join(worker_profiles_path, f"worker_{worker_idx}")
+    if not os.path.exists(user_data_dir):
+        os.makedirs(user_data_dir)
+
+    drv = create_drive(
+        use_edge,
+        user_data_dir=user_data_dir,
+        text_only=text_only,
+        perf_log=feed_capture is not None,
+    )
+
+    if driver is not None:
+        try:
+            n = copy_session_cookies(driver, drv)
+            print(f"worker {worker_idx}: {n} cookies copied from the main session")
+        except Exception as ex:
+            print(colored(f"worker {worker_idx}: cookies not copied, it is not logged in: {ex}", "yellow"))
+
+    return drv
+
+
+def get_driver_pool(workers: int) -> DriverPool:
+    global driver_pool
+    if driver_pool is None:
+        # the main session is the first worker
+        driver_pool = DriverPool(create_worker_drive, workers, drivers=[driver])
+    else:
+        driver_pool.resize(workers)
+
+    return driver_pool
+
+
+def download_links_parallel(
+    all_update_items,
+    article_path,
+    include_title: bool,
+    is_article: bool,
+    cache: bool = True,
+    workers: int = 2,
+    checkpoint: CrawlCheckpoint = None,
+):
+    pool = get_driver_pool(workers)
+    limiter = DomainLimiter(domain_limits, default=default_domain_limit)
+
+    def fetch(link, title):
+        with limiter.slot(link):
+            return fetch_link(link, title, pool=pool)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        tasks = []
+        for idx, item in enumerate(all_update_items):
+            link = item["link"]
+            title = item["title"]
+            dt = item.get("date", "")
+
+            link_id = get_link_id(link, is_article)
+            article_fp = f"{article_path}/{link_id}.txt"
+
+            if check_cached_link(link, article_fp, cache=cache):
+                # like download_link, a cached article is downloaded for --resume
+                if checkpoint is not None:
+                    checkpoint.mark_downloaded(link)
+                continue
+
+            print(f">>>downloading {idx:04} {dt} {title} {link_id}...")
+            tasks.append((link, title, dt, article_fp, executor.submit(fetch, link, title)))
+
+        # pages are fetched concurrently but written in queue order, oldest first,
+        # so that the older link still has the older file
+        for link, title, dt, article_fp, future in tasks:
+            try:
+                content, source = future.result()
+            except Exception as ex:
+                print(link, title, ex)
+                continue
+
+            if content is None:
+                print("invalid text:", link, title)
+                continue
+
+            save_link_content(
+                link,
+                title,
+                article_fp,
+                content,
+                include_title=include_title,
+                source=source,
+                date=dt,
+            )
+            if checkpoint is not None:
+                checkpoint.mark_downloaded(link)
+            pass
+    pass
+
+
+def reprocess_articles(article_path, include_title: bool):
+    """
+    Extract the articles of the dir again from their snapshots, no page is loaded. Returns the
+    feed items of the articles whose text changed.
+    """
+    manifest = get_manifest(article_path)
+
+    updated_items = []
+    missing = 0
+    for article_id, item in manifest.items():
+        link = item.get("link", None)
+        html = snapshots.get(link) if link else None
+        if html is None:
+            missing += 1
+            continue
+
+        with span("extract"):
+            content = extract_page_text(html, link)
+        if content is None:
+            print("invalid text:", link, item.get("title", ""))
+            continue
+
+        hash_before = (manifest.get(article_id) or {}).get("hash", None)
+        save_link_content(
+            link,
+            item.get("title", ""),
+            f"{article_path}/{article_id}.txt",
+            content,
+            include_title=include_title,
+            source="snapshot",
+            date=item.get("date", None),
+            force=True,
         )
+        if (manifest.get(article_id) or {}).get("hash", None) != hash_before:
+            updated_items.append(item)
+
+    incr("reprocessed", len(updated_items))
+    print(f"reprocessed {len(updated_items)} changed articles, {missing} without a snapshot")
+    return updated_items
+
 
+def parse_article_file(file_name, date: dttm.datetime = None, txt=None):
+    file_base_name, ext = os.path.splitext(os.path.basename(file_name))
+    if txt is None:
+        with open(file_name, "r", encoding="utf-8") as fp:
+            txt = fp.read()
+
+    txt = re.sub(r"\n{5,}", r"", txt)
+
+    if len(txt) == 0:
+        return None
+
+    pos_nl = txt.find("\n")
+    if pos_nl > 0:
+        title = txt[:pos_nl]
+    else:
+        title = ""
+
+    invalid_txt = re.search(r"手机登录\n扫码登录\n获取验证码\n", txt)
+    if invalid_txt:
+        return None
+
+    add_dt = False
+    # the exact publish time from the feed, otherwise guessed from the text
+    dts = re.search(r"(\d+-\d+-\d+ \d+:\d+)", txt) if date is None else None
+    if date is not None:
+        dt = date
+    elif dts:
+        dt = dttm.datetime.strptime(dts.group(), "%Y-%m-%d %H:%M")
+    else:
+        match = re.search(r"\d+-\d+-\d+-\d+-\d+_", file_name)
+        if match:
+            dts = match.group()
+            dts = dts[:-1]
+            dt = dttm.datetime.strptime(dts, "%Y-%m-%d-%H-%M")
+            add_dt = True
+        else:
+            # dt = dttm.datetime.now()
+            mod_time = os.path.getmtime(file_name)
+            dt = dttm.datetime.fromtimestamp(mod_time)
+        # continue
         pass
-    pass
 
+    if add_dt:
+        dts = dt.strftime("%Y-%m-%d %H:%M")
+        txt = f"{dts}\n\n{txt}"
+        pass
 
-def get_articles_items(article_path):
-    wild_dir: str = os.path.join(article_path, "**")
+    txt = f"{txt}\n\n"
+    article_item = {
+        "link": file_base_name,
+        "title": title,
+        "date": dt,
+        "txt": txt,
+    }
+    return article_item
 
-    article_items = []
-    for file_name in glob.iglob(wild_dir, recursive=False):
-        if os.path.isfile(file_name):
-            file_base_name, ext = os.path.splitext(os.path.basename(file_name))
-            with open(file_name, "r", encoding="utf-8") as fp:
-                txt = fp.read()
 
-                txt = re.sub(r"\n{5,}", r"", txt)
+def get_manifest_date(manifest, link_id):
+    """
+    The publish time recorded from the feed, None when the article was found in the page.
+    """
+    row = manifest.get(link_id)
+    if row is None or not row["item"]:
+        return None
 
-                if len(txt) == 0:
-                    continue
+    date = row["item"].get("date", None)
+    if not date:
+        return None
 
-                pos_nl = txt.find("\n")
-                if pos_nl > 0:
-                    title = txt[:pos_nl]
-                else:
-                    title = ""
+    try:
+        return dttm.datetime.strptime(date, "%Y-%m-%d %H:%M")
+    except ValueError:
+        return None
 
-                invalid_txt = re.search(r"手机登录\n扫码登录\n获取验证码\n", txt)
-                if invalid_txt:
-                    continue
 
-                add_dt = False
-                dts = re.search(r"(\d+-\d+-\d+ \d+:\d+)", txt)
-                if dts:
-                    dt = dttm.datetime.strptime(dts.group(), "%Y-%m-%d %H:%M")
-                else:
-                    match = re.search(r"\d+-\d+-\d+-\d+-\d+_", file_name)
-                    if match:
-                        dts = match.group()
-                        dts = dts[:-1]
-                        dt = dttm.datetime.strptime(dts, "%Y-%m-%d-%H-%M")
-                        add_dt = True
-                    else:
-                        # dt = dttm.datetime.now()
-                        mod_time = os.path.getmtime(file_name)
-                        dt = dttm.datetime.fromtimestamp(mod_time)
-                    # continue
-                    pass
+def get_articles_items(article_path):
+    wild_dir: str = os.path.join(article_path, "**")
 
-                if add_dt:
-                    dts = dt.strftime("%Y-%m-%d %H:%M")
-                    txt = f"{dts}\n\n{txt}"
-                    pass
+    # parsed articles are reused until their file changes
+    cache = get_text_cache(article_path)
+    manifest = get_manifest(article_path)
 
-                txt = f"{txt}\n\n"
-                article_item = {
-                    "link": file_base_name,
-                    "title": title,
-                    "date": dt,
-                    "txt": txt,
-                }
+    article_items = []
+    for file_name in glob.iglob(wild_dir, recursive=False):
+        if os.path.isfile(file_name):
+            st = os.stat(file_name)
+            article_item = cache.get_item(file_name, st)
+            if article_item is None:
+                date = get_manifest_date(manifest, Path(file_name).stem)
+                with span("read"):
+                    article_item = parse_article_file(file_name, date=date)
+                article_item = cache.put_item(file_name, st, article_item)
+
+            if article_item:
                 article_items.append(article_item)
 
+    cache.flush()
+
     return article_items
 
 
@@ -1566,6 +1487,10 @@ def scrape_item(
     max_articles,
     is_article: bool,
     max_checks: int = 0,
+    incremental: bool = False,
+    workers: int = 1,
+    resume: bool = False,
+    reprocess: bool = False,
 ):
     link = item["link"]
     name = item["name"]
@@ -1576,7 +1501,10 @@ def scrape_item(
     if link:
         # origin = item.get("origin", "tt")
         origin = "tt"
-        if link.find("mp.weixin.qq.com") > -1:
+        if item.get("origin", None) is not None:
+            # a site the links were pointed at with set_site_base
+            origin = item["origin"]
+        elif link.find("mp.weixin.qq.com") > -1:
             origin = "wp"
         elif link.find("www.toutiao.com") > -1:
             origin = "tt"
@@ -1594,19 +1522,9 @@ def scrape_item(
         # uid = uid.replace("/?&", "_")
 
         if is_article:
-            if isinstance(flter, list):
-                article_path = f".torextrader/toutiao/article_{uid}_{name}"
-                for f in flter:
-                    article_path = f"{article_path}_{f}"
-            else:
-                article_path = f".torextrader/toutiao/article_{uid}_{name}_{flter}"
+            article_path = f".torextrader/toutiao/article_{uid}_{name}{get_filter_suffix(flter)}"
         else:
-            if isinstance(flter, list):
-                article_path = f".torextrader/toutiao/w_{uid}_{name}"
-                for f in flter:
-                    article_path = f"{article_path}_{f}"
-            else:
-                article_path = f".torextrader/toutiao/w_{uid}_{name}_{flter}"
+            article_path = f".torextrader/toutiao/w_{uid}_{name}{get_filter_suffix(flter)}"
     else:
         article_path = item["article_path"]
         pass
@@ -1637,19 +1555,42 @@ def scrape_item(
         if not os.path.exists(path):
             os.makedirs(path)
 
+    # the files may have changed since the last crawl of a long running watch
+    get_manifest(article_path, sync=True)
+
     try:
-        if scrape:
-            all_update_items = get_all_update_items(
-                origin=origin,
-                link=link,
-                article_path=article_path,
-                flter=flter,
-                cache=not nocache,
-                max_articles=max_articles,
-                is_article=is_article,
-                sort_reversed=sort_reversed,
-                max_checks=max_checks,
-            )
+        if reprocess:
+            all_update_items = reprocess_articles(article_path, include_title)
+        elif scrape:
+            checkpoint = CrawlCheckpoint(article_path, link)
+            if not resume:
+                checkpoint.reset()
+            elif checkpoint.exists:
+                print(
+                    colored(
+                        f"resuming {name}: {len(checkpoint.update_items)} queued, "
+                        f"{len(checkpoint.downloaded)} downloaded",
+                        "cyan",
+                    )
+                )
+
+            if checkpoint.scanned:
+                # the profile was scanned to the end, only the downloads were left
+                all_update_items = checkpoint.update_items
+            else:
+                all_update_items = get_all_update_items(
+                    origin=origin,
+                    link=link,
+                    article_path=article_path,
+                    flter=flter,
+                    cache=not nocache,
+                    max_articles=max_articles,
+                    is_article=is_article,
+                    sort_reversed=sort_reversed,
+                    max_checks=max_checks,
+                    incremental=item.get("incremental", incremental),
+                    checkpoint=checkpoint,
+                )
 
             if all_update_items:
                 print(f"downloading {len(all_update_items)} updated articles...")
@@ -1662,7 +1603,11 @@ def scrape_item(
                     include_title=include_title,
                     is_article=is_article,
                     cache=not nocache,
+                    workers=item.get("workers", workers),
+                    checkpoint=checkpoint,
                 )
+
+            checkpoint.clear()
         else:
             all_update_items = []
 
@@ -1776,9 +1721,118 @@ def main():
     )
 
     parser.add_argument("-s", "--scrape", help="scrape", action="store_true")
+    parser.add_argument(
+        "--snapshots",
+        help="keep the compressed raw html of the fetched pages in .torextrader/snapshots",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--search",
+        help="add the downloaded articles to the full-text index, see search_corpus.py",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--reprocess",
+        help="extract the articles again from their snapshots and regenerate, no browser",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--watch",
+        help="keep running and poll the items every WATCH minutes, or their config 'interval'",
+        type=float,
+        default=None,
+    )
+    parser.add_argument(
+        "--status-port",
+        help="port of the json status of --watch on localhost, 0 for none",
+        type=int,
+        default=8765,
+    )
+    parser.add_argument(
+        "--resume",
+        help="resume the items an interrupted run left a checkpoint for",
+        action="store_true",
+    )
+    parser.add_argument(
+        "-i",
+        "--incremental",
+        help="only parse the newly appended cards on each scroll",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--feed",
+        help="read the cards from the captured feed json instead of parsing the page",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--http",
+        help="fetch server-rendered articles over http first, fall back to the browser",
+        action="store_true",
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        help="number of browser sessions to download with, the extra ones get the cookies of the main one "
+        f"when created, at most {default_domain_limit} requests per domain unless the config's domain_limits says",
+        type=int,
+        default=1,
+    )
+    parser.add_argument(
+        "--throttle",
+        help="pace the article requests per domain, slower on login walls and rate limits, "
+        "the rates are kept in .torextrader/throttle.json",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--sessions",
+        help="number of browser sessions to crawl the config items with concurrently",
+        type=int,
+        default=None,
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        help="number of processes to clean the articles with, 0 for all cores",
+        type=int,
+        default=1,
+    )
     # parser.add_argument("-e", "--edge", help="use edge", action="store_true")
     parser.add_argument("-r", "--chrome", help="use chrome", action="store_true")
+    parser.add_argument(
+        "--adaptive",
+        help="wait on page readiness signals instead of fixed sleeps",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--parser",
+        default=None,
+        type=str,
+        help="html parser, selectolax, lxml or bs4, defaults to the fastest installed",
+    )
+    parser.add_argument(
+        "--text-only",
+        help="text-only browser profile, images, fonts, media and trackers are not loaded",
+        action="store_true",
+    )
 
+    parser.add_argument(
+        "--metrics",
+        help="write a json run report with the time per phase and a prometheus dump to .torextrader/metrics",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--dedup",
+        help="drop near-duplicate articles of an item and its subitems at this similarity, e.g. 0.9, "
+        "the earliest copy is kept, or the item's 'dedup'",
+        type=float,
+        default=None,
+    )
+    parser.add_argument(
+        "--rules",
+        default=None,
+        type=str,
+        help="cleanup rules config, defaults to cleanup_rules.json next to the script",
+    )
     parser.add_argument(
         "-c",
         "--config",
@@ -1798,8 +1852,39 @@ def main():
     # use_edge_web_driver = args.edge
     use_edge_web_driver = not args.chrome
 
-    global driver
-    driver = create_drive(use_edge_web_driver)
+    global driver, use_edge, text_only, http_fetcher, feed_capture, page_ready, rules_fp, throttle, snapshots
+    global search_index
+    rules_fp = args.rules
+    use_edge = use_edge_web_driver
+    text_only = args.text_only
+    if args.reprocess:
+        if args.scrape or args.watch is not None:
+            print("--reprocess reads the snapshots, it does not scrape")
+            return
+        # no page is loaded
+        snapshots = SnapshotStore()
+    else:
+        driver = create_drive(use_edge_web_driver, text_only=text_only, perf_log=args.feed)
+
+    if args.feed and driver is not None:
+        feed_capture = FeedCapture(driver)
+
+    set_backend(args.parser)
+
+    if args.adaptive:
+        page_ready = PageReadiness()
+
+    if args.throttle:
+        throttle = Throttle()
+
+    if args.snapshots and snapshots is None:
+        snapshots = SnapshotStore()
+
+    if args.search:
+        search_index = get_search_index()
+
+    if args.http:
+        http_fetcher = HttpFetcher(pool_size=max(args.workers, 1) * 2, throttle=throttle, snapshots=snapshots)
 
     # time.sleep(50.0)
     force = args.force
@@ -1810,6 +1895,13 @@ def main():
         config: dict = load_json(args.config)
         items = config["items"]
 
+        # e.g. {"www.toutiao.com": 2, "mp.weixin.qq.com": 1}
+        domain_limits.update(config.get("domain_limits", {}))
+
+        sessions = args.sessions if args.sessions is not None else config.get("sessions", 1)
+        if args.reprocess:
+            sessions = 1
+
         if args.index is not None:
             idx = args.index
 
@@ -1819,6 +1911,35 @@ def main():
 
             item = items[idx]
 
+        if args.watch is not None:
+            indexed_items = [(idx, item)] if args.index is not None else list(enumerate(items))
+            run_watch(
+                args,
+                max_articles_default,
+                max_checks,
+                articles_path,
+                indexed_items,
+                sessions,
+                interval=args.watch,
+                port=args.status_port,
+            )
+            pass
+
+        elif sessions > 1:
+            indexed_items = [(idx, item)] if args.index is not None else list(enumerate(items))
+            run_scheduled(
+                args,
+                max_articles_default,
+                max_checks,
+                force,
+                articles_path,
+                indexed_items,
+                sessions,
+                all=all,
+            )
+            pass
+
+        elif args.index is not None:
             handle_item(
                 args,
                 max_articles_default,
@@ -1848,7 +1969,27 @@ def main():
         print("no config specified")
         return
 
-    driver.quit()
+    if http_fetcher is not None:
+        http_fetcher.report()
+
+    if driver_pool is not None:
+        driver_pool.quit(keep=driver)
+
+    if page_ready is not None:
+        page_ready.save()
+
+    if throttle is not None:
+        throttle.save()
+        throttle.report()
+
+    if snapshots is not None:
+        snapshots.report()
+
+    if driver is not None:
+        driver.quit()
+
+    if args.metrics:
+        metrics.save("web_toutiao")
 
     pass
 
@@ -1862,13 +2003,11 @@ def handle_item(
     idx,
     item,
     all: bool = False,
+    scraped=None,
 ):
     name = item.get("name", None)
     flter = item.get("filter", None)
 
-    group_idx = []
-    group_txts = []
-
     all_update_items = []
 
     print(colored(f">>> {idx}", "yellow"))
@@ -1887,126 +2026,405 @@ def handle_item(
         )
         return
 
-    is_array = False
-    if "subitems" in item:
-        is_array = True
-        subitems = item["subitems"]
-        force_t = True
-        for ix, itm in enumerate(subitems):
-            sn, update_items, group_idx, group_txts = generate_item(
+    gn = item.get("group_num", group_num)
+
+    dedup = None
+    threshold = item.get("dedup", args.dedup)
+    if threshold:
+        # every copy is indexed before any is written, so the earliest one of all the subitems is kept
+        subitems = item["subitems"] if "subitems" in item else [item]
+        if scraped is None:
+            scraped = [
+                scrape_config_item(args, max_articles_default, max_checks, ix, itm) for ix, itm in enumerate(subitems)
+            ]
+        # only the articles that would be written, a copy is not dropped for one that is not
+        dedup = get_dedup_index(
+            threshold,
+            [
+                (article_path, get_items_to_write(article_path, itm, itm.get("max", max_articles_default)))
+                for (article_path, _), itm in zip(scraped, subitems)
+            ],
+        )
+
+    # chapters are streamed to the volumes as they are cleaned, and only kept
+    # when there are updates
+    with VolumeWriter(articles_path, gn) as writer:
+        end_idx = 0
+        if "subitems" in item:
+            subitems = item["subitems"]
+            force_t = True
+            for ix, itm in enumerate(subitems):
+                sn, update_items, end_idx = generate_item(
+                    args,
+                    max_articles_default,
+                    max_checks,
+                    force_t,
+                    ix,
+                    itm,
+                    writer,
+                    end_idx,
+                    scraped=scraped[ix] if scraped is not None else None,
+                    dedup=dedup,
+                )
+                all_update_items = [*all_update_items, *update_items]
+                if name is None:
+                    name = sn
+                pass
+            pass
+        else:
+            sn, update_items, end_idx = generate_item(
                 args,
                 max_articles_default,
                 max_checks,
-                force_t,
-                ix,
-                itm,
-                group_idx,
-                group_txts,
+                force,
+                idx,
+                item,
+                writer,
+                end_idx,
+                scraped=scraped[0] if scraped is not None else None,
+                dedup=dedup,
             )
             all_update_items = [*all_update_items, *update_items]
-            if name is None:
-                name = sn
             pass
-        pass
-    else:
-        sn, update_items, group_idx, group_txts = generate_item(
-            args,
-            max_articles_default,
-            max_checks,
-            force,
-            idx,
-            item,
-            group_idx,
-            group_txts,
-        )
-        all_update_items = [*all_update_items, *update_items]
-        pass
-
-    gn = item.get("group_num", group_num)
 
-    if group_idx and group_txts:
-        grp_idxs = []
-        grp_txts = []
-
-        if is_array:
-            num_total = group_idx[-1]
-            txts = ""
-
-            num_grps = len(group_idx)
-            for i in range(num_grps):
-                idx = group_idx[i]
-                txt = group_txts[i]
-
-                txts += txt
-                last_total = idx
-                if last_total >= gn:
-                    grp_idxs.append(last_total)
-                    grp_txts.append(txts)
-                    txts = ""
-
-            if txts:
-                grp_idxs.append(last_total)
-                grp_txts.append(txts)
-        else:
-            grp_idxs = group_idx
-            grp_txts = group_txts
-            num_total = group_idx[-1]
-
-        if force or all_update_items:
-            if flter:
-                if isinstance(flter, list):
-                    for f in flter:
-                        name = f"{name}_{f}"
-                else:
-                    name = f"{name}_{flter}"
+        if writer.count > 0:
+            if force or all_update_items:
+                if flter:
+                    name = f"{name}{get_filter_suffix(flter)}"
+                    pass
+                # print(colored(f"generate files {name} from {end_idx} txts...", "green")
+                writer.commit(name)
+                pass
+            else:
+                print(colored(f"no updated articles for {end_idx} txts", "yellow"))
                 pass
-            # print(colored(f"generate files {name} from {num_total} txts...", "green")
-            write_txts(articles_path, name, grp_idxs, grp_txts)
-            pass
-        else:
-            print(colored(f"no updated articles for {num_total} txts", "yellow"))
             pass
-        pass
     pass
 
 
-def generate_item(args, max_articles_default, max_checks, force, idx, item, group_idx, group_txts):
-    name = item.get("name", None)
-    max_articles = item.get("max", max_articles_default)
-    is_article = item.get("is_article", True)
+def item_uses_cache(item, nocache: bool):
+    # same as scrape_item
+    if not nocache:
+        return True
+
+    cache_config = item.get("cache", None)
+    if cache_config is not None:
+        return bool(cache_config)
+
+    return (item.get("link", None) or "").find("mp.weixin.qq.com") > -1
+
+
+def get_crawl_key(item):
+    return orjson.dumps(
+        [item.get("link", None), item.get("name", None), item.get("filter", None), item.get("is_article", True)]
+    ).decode("utf-8")
+
+
+def scrape_scheduled(args, max_articles_default, max_checks, idx, item, drv):
+    local_session.driver = drv
+    local_session.feed_capture = FeedCapture(drv) if feed_capture is not None else None
+
+    try:
+        # the sessions are shared by the scheduled items, so downloads stay on the item's own session
+        return scrape_item(
+            idx,
+            {**item, "workers": 1},
+            scrape=args.scrape,
+            nocache=args.nocache,
+            max_articles=item.get("max", max_articles_default),
+            is_article=item.get("is_article", True),
+            max_checks=max_checks,
+            incremental=args.incremental,
+            workers=1,
+            resume=args.resume,
+        )
+    finally:
+        local_session.driver = None
+        local_session.feed_capture = None
+
+
+def merge_scheduled(args, max_articles_default, max_checks, force, articles_path, idx, item, all, results):
+    if any([r is None for r in results]):
+        print(colored(f">>> {idx} not merged, crawl failed", "red"))
+        return
+
+    handle_item(
+        args,
+        max_articles_default,
+        max_checks,
+        force,
+        articles_path,
+        idx,
+        item,
+        all=all,
+        scraped=results,
+    )
+
+
+def run_scheduled(
+    args,
+    max_articles_default,
+    max_checks,
+    force,
+    articles_path,
+    indexed_items,
+    sessions: int,
+    all: bool = False,
+):
+    """
+    Scrape the config items concurrently on `sessions` browser sessions, each item is merged
+    in config order once it and all its subitems are scraped.
+    """
+    pool = get_driver_pool(sessions)
+    history = CrawlHistory(os.path.join(articles_path, ".crawl_history.json"))
+    scheduler = CrawlScheduler(pool, history, count_updates=lambda r: len(r[1]))
+
+    groups = get_crawl_groups(args, max_articles_default, max_checks, force, articles_path, indexed_items, all=all)
+
+    print(colored(f"crawling {len(groups)} items on {sessions} sessions...", "green"))
+    scheduler.run(groups)
+
+
+def get_crawl_groups(
+    args,
+    max_articles_default,
+    max_checks,
+    force,
+    articles_path,
+    indexed_items,
+    all: bool = False,
+    merge=merge_scheduled,
+):
+    groups = []
+    for idx, item in indexed_items:
+        is_array = "subitems" in item
+        subitems = item["subitems"] if is_array else [item]
+        if not all and item.get("article_path", None) is not None:
+            # nothing to crawl, handle_item reports it
+            subitems = []
+
+        tasks = []
+        for ix, itm in enumerate(subitems):
+            sub_idx = ix if is_array else idx
+            tasks.append(
+                CrawlTask(
+                    get_crawl_key(itm),
+                    partial(scrape_scheduled, args, max_articles_default, max_checks, sub_idx, itm),
+                    cache=item_uses_cache(itm, args.nocache),
+                )
+            )
+
+        groups.append((tasks, partial(merge, args, max_articles_default, max_checks, force, articles_path, idx, item, all)))
+
+    return groups
+
+
+def merge_watched(
+    schedule: WatchSchedule,
+    round_start,
+    args,
+    max_articles_default,
+    max_checks,
+    force,
+    articles_path,
+    idx,
+    item,
+    all,
+    results,
+):
+    key = get_crawl_key(item)
+    seconds = time.time() - round_start
+
+    if any([r is None for r in results]):
+        schedule.done(key, 0, seconds, error="crawl failed")
+        print(colored(f">>> {idx} not merged, crawl failed", "red"))
+        return
+
+    updates = sum([len(r[1]) for r in results])
+    schedule.done(key, updates, seconds)
+    if updates == 0:
+        # the volumes are only regenerated for items with new articles
+        print(colored(f">>> {idx} {item.get('name', '')} no updates", "yellow"))
+        return
+
+    handle_item(
+        args,
+        max_articles_default,
+        max_checks,
+        force,
+        articles_path,
+        idx,
+        item,
+        all=all,
+        scraped=results,
+    )
+
+
+def run_watch(
+    args,
+    max_articles_default,
+    max_checks,
+    articles_path,
+    indexed_items,
+    sessions: int,
+    interval: float,
+    port: int = 0,
+):
+    """
+    Keep the browser sessions warm and poll every config item each `interval` minutes, or its own
+    "interval". Items are polled with the cache on, so a scan stops at the first scroll without new
+    articles, and only the items with new articles are merged.
+    """
+    # the cached scan, never a full refresh or regeneration
+    watch_args = argparse.Namespace(**{**vars(args), "scrape": True, "nocache": False})
+
+    schedule = WatchSchedule()
+    watched = {}
+    for idx, item in indexed_items:
+        if item.get("article_path", None) is not None:
+            # downloaded items, nothing to poll
+            continue
+
+        key = get_crawl_key(item)
+        watched[key] = (idx, item)
+        schedule.add(key, item.get("name", None), item.get("interval", interval) * 60)
+
+    if not watched:
+        print("no items to watch")
+        return
+
+    pool = get_driver_pool(sessions)
+    history = CrawlHistory(os.path.join(articles_path, ".crawl_history.json"))
+    scheduler = CrawlScheduler(pool, history, count_updates=lambda r: len(r[1]))
+
+    server = None
+    if port > 0:
+        server = StatusServer(
+            lambda: {**schedule.status(), "sessions": pool.size, "metrics": metrics.report()},
+            port,
+            get_metrics=lambda: metrics.prometheus("web_toutiao"),
+        )
+        server.start()
+        print(colored(f"status on {server.url}", "green"))
+
+    print(colored(f"watching {len(watched)} items every {interval} minutes on {sessions} sessions...", "green"))
+
+    try:
+        while True:
+            due = schedule.due()
+            if not due:
+                # wake up for the next due item, or at least every minute
+                time.sleep(min(max(schedule.next_due() - time.time(), 1.0), 60.0))
+                continue
+
+            schedule.start_round(due)
+            print(colored(f"polling {len(due)} items...", "green"))
+
+            merge = partial(merge_watched, schedule, time.time())
+            groups = get_crawl_groups(
+                watch_args,
+                max_articles_default,
+                max_checks,
+                False,
+                articles_path,
+                [watched[key] for key in due],
+                merge=merge,
+            )
+            scheduler.run(groups)
+            schedule.end_round()
+    except KeyboardInterrupt:
+        print("watch stopped")
+    finally:
+        if server is not None:
+            server.stop()
+
 
-    article_path, update_items = scrape_item(
+def scrape_config_item(args, max_articles_default, max_checks, idx, item):
+    return scrape_item(
         idx,
         item,
         scrape=args.scrape,
         nocache=args.nocache,
-        max_articles=max_articles,
-        is_article=is_article,
+        max_articles=item.get("max", max_articles_default),
+        is_article=item.get("is_article", True),
         max_checks=max_checks,
+        incremental=args.incremental,
+        workers=args.workers,
+        resume=args.resume,
+        reprocess=args.reprocess,
     )
 
+
+def get_dedup_index(threshold, article_paths_items):
+    """
+    Near-duplicate index of the (article dir, articles) pairs, the later copies are dropped when generating.
+    """
+    dedup = NearDupIndex(threshold)
+    with span("dedup"):
+        copies = dedup.add_items(
+            [
+                ((article_path, article_item["link"]), article_item)
+                for article_path, article_items in article_paths_items
+                for article_item in article_items
+            ]
+        )
+    incr("near_duplicates", copies)
+    if copies > 0:
+        print(colored(f"{copies} near-duplicate articles dropped at similarity {threshold}", "yellow"))
+    return dedup
+
+
+def get_items_to_write(article_path, item, max_articles):
+    """
+    The articles of a config item that are written, oldest first, after its body filter and max.
+    """
+    article_items = get_articles_items(article_path)
+    article_filter = compile_filter(item.get("filter", None))
+    if article_filter.body:
+        # the cards were only filtered by their titles
+        with span("filter"):
+            article_items = [x for x in article_items if article_filter.match(x["title"], x["txt"])]
+
+    sorted_article_items = sorted(article_items, key=lambda x: x["date"])
+    if max_articles > 0 and len(sorted_article_items) > max_articles:
+        sorted_article_items = sorted_article_items[-max_articles:]
+    return sorted_article_items
+
+
+def generate_item(
+    args, max_articles_default, max_checks, force, idx, item, writer, start_idx, scraped=None, dedup=None
+):
+    name = item.get("name", None)
+    max_articles = item.get("max", max_articles_default)
+
+    if scraped is not None:
+        # already scraped by run_scheduled
+        article_path, update_items = scraped
+    else:
+        article_path, update_items = scrape_config_item(args, max_articles_default, max_checks, idx, item)
+
     if force or update_items:
         filter_original_text = item.get("filter_original_text", True)
-        article_items = get_articles_items(article_path)
-        sorted_article_items = sorted(article_items, key=lambda x: x["date"])
-        if max_articles > 0 and len(sorted_article_items) > max_articles:
-            sorted_article_items = sorted_article_items[-max_articles:]
+        sorted_article_items = get_items_to_write(article_path, item, max_articles)
+        if dedup is not None:
+            sorted_article_items = [x for x in sorted_article_items if not dedup.is_copy((article_path, x["link"]))]
 
-        print(colored(f"generate txts from {len(article_items)} articles...", "green"))
+        print(colored(f"generate txts from {len(sorted_article_items)} articles...", "green"))
 
-        start_idx = group_idx[-1] if group_idx else 0
-
-        gn = item.get("group_num", group_num)
-        group_idx_t, group_txts_t = generate_txts(
+        end_idx = generate_txts(
             sorted_article_items,
+            writer,
             filter_original_text=filter_original_text,
             start_idx=start_idx,
-            gn=gn,
+            rules=item.get("rules", "toutiao"),
+            cache=get_text_cache(article_path),
+            jobs=args.jobs,
         )
-        group_idx = [*group_idx, *group_idx_t]
-        group_txts = [*group_txts, *group_txts_t]
         pass
-    return name, update_items, group_idx, group_txts
+    else:
+        end_idx = start_idx
+    return name, update_items, end_idx
 
 
-main()
+if __name__ == "__main__":
+    main()